@@ -1,12 +1,16 @@
 import sys
 import os
 import argparse
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT_DIR / ".env")
-sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
 
 from langchain.agents import initialize_agent, AgentType
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -17,7 +21,17 @@ from tools.klee import run_klee_pipeline
 from tools.testgen import generate_test_cases
 from tools.coverage import generate_coverage_report
 
-from scripts.afl.generate_afl_seeds import read_c_programs_with_filenames
+from afl.telemetry import latest_run_dir, load_summary
+from build.cache import build_many
+from gcov.digest import coverage_digest
+from gcov.model import CoverageModel, list_snapshots
+from llm.context import RESULTS_DIR, build_context
+
+AFL_OUTPUT_DIR = ROOT_DIR / "artifacts/afl/output"
+# Least-covered source put in every prompt instead of all of tcc.c
+PROMPT_CONTEXT_TOKENS = 2000
+# How much of the agent's own final answer is carried into the next prompt
+ANSWER_CHARS = 500
 
 # Initialize the LLM
 llm = ChatGoogleGenerativeAI(
@@ -43,6 +57,150 @@ agent = initialize_agent(
     max_iterations=25,
 )
 
+# Only for the agent, which calls the tools itself
+TOOL_USE_INSTRUCTIONS = (
+    "Always use all of the tools in each iteration, even if you believe some may be redundant.\n"
+    "Feel free to use a tool more than once, but run every tool every iteration.\n"
+)
+
+PLAN_INSTRUCTIONS = (
+    "\n\nThis iteration the tools are run for you: AFL and the LLM test generation "
+    "run at the same time, then the coverage report runs once on both of their results.\n"
+    "Do not call any tool. Reply with only a JSON object holding the flags for each tool, e.g.\n"
+    '{"afl": "--num-seeds 20 --afl-runtime 180 --additional-prompt \'...\'", '
+    '"testgen": "--num-tests 10 --additional-prompt \'...\'"}\n'
+)
+
+
+def build_run_prompt(c_program: str, previous_result: str | None, plan: bool) -> str:
+    """
+    The per-iteration prompt. With plan set it is for plan_tool_flags, which
+    asks for flags only, so the instructions to call the tools are left out.
+    """
+    run_prompt = (
+        "You are testing a C binary with the defined tools provided to you.\n"
+        "Here are the least-covered functions of the program you are testing:\n\n" + c_program + "\n\n"
+        "Your goal is to maximize program coverage above all else.\n"
+        + ("" if plan else "Utilize the provided tools for that purpose.\n")
+        + "\n"
+        "Here is some tool information:\n\n"
+        "**Generate AFL Seeds** and Run AFL: Run AFL with generated seeds. Example Flags:\n"
+        "--num-seeds n, where n is any of [10,15,20,30] --afl-runtime n, where n is any of [60,120,180,240,300] --additional-prompt 'any additional prompting for seed generation' \n"
+        "-- This will generate seeds with AFL and then run AFL with those seeds for the specified runtime.\n"
+        "-- You can run AFL for up to 5 minutes which is an afl-runtime of 300 seconds.\n"
+        "-- Be sure to add any additional prompting for seed generation to the --additional-prompt flag.\n\n"
+        "-- All requests should be purely programmatic, it is essential that the generated seeds are valid C programs.\n\n"
+        "**LLM Generated Test Cases**: Generate test cases using Gemini. Example Flags:\n"
+        "--num-tests n, where n is any of [5,10,15] --additional-prompt 'additional prompting for test case generation' \n"
+        "-- These test cases will only be used upon coverage testing with the coverage test tool.\n"
+        "-- Be sure to add any additional prompting for test case generation to the --additional-prompt flag.\n\n"
+        "-- The model sees this when generating the seeds, but does not use the tool, that is done programmatically.\n\n"
+        "-- Request complexity and specific attributes about the c files to push further coverage, these should be fewer but larger files.\n\n"
+        "**Generate Coverage Report**: Generate a coverage report using gcov\n"
+        "-- This will generate a coverage report using gcov by combining all relevant generated test cases from both of the previous tools.\n"
+        "-- Use this as a coverage check for information on the performance of a given tool.\n\n"
+        "If flags were not mentioned for a tool, the tool has no flags.\n"
+        "The additional-prompt flag is simply appending whatever you add to what the model attempts to generate. These generated tests are simply .c files, request complexity and specific attributes about those c files. \n"
+        + ("" if plan else TOOL_USE_INSTRUCTIONS)
+        + "When it comes to additional prompts, request specific attributes about the c files to push further coverage. \n"
+        "If line coverage is 45 percent or higher and an iteration finds no new branches, you can comfortably stop.\n"
+        "The results of each iteration report line, branch and function coverage and how many of each were newly covered; new branches are the best sign a tool is still finding new behaviour.\n"
+        "Sometimes it is best to focus on a large file rather than a file with low coverage. The flags cannot be changed for the compiler, so request complexity and specific attributes about the c files to push further coverage.\n\n"
+        "Additional Prompts must always be wrapped in single quotes ''\n\n"
+    )
+
+    if previous_result is not None:
+        run_prompt += (
+            "\n\n"
+            f"The results of the previous iteration: \n\n {previous_result} \n\n"
+            "\n\n"
+        )
+    return run_prompt
+
+
+def plan_tool_flags(run_prompt: str) -> dict:
+    """
+    Ask the model for every tool's flags in a single call. Anything it gets
+    wrong falls back to the tool's defaults.
+    """
+    reply = llm.invoke(run_prompt + PLAN_INSTRUCTIONS).content
+    match = re.search(r"\{.*\}", reply, re.DOTALL)
+    try:
+        plan = json.loads(match.group()) if match else None
+    except json.JSONDecodeError as e:
+        print(f"[!] Could not parse the planned flags ({e}), using defaults: {reply!r}")
+        plan = {}
+    if plan is None:
+        print(f"[!] No JSON object in the planning reply, using defaults: {reply!r}")
+        plan = {}
+
+    flags = {}
+    for name in ("afl", "testgen"):
+        if name not in plan and plan:
+            print(f"[!] No flags planned for {name}, using its defaults")
+        flags[name] = str(plan.get(name, ""))
+    return flags
+
+
+def timed(tool, flags: str) -> tuple[str, float]:
+    start = time.monotonic()
+    return tool.run(flags), time.monotonic() - start
+
+
+def run_concurrent_iteration(run_prompt: str) -> str:
+    """
+    Run AFL in the background while testgen waits on the LLM, then report
+    coverage once over both. The iteration takes about as long as the slower
+    of the two instead of their sum.
+    """
+    flags = plan_tool_flags(run_prompt)
+    print(f"[+] Tool flags: {flags}")
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        afl = pool.submit(timed, run_afl_pipeline, flags["afl"])
+        testgen = pool.submit(timed, generate_test_cases, flags["testgen"])
+        (afl_result, afl_seconds), (testgen_result, testgen_seconds) = (
+            afl.result(),
+            testgen.result(),
+        )
+    coverage_result, coverage_seconds = timed(generate_coverage_report, "")
+    wall = time.monotonic() - start
+    print(
+        f"[+] Iteration took {wall:.0f}s: AFL {afl_seconds:.0f}s and testgen "
+        f"{testgen_seconds:.0f}s side by side, coverage {coverage_seconds:.0f}s "
+        f"(sequential: {afl_seconds + testgen_seconds + coverage_seconds:.0f}s)"
+    )
+    return "\n\n".join([afl_result, testgen_result, coverage_result])
+
+
+def latest_snapshot():
+    snapshots = list_snapshots(RESULTS_DIR)
+    return snapshots[-1] if snapshots else None
+
+
+def iteration_feedback(snapshot_before, afl_run_before, answer: str) -> str:
+    """
+    Digest of what this iteration changed: coverage deltas against the
+    snapshot from before it, plus the AFL summary if AFL ran. Its size does
+    not depend on how many files or tool runs there were.
+    """
+    snapshot = latest_snapshot()
+    afl_run = latest_run_dir(AFL_OUTPUT_DIR)
+    afl_summary = load_summary(afl_run) if afl_run and afl_run != afl_run_before else None
+
+    if snapshot is None:
+        feedback = "No coverage report has been generated yet."
+    elif snapshot == snapshot_before:
+        feedback = "No coverage report was generated this iteration.\n" + coverage_digest(
+            CoverageModel.load(snapshot), afl_summary=afl_summary
+        )
+    else:
+        previous = CoverageModel.load(snapshot_before) if snapshot_before else None
+        feedback = coverage_digest(CoverageModel.load(snapshot), previous, afl_summary)
+    return f"{feedback}\n\nYour summary: {str(answer)[:ANSWER_CHARS]}"
+
+
 # Run the agent
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -52,54 +210,44 @@ if __name__ == "__main__":
         default=5,
         help="Number of steps for the agent to take",
     )
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="Plan each iteration's flags in one call, run AFL and testgen at the same time, then coverage once",
+    )
     args = parser.parse_args()
 
-    with open(f"{ROOT_DIR}/c_program/src/tcc.c", "r") as f:
-        c_program = f.read()
-
     iteration_results = []
 
+    # Build the gcov and AFL variants side by side once, so every tool call
+    # below starts from a build-cache hit instead of running make
+    try:
+        build_many(["gcov_bin", "afl_bin"])
+    except Exception as e:
+        print(f"[!] Prebuild failed, tools will build on demand: {e}")
+
+    if args.concurrent:
+        # AFL runs in the background, so its status screen would garble the output
+        os.environ.setdefault("AFL_NO_UI", "1")
+
     for i in range(args.iterations):
         print(f"\n🧠 Agent Iteration {i+1}/{args.iterations}")
+        snapshot_before = latest_snapshot()
+        afl_run_before = latest_run_dir(AFL_OUTPUT_DIR)
+        c_program = build_context(PROMPT_CONTEXT_TOKENS)
 
-        run_prompt = (
-            "You are testing a C binary with the defined tools provided to you.\n"
-            "Here is the program you are testing:\n\n" + c_program + "\n\n"
-            "Your goal is to maximize program coverage above all else.\n"
-            "Utilize the provided tools for that purpose.\n\n"
-            "Here is some tool information:\n\n"
-            "**Generate AFL Seeds** and Run AFL: Run AFL with generated seeds. Example Flags:\n"
-            "--num-seeds n, where n is any of [10,15,20,30] --afl-runtime n, where n is any of [60,120,180,240,300] --additional-prompt 'any additional prompting for seed generation' \n"
-            "-- This will generate seeds with AFL and then run AFL with those seeds for the specified runtime.\n"
-            "-- You can run AFL for up to 5 minutes which is an afl-runtime of 300 seconds.\n"
-            "-- Be sure to add any additional prompting for seed generation to the --additional-prompt flag.\n\n"
-            "-- All requests should be purely programmatic, it is essential that the generated seeds are valid C programs.\n\n"
-            "**LLM Generated Test Cases**: Generate test cases using Gemini. Example Flags:\n"
-            "--num-tests n, where n is any of [5,10,15] --additional-prompt 'additional prompting for test case generation' \n"
-            "-- These test cases will only be used upon coverage testing with the coverage test tool.\n"
-            "-- Be sure to add any additional prompting for test case generation to the --additional-prompt flag.\n\n"
-            "-- The model sees this when generating the seeds, but does not use the tool, that is done programmatically.\n\n"
-            "-- Request complexity and specific attributes about the c files to push further coverage, these should be fewer but larger files.\n\n"
-            "**Generate Coverage Report**: Generate a coverage report using gcov\n"
-            "-- This will generate a coverage report using gcov by combining all relevant generated test cases from both of the previous tools.\n"
-            "-- Use this as a coverage check for information on the performance of a given tool.\n\n"
-            "If flags were not mentioned for a tool, the tool has no flags.\n"
-            "The additional-prompt flag is simply appending whatever you add to what the model attempts to generate. These generated tests are simply .c files, request complexity and specific attributes about those c files. \n"
-            "Always use all of the tools in each iteration, even if you believe some may be redundant.\n"
-            "Feel free to use a tool more than once, but run every tool every iteration.\n"
-            "When it comes to additional prompts, request specific attributes about the c files to push further coverage. \n"
-            "If you reach a coverage of 45 percent or higher, you can comfortably stop."
-            "Sometimes it is best to focus on a large file rather than a file with low coverage. The flags cannot be changed for the compiler, so request complexity and specific attributes about the c files to push further coverage.\n\n"
-            "Additional Prompts must always be wrapped in single quotes ''\n\n"
+        run_prompt = build_run_prompt(
+            c_program,
+            iteration_results[i - 1] if i > 0 else None,
+            plan=args.concurrent,
         )
 
-        if i > 0:
-            run_prompt += (
-                "\n\n"
-                f"The results of the previous iteration: \n\n {iteration_results[i-1]} \n\n"
-                "\n\n"
-            )
-
-        result = agent.run(run_prompt)
+        if args.concurrent:
+            result = run_concurrent_iteration(run_prompt)
+        else:
+            result = agent.run(run_prompt)
         print(result)
-        iteration_results.append(result)
+        iteration_results.append(
+            iteration_feedback(snapshot_before, afl_run_before, result)
+        )
+        print(iteration_results[-1])
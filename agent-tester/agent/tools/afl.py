@@ -1,28 +1,29 @@
-import subprocess
+import shlex
 import sys
+from dataclasses import asdict
 from pathlib import Path
 from langchain.tools import tool
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
-sys.path.insert(0, str(REPO_ROOT))
+# The orchestrators import their sibling packages (afl, llm, ...) top-level
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
 
 
 @tool
 def run_afl_pipeline(input: str) -> str:
     """Runs AFL++ with specified CLI flags. Example: '--num-seeds 10 --afl-runtime 30'"""
-    import shlex
+    # Imported on first use, so loading the agent's tools stays cheap
+    from afl_orchestrator import full_afl_pipeline, parse_options
 
     input = input.strip()
-    # if not input:
-    #     return "No flags provided. Example: '--num-seeds 10 --afl-runtime 30'"
 
     try:
-        flags = shlex.split(input)
-        result = subprocess.run(
-            ["python3", f"{REPO_ROOT}/scripts/afl_orchestrator.py", *flags],
-            check=True,
-            capture_output=True,
-        )
-        return f"AFL pipeline completed with flags: {input}, output: {result.stdout}"
-    except subprocess.CalledProcessError as e:
+        result = full_afl_pipeline(parse_options(shlex.split(input)))
+    except SystemExit:
+        # argparse exits on flags it does not know
+        return f"AFL pipeline failed: invalid flags: {input}"
+    except Exception as e:
         return f"AFL pipeline failed: {e}"
+    if result.status != "ok":
+        return f"AFL pipeline failed with flags: {input}, result: {asdict(result)}"
+    return f"AFL pipeline completed with flags: {input}, result: {asdict(result)}"
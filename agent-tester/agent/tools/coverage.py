@@ -1,25 +1,26 @@
-import subprocess
+import shlex
 import sys
+from dataclasses import asdict
 from pathlib import Path
 from langchain.tools import tool
 
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
-sys.path.insert(0, str(REPO_ROOT))
+# The orchestrators import their sibling packages (gcov, corpus, ...) top-level
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
 
 
 @tool
 def generate_coverage_report(input: str) -> str:
     """Runs the Coverage Generating script. Pass flags as a single string."""
-    import shlex
+    # Imported on first use, so loading the agent's tools stays cheap
+    from coverage_orchestrator import parse_options, run_coverage
 
     try:
-        flags = shlex.split(input)
-        result = subprocess.run(
-            ["python3", f"{REPO_ROOT}/scripts/coverage_orchestrator.py", *flags],
-            check=True,
-            capture_output=True,
-        )
-        return f"Coverage Report Generated Successfully with flags: {input} \n Output: {result.stdout}"
+        result = run_coverage(parse_options(shlex.split(input)))
+    except SystemExit:
+        # argparse exits on flags it does not know
+        return f"Coverage Generation Failed: invalid flags: {input}"
     except Exception as e:
         return f"Coverage Generation Failed: {str(e)}"
+    return f"Coverage Report Generated Successfully with flags: {input} \n Result: {asdict(result)}"
@@ -1,22 +1,28 @@
-import subprocess
+import shlex
 import sys
+from dataclasses import asdict
 from pathlib import Path
 from langchain.tools import tool
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
-sys.path.insert(0, str(REPO_ROOT))
+# The orchestrators import their sibling packages (klee, build, ...) top-level
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
 
 
 @tool
 def run_klee_pipeline(input: str) -> str:
     """Runs the full KLEE symbolic execution pipeline"""
-    import shlex
+    # Imported on first use, so loading the agent's tools stays cheap
+    from klee_orchestrator import full_klee_pipeline, parse_options
 
     try:
-        flags = shlex.split(input)
-        subprocess.run(
-            ["python3", f"{REPO_ROOT}/scripts/klee_orchestrator.py", *flags], check=True
-        )
-        return f"KLEE pipeline completed successfully with flags: {input}"
+        result = full_klee_pipeline(parse_options(shlex.split(input)))
+    except SystemExit:
+        # argparse exits on flags it does not know
+        return f"KLEE pipeline failed: invalid flags: {input}"
     except Exception as e:
         return f"KLEE pipeline failed: {str(e)}"
+    return (
+        f"KLEE pipeline completed successfully with flags: {input}, "
+        f"{result.total_tests} tests, per file: {asdict(result)['files']}"
+    )
@@ -1,24 +1,25 @@
-import subprocess
+import shlex
 import sys
+from dataclasses import asdict
 from pathlib import Path
 from langchain.tools import tool
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
-sys.path.insert(0, str(REPO_ROOT))
+# The orchestrators import their sibling packages (llm, ...) top-level
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
 
 
 @tool
 def generate_test_cases(input: str) -> str:
     """Runs the LLM Test Case Generation Tool."""
-    import subprocess
-    import shlex
+    # Imported on first use, so loading the agent's tools stays cheap
+    from testgen_orchestrator import parse_options, run_testgen
 
     try:
-        flags = shlex.split(input)
-        subprocess.run(
-            ["python3", f"{REPO_ROOT}/scripts/testgen_orchestrator.py", *flags],
-            check=True,
-        )
-        return f"LLM Testgen run with flags: {input}"
+        result = run_testgen(parse_options(shlex.split(input)))
+    except SystemExit:
+        # argparse exits on flags it does not know
+        return f"LLM Testgen run failed: invalid flags: {input}"
     except Exception as e:
         return f"LLM Testgen run failed: {str(e)}"
+    return f"LLM Testgen run with flags: {input}, result: {asdict(result)}"
@@ -0,0 +1,322 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+""" Throughput benchmark for the coverage pipeline: times each coverage_orchestrator stage on synthetic corpora, fully offline """
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+import coverage_orchestrator as co
+from build.cache import build
+from synthetic import generate_corpus
+
+RESULTS_DIR = ROOT_DIR / "artifacts/benchmarks"
+# Read before sandbox() repoints the module at a work dir
+STANDARD_BINARY = co.BINARY_PATH
+STANDARD_HARNESS = co.HARNESS_PATH
+DEFAULT_SIZES = "100,1000"
+STAGES = ["extract", "save_test_cases", "replay", "gcov_report", "replay_harness"]
+
+
+def dir_files(path) -> dict:
+    """
+    {(device, inode): (size, link count)} for every file under path, so a
+    hardlink is counted once.
+    """
+    files = {}
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                st = os.lstat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            files[(st.st_dev, st.st_ino)] = (st.st_size, st.st_nlink)
+    return files
+
+
+def bytes_written(before: dict, after: dict) -> int:
+    """
+    Growth of files that existed before plus the size of new files. New
+    names for files that already exist elsewhere (hardlinks) cost nothing.
+    """
+    total = 0
+    for key, (size, nlink) in after.items():
+        if key in before:
+            total += max(0, size - before[key][0])
+        elif nlink == 1:
+            total += size
+    return total
+
+
+def peak_rss_mb() -> tuple[float, float]:
+    """
+    Peak RSS so far of this process and of its largest waited-for child
+    (tcc, gcov, the replay workers), in MB. Both only ever grow.
+    """
+    return (
+        round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    )
+
+
+class StageTimer:
+    """
+    Records wall time, inputs/sec, peak RSS and the bytes a stage adds to the
+    benchmark's work directory.
+    """
+
+    def __init__(self, workdir, verbose=False):
+        self.workdir = Path(workdir)
+        self.verbose = verbose
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        counts = {"inputs": 0}
+        before = dir_files(self.workdir)
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            if not self.verbose:
+                stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+            yield counts
+        seconds = time.perf_counter() - start
+        rss, children_rss = peak_rss_mb()
+        self.stages[name] = {
+            "seconds": round(seconds, 3),
+            "inputs": counts["inputs"],
+            "inputs_per_sec": round(counts["inputs"] / seconds, 1) if seconds else None,
+            "peak_rss_mb": rss,
+            "children_peak_rss_mb": children_rss,
+            "disk_bytes_written": bytes_written(before, dir_files(self.workdir)),
+        }
+        print(f"    {name:<16} {seconds:8.2f}s  {self.stages[name]['inputs_per_sec'] or 0:>9.1f} inputs/s")
+
+
+def sandbox(workdir: Path, dirs: dict, harness=False):
+    """
+    Point coverage_orchestrator at workdir, so a benchmark never touches the
+    real corpus, profiles or snapshots.
+    """
+    bin_dir = workdir / "bin"
+    bin_dir.mkdir(parents=True)
+    names = ["tcc", "tcc.gcno"]
+    if harness:
+        names += [STANDARD_HARNESS.name, f"{STANDARD_HARNESS.name}.gcno"]
+    for name in names:
+        shutil.copy2(STANDARD_BINARY.parent / name, bin_dir / name)
+
+    co.BINARY_PATH = bin_dir / "tcc"
+    co.HARNESS_PATH = bin_dir / STANDARD_HARNESS.name
+    co.KLEE_OUTPUT_DIR = dirs["klee"]
+    co.AFL_OUTPUT_DIR = dirs["afl"]
+    co.LLM_OUTPUT_DIR = dirs["llm"]
+    co.GCDA_DIR = workdir / "coverage_data"
+    co.GCOV_REPORT_DIR = workdir / "coverage_report"
+    co.TEST_CASES_DIR = workdir / "test_cases"
+    co.RESULTS_DIR = workdir / "final-results"
+    co.WORKERS_DIR = workdir / "workers"
+    co.GCDA_DIR.mkdir()
+    co.GCOV_REPORT_DIR.mkdir()
+
+
+@contextlib.contextmanager
+def gcov_prefix(workdir: Path):
+    """
+    The .gcda path is baked into the binary, so a serial replay would write
+    the real profile. Prefix it into the work dir, then move it next to the
+    sandboxed copy. Parallel workers already set their own prefix, and
+    gcov-tool must not see one when it merges them.
+    """
+    prefix_dir = workdir / "profile"
+    os.environ["GCOV_PREFIX"] = str(prefix_dir)
+    try:
+        yield
+    finally:
+        del os.environ["GCOV_PREFIX"]
+    for gcda in prefix_dir.rglob("*.gcda"):
+        gcda.replace(co.BINARY_PATH.parent / gcda.name)
+
+
+def run_size(size: int, jobs: int, verbose=False, keep=False, harness=False) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench_{size}_"))
+    try:
+        start = time.perf_counter()
+        dirs = generate_corpus(workdir / "inputs", size)
+        generate_seconds = time.perf_counter() - start
+        sandbox(workdir, dirs, harness)
+        timer = StageTimer(workdir, verbose)
+        print(f"[*] {size} inputs, {jobs} replay job(s), work dir {workdir}")
+
+        with timer.stage("extract") as counts:
+            klee = list(co.extract_all_klee_inputs(co.KLEE_OUTPUT_DIR))
+            afl = co.extract_all_afl_inputs(co.AFL_OUTPUT_DIR)
+            llm = co.extract_llm_generated_tests(co.LLM_OUTPUT_DIR)
+            seeds = co.extract_afl_generated_tests(dirs["seed"])
+            counts["inputs"] = len(klee) + len(afl) + len(llm) + len(seeds)
+
+        with timer.stage("save_test_cases") as counts:
+            co.save_test_cases(klee, afl, llm, seeds)
+            counts["inputs"] = len(klee) + len(afl) + len(llm) + len(seeds)
+
+        test_cases = co.CorpusStore(co.TEST_CASES_DIR).entries()
+        with timer.stage("replay") as counts:
+            with gcov_prefix(workdir) if jobs <= 1 else contextlib.nullcontext():
+                co.replay_test_cases(
+                    test_cases, jobs=jobs, input_file=workdir / "temp_input.c"
+                )
+            counts["inputs"] = len(test_cases)
+
+        with timer.stage("gcov_report") as counts:
+            model, _ = co.generate_gcov_report()
+            counts["inputs"] = len(test_cases)
+
+        harness_percent = None
+        if harness:
+            # Same corpus again through the persistent harness, from an empty
+            # profile, so both replays and their coverage can be compared
+            for gcda in co.BINARY_PATH.parent.glob("*.gcda"):
+                gcda.unlink()
+            with timer.stage("replay_harness") as counts:
+                with gcov_prefix(workdir) if jobs <= 1 else contextlib.nullcontext():
+                    co.replay_test_cases(
+                        test_cases,
+                        jobs=jobs,
+                        harness=True,
+                        input_file=workdir / "temp_input.c",
+                    )
+                counts["inputs"] = len(test_cases)
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                harness_model, _ = co.generate_gcov_report()
+            harness_percent = harness_model.line_percent
+
+        return {
+            "size": size,
+            "test_cases": len(test_cases),
+            "generate_seconds": round(generate_seconds, 3),
+            "line_percent": model.line_percent,
+            "harness_line_percent": harness_percent,
+            "total_seconds": round(sum(s["seconds"] for s in timer.stages.values()), 3),
+            "stages": timer.stages,
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_commit() -> tuple[str, bool]:
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=ROOT_DIR, capture_output=True, text=True
+        ).stdout.strip()
+
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(
+        git("status", "--porcelain", "--untracked-files=no")
+    )
+
+
+def compare(old: dict, new: dict) -> str:
+    """
+    Per-stage wall time of new against old, matched by corpus size. A ratio
+    above 1 means new is slower.
+    """
+    rows = [f"{'size':>6}  {'stage':<16} {'old s':>8} {'new s':>8} {'ratio':>6}"]
+    old_runs = {run["size"]: run for run in old["runs"]}
+    for run in new["runs"]:
+        before = old_runs.get(run["size"])
+        if not before:
+            continue
+        for stage in STAGES + ["total"]:
+            if stage == "total":
+                old_s, new_s = before["total_seconds"], run["total_seconds"]
+            elif stage in before["stages"] and stage in run["stages"]:
+                old_s = before["stages"][stage]["seconds"]
+                new_s = run["stages"][stage]["seconds"]
+            else:
+                continue
+            ratio = new_s / old_s if old_s else float("inf")
+            rows.append(
+                f"{run['size']:>6}  {stage:<16} {old_s:>8.2f} {new_s:>8.2f} {ratio:>6.2f}"
+            )
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the coverage pipeline stages on synthetic corpora"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help="Comma-separated corpus sizes, e.g. 100,1000,10000",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Replay workers, as coverage_orchestrator --jobs"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Result JSON path (default: artifacts/benchmarks/<timestamp>_<commit>.json)",
+    )
+    parser.add_argument(
+        "--compare", default=None, help="Earlier result JSON to compare against"
+    )
+    parser.add_argument(
+        "--harness",
+        action="store_true",
+        help="Also replay through the persistent tcc_harness (replay_harness stage)",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep each size's work directory"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show the pipeline's own output"
+    )
+    args = parser.parse_args()
+
+    # Nothing here calls an LLM, but never let a stray import reach the network
+    os.environ.setdefault("LLM_BACKEND", "mock")
+    build("gcov_bin")
+    if args.harness:
+        build("harness_bin")
+
+    commit, dirty = git_commit()
+    result = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "jobs": args.jobs,
+        "harness": args.harness,
+        "runs": [],
+    }
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        result["runs"].append(
+            run_size(size, args.jobs, args.verbose, args.keep, args.harness)
+        )
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"[+] Results saved to {output}")
+
+    if args.compare:
+        print(compare(json.loads(Path(args.compare).read_text()), result))
+
+
+if __name__ == "__main__":
+    main()
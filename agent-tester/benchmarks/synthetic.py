@@ -0,0 +1,92 @@
+import random
+import struct
+import sys
+from pathlib import Path
+
+""" Synthetic corpora for the benchmarks: LLM test files, AFL queues and KLEE ktests laid out the way each tool writes them """
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from llm.generate import MOCK_PROGRAMS
+
+# How a corpus of n inputs is split between the tools
+SOURCE_SHARES = {"llm": 0.4, "afl": 0.3, "klee": 0.2, "seed": 0.1}
+
+
+def program(rng: random.Random, n: int) -> str:
+    """
+    One small C program from the mock LLM templates. The trailing comment
+    keeps every program unique, so the corpus store never dedups them.
+    """
+    return rng.choice(MOCK_PROGRAMS).format(
+        a=rng.randint(1, 64), b=rng.randint(1, 64), c=rng.randint(1, 8)
+    ) + f"\n// synthetic {n}\n"
+
+
+def write_ktest(path, objects):
+    """
+    Write a version 3 .ktest file with no arguments, objects being
+    (name, bytes) pairs.
+    """
+    data = [b"KTEST", struct.pack(">iiiii", 3, 0, 0, 0, len(objects))]
+    for name, blob in objects:
+        data.append(struct.pack(">i", len(name)) + name.encode())
+        data.append(struct.pack(">i", len(blob)) + blob)
+    Path(path).write_bytes(b"".join(data))
+
+
+def split_counts(total: int) -> dict[str, int]:
+    counts = {name: int(total * share) for name, share in SOURCE_SHARES.items()}
+    counts["llm"] += total - sum(counts.values())
+    return counts
+
+
+def generate_corpus(root, total: int, seed: int = 0) -> dict[str, Path]:
+    """
+    Write total inputs under root, split across the tool output trees the
+    coverage orchestrator reads. Returns each tree's directory.
+    """
+    root = Path(root)
+    rng = random.Random(seed)
+    counts = split_counts(total)
+    dirs = {
+        "llm": root / "llm-testgen",
+        "seed": root / "generated_seeds",
+        "afl": root / "afl/output",
+        "klee": root / "klee/klee_output",
+    }
+    n = 0
+
+    dirs["llm"].mkdir(parents=True, exist_ok=True)
+    for i in range(counts["llm"]):
+        (dirs["llm"] / f"test_{i:03d}.c").write_text(program(rng, n))
+        n += 1
+
+    dirs["seed"].mkdir(parents=True, exist_ok=True)
+    for i in range(counts["seed"]):
+        (dirs["seed"] / f"seed{i + 1}.c").write_text(program(rng, n))
+        n += 1
+
+    # Two instances of one campaign, as a -M/-S run leaves them
+    for i in range(counts["afl"]):
+        queue = dirs["afl"] / "run_bench" / ("main", "secondary_1")[i % 2] / "queue"
+        queue.mkdir(parents=True, exist_ok=True)
+        (queue / f"id:{i:06d},time:0,execs:{i},op:havoc").write_text(program(rng, n))
+        n += 1
+
+    # Source split over input_1/input_2, NUL-terminated like the rewrites
+    klee_dir = dirs["klee"] / "run_bench_tcc_klee"
+    klee_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(counts["klee"]):
+        lines = program(rng, n).encode().split(b"\n")
+        half = len(lines) // 2
+        write_ktest(
+            klee_dir / f"test{i + 1:06d}.ktest",
+            [
+                ("input_1", b"\n".join(lines[:half]) + b"\0"),
+                ("input_2", b"\n".join(lines[half:]) + b"\0\0\0"),
+            ],
+        )
+        n += 1
+    return dirs
@@ -0,0 +1,98 @@
+/*
+ * AFL++ persistent-mode harness.
+ *
+ * Compiles each fuzz input in-process with libtcc instead of starting tcc
+ * once per exec with the input file on the command line (@@):
+ *   - the forkserver is deferred until after libtcc is initialised, so every
+ *     child starts from a warmed-up process,
+ *   - __AFL_LOOP runs many inputs in the same child before it is re-forked,
+ *   - inputs arrive through shared memory (__AFL_FUZZ_TESTCASE_BUF), so no
+ *     input file is written or read.
+ *
+ * Each input is compiled to an in-memory object (like `tcc -c`) with the
+ * options in HARNESS_TCC_OPTIONS (the include paths the coverage replay uses,
+ * set by the Makefile); diagnostics are discarded. Input is treated as a C
+ * string, so it ends at the first NUL.
+ *
+ * Usage: afl-fuzz -i seeds -o out -- tcc_afl_persistent
+ */
+
+#define main tcc_main
+#include "tcc.c"
+#undef main
+
+/* tcc.h redirects the libc allocators for its own sources */
+#undef malloc
+#undef realloc
+#undef free
+
+#include <unistd.h>
+
+#define PERSISTENT_ITERATIONS 10000
+
+#ifndef HARNESS_TCC_OPTIONS
+#define HARNESS_TCC_OPTIONS ""
+#endif
+
+/* Plain compilers: read a single input from stdin, so the harness still runs */
+#ifndef __AFL_FUZZ_TESTCASE_LEN
+ssize_t fuzz_len;
+unsigned char fuzz_buf[1024000];
+#define __AFL_FUZZ_TESTCASE_LEN fuzz_len
+#define __AFL_FUZZ_TESTCASE_BUF fuzz_buf
+#define __AFL_FUZZ_INIT() void sync(void);
+#define __AFL_LOOP(x) \
+    ((fuzz_len = read(0, fuzz_buf, sizeof(fuzz_buf))) > 0 ? 1 : 0)
+#define __AFL_INIT() sync()
+#endif
+
+__AFL_FUZZ_INIT();
+
+static void discard_error(void *opaque, const char *msg)
+{
+}
+
+static int compile_input(const char *src)
+{
+    TCCState *s = tcc_new();
+    int ret;
+
+    tcc_set_error_func(s, NULL, discard_error);
+    tcc_set_options(s, HARNESS_TCC_OPTIONS);
+    tcc_set_output_type(s, TCC_OUTPUT_OBJ);
+    ret = tcc_compile_string(s, src);
+    tcc_delete(s);
+    return ret;
+}
+
+int main(int argc, char **argv)
+{
+    unsigned char *buf;
+    char *src = NULL;
+    size_t cap = 0;
+
+    /* One throwaway compile pays for libtcc's lazy set-up before the fork */
+    compile_input("int main(void) { return 0; }");
+
+#ifdef __AFL_HAVE_MANUAL_CONTROL
+    __AFL_INIT();
+#endif
+
+    /* Must be taken after __AFL_INIT() */
+    buf = __AFL_FUZZ_TESTCASE_BUF;
+
+    while (__AFL_LOOP(PERSISTENT_ITERATIONS)) {
+        size_t len = __AFL_FUZZ_TESTCASE_LEN;
+
+        if (len + 1 > cap) {
+            cap = len + 1;
+            src = realloc(src, cap);
+        }
+        memcpy(src, buf, len);
+        src[len] = '\0';
+        compile_input(src);
+    }
+
+    free(src);
+    return 0;
+}
@@ -0,0 +1,112 @@
+/*
+ * Persistent replay harness for coverage runs.
+ *
+ * Runs tcc's own main() once per input instead of once per process, so a
+ * replay pays for one process start-up and one .gcda write per batch rather
+ * than per test case.
+ *
+ * Unlike tcc_afl_persistent.c it does not use tcc_compile_string(). Coverage
+ * replay has to produce the same profile as running `tcc -c` per input, and
+ * that includes main()'s option parsing, opening the source file and writing
+ * the object file. So the input still goes through a scratch file and
+ * tcc_main(); only the process start-up and the .gcda write are saved.
+ * benchmarks/bench_coverage.py --harness measures the difference.
+ *
+ * Usage: tcc_harness <scratch file> <tcc args...>
+ *
+ * Protocol (stdin/stdout, little-endian uint32):
+ *   request: <len> <len bytes of input>  -> input is written to the scratch
+ *            file, tcc main() runs with <tcc args>, reply: <exit code>
+ *   request: 0xffffffff                  -> counters are dumped to the .gcda
+ *            and reset, reply: 0
+ * EOF on stdin ends the harness; remaining counters are written at exit.
+ */
+
+#define main tcc_main
+#include "tcc.c"
+#undef main
+
+/* tcc.h redirects the libc allocators for its own sources */
+#undef malloc
+#undef realloc
+#undef free
+
+#include <fcntl.h>
+#include <unistd.h>
+
+#define FLUSH_REQUEST 0xffffffffu
+
+extern void __gcov_dump(void);
+extern void __gcov_reset(void);
+
+static int read_full(void *buf, size_t len)
+{
+    return fread(buf, 1, len, stdin) == len;
+}
+
+static void reply(FILE *proto, int value)
+{
+    fwrite(&value, sizeof value, 1, proto);
+    fflush(proto);
+}
+
+int main(int argc, char **argv)
+{
+    FILE *proto;
+    char *buf = NULL;
+    size_t cap = 0;
+    uint32_t len;
+    int devnull;
+
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s <scratch file> <tcc args...>\n", argv[0]);
+        return 2;
+    }
+
+    /* Keep the protocol on a private stream; tcc's own output is discarded */
+    proto = fdopen(dup(STDOUT_FILENO), "wb");
+    devnull = open("/dev/null", O_WRONLY);
+    dup2(devnull, STDOUT_FILENO);
+    dup2(devnull, STDERR_FILENO);
+    close(devnull);
+
+    while (read_full(&len, sizeof len)) {
+        FILE *scratch;
+        char **tcc_argv;
+        int i, ret;
+
+        if (len == FLUSH_REQUEST) {
+            __gcov_dump();
+            __gcov_reset();
+            reply(proto, 0);
+            continue;
+        }
+
+        if (len > cap) {
+            cap = len;
+            buf = realloc(buf, cap);
+        }
+        if (len && !read_full(buf, len))
+            break;
+
+        scratch = fopen(argv[1], "wb");
+        if (!scratch)
+            return 2;
+        fwrite(buf, 1, len, scratch);
+        fclose(scratch);
+
+        /* tcc may rewrite argv while parsing options, hand it a fresh copy */
+        tcc_argv = malloc(sizeof(char *) * argc);
+        tcc_argv[0] = "tcc";
+        for (i = 2; i < argc; i++)
+            tcc_argv[i - 1] = argv[i];
+        tcc_argv[argc - 1] = NULL;
+
+        ret = tcc_main(argc - 1, tcc_argv);
+        free(tcc_argv);
+        reply(proto, ret);
+    }
+
+    free(buf);
+    return 0;
+}
@@ -1,21 +1,24 @@
-import os
+import asyncio
+import sys
 import argparse
-import google.generativeai as genai
 from pathlib import Path
 from dotenv import load_dotenv
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
 load_dotenv(ROOT_DIR / ".env")
 
-SEED_DELIMITER = "---"
-
+from llm.cache import get_cache
+from llm.context import CONTEXT_TOKENS, build_context
+from llm.generate import (
+    DEFAULT_CONCURRENCY,
+    generate_many,
+    get_backend,
+    split_counts,
+)
+from llm.validate import filter_valid
 
-def init_gemini():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise EnvironmentError("Please set the GEMINI_API_KEY environment variable.")
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel("gemini-2.0-flash")
+SEED_DELIMITER = "---"
 
 
 def read_c_programs_with_filenames(src_dir: str) -> list[tuple[str, str]]:
@@ -29,11 +32,9 @@ def read_c_programs_with_filenames(src_dir: str) -> list[tuple[str, str]]:
     return program_files
 
 
-def format_prompt(
-    programs: list[tuple[str, str]], num_seeds: int, additional_prompt: str = ""
-) -> str:
+def format_prompt(context: str, num_seeds: int, additional_prompt: str = "") -> str:
     header = f"""
-    You are helping fuzz a C program. The codebase consists of several C files listed below.
+    You are helping fuzz a C program. Below are the functions of its codebase with the lowest coverage so far.
 
     Please generate {num_seeds} diverse inputs that may trigger different execution paths or edge cases in the program.
     - Inputs should be realistic for the program under test
@@ -52,15 +53,10 @@ def format_prompt(
 
     Please format individual seeds as the program would require via file input.
 
-    C programs:
+    Source functions (file, line range and current line coverage in each header comment):
     """
 
-    program_sections = []
-    for filename, content in programs:
-        if filename == "tcc.c":
-            program_sections.append(f"""{filename}:\n\"\"\"\n{content}\n\"\"\"""")
-
-    final_prompt = header.strip() + "\n\n" + "\n\n".join(program_sections)
+    final_prompt = header.strip() + "\n\n" + context + "\n\n"
 
     final_prompt += (
         f"Additional Instructions to Follow Closely: \n\n{additional_prompt}"
@@ -70,15 +66,37 @@ def format_prompt(
 
 
 def prompt_for_seeds(
-    model, programs: list[tuple[str, str]], num_seeds: int, additional_prompt: str
+    backend,
+    context: str,
+    num_seeds: int,
+    additional_prompt: str,
+    output_dir=None,
+    concurrency=DEFAULT_CONCURRENCY,
 ) -> list:
-    prompt = format_prompt(programs, num_seeds, additional_prompt)
-    try:
-        response = model.generate_content(prompt)
-        return parse_seeds(response.text)
-    except Exception as e:
-        print(f"[!] Error during LLM generation: {e}")
-        return []
+    """
+    Request the seeds as several smaller concurrent prompts. Seeds tcc rejects
+    are dropped; with output_dir, the rest of each response's seeds are saved
+    as soon as it arrives.
+    """
+    prompts = [
+        format_prompt(context, count, additional_prompt)
+        for count in split_counts(num_seeds)
+    ]
+    seeds = []
+
+    async def on_result(_, text):
+        # tcc checks the seeds off the event loop, other responses keep arriving
+        new_seeds = await asyncio.to_thread(
+            filter_valid, [seed.strip("```") for seed in parse_seeds(text)], "afl-seeds"
+        )
+        if output_dir:
+            save_seeds(new_seeds, output_dir, start=len(seeds) + 1)
+        seeds.extend(new_seeds)
+
+    generate_many(
+        backend, prompts, on_result, concurrency=concurrency, cache=get_cache()
+    )
+    return seeds
 
 
 def parse_seeds(text: str) -> list:
@@ -90,14 +108,46 @@ def parse_seeds(text: str) -> list:
     return [s for s in seeds if s]
 
 
-def save_seeds(seeds: list, output_dir: str):
+def save_seeds(seeds: list, output_dir: str, start: int = 1):
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
-    for i, seed in enumerate(seeds, start=1):
+    for i, seed in enumerate(seeds, start=start):
         with open(output_path / f"seed{i}.c", "w") as f:
             f.write(seed.strip("```"))
 
 
+def generate_seeds(
+    num_seeds: int,
+    additional_prompt: str = "",
+    src_dir=ROOT_DIR / "c_program/src",
+    out_dir=ROOT_DIR / "artifacts/afl/generated_seeds",
+    context_tokens=CONTEXT_TOKENS,
+    concurrency=DEFAULT_CONCURRENCY,
+) -> list:
+    """
+    Generate num_seeds seeds from the least-covered functions in src_dir and
+    save them to out_dir. Returns the seeds.
+    """
+    print(f"[+] Initializing LLM backend...")
+    backend = get_backend()
+
+    print(f"[+] Selecting least-covered functions from: {src_dir}")
+    context = build_context(context_tokens, src_dir)
+
+    print(f"[+] Requesting {num_seeds} seed inputs...")
+    seeds = prompt_for_seeds(
+        backend,
+        context,
+        num_seeds,
+        additional_prompt,
+        output_dir=out_dir,
+        concurrency=concurrency,
+    )
+    if seeds:
+        print(f"[+] Saved {len(seeds)} seeds to {out_dir}")
+    return seeds
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate seed inputs for a combined C program using Gemini."
@@ -121,25 +171,36 @@ def main():
         help="Additional Prompt to Fine Tune Generated Seeds",
     )
 
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=CONTEXT_TOKENS,
+        help="Token budget for the least-covered source functions put in the prompt",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum number of LLM requests in flight",
+    )
+
     args = parser.parse_args()
     src_dir = (ROOT_DIR / args.src_dir).resolve()
     out_dir = (ROOT_DIR / args.out_dir).resolve()
 
-    print(f"[+] Initializing Gemini model...")
-    model = init_gemini()
-
-    print(f"[+] Reading C files from: {src_dir}")
-    programs = read_c_programs_with_filenames(src_dir)
-
-    print(f"[+] Requesting {args.num_seeds} seed inputs...")
-    seeds = prompt_for_seeds(model, programs, args.num_seeds, args.additional_prompt)
+    seeds = generate_seeds(
+        args.num_seeds,
+        args.additional_prompt,
+        src_dir,
+        out_dir,
+        context_tokens=args.context_tokens,
+        concurrency=args.concurrency,
+    )
 
     if not seeds:
         print("[!] No seeds generated. Exiting.")
         return
 
-    print(f"[+] Saving {len(seeds)} seeds to {out_dir}")
-    save_seeds(seeds, out_dir)
     print("[✓] Done.")
 
 
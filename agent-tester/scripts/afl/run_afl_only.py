@@ -1,12 +1,16 @@
 import os
 import sys
 import argparse
+import signal
 import subprocess
+import time
 from datetime import datetime
 
 # Dynamically resolve project root (assumes script is 2 levels deep under root)
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
-sys.path.insert(0, ROOT_DIR)  # Ensure internal packages can be imported
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))  # Ensure internal packages can be imported
+
+from afl.telemetry import AflMonitor, format_status, save_summary
 
 
 def rel_path(path):
@@ -28,10 +32,70 @@ def find_latest_binary(directory):
     return max(candidates, key=os.path.getmtime)
 
 
-def run_afl(binary_path, input_dir, output_dir, timeout=60, max_runtime=300):
+# Rotated across secondaries so the instances explore the queue differently
+POWER_SCHEDULES = ["explore", "coe", "lin", "quad", "exploit", "rare"]
+
+
+def instance_roles(instances, power_schedules=False, cmplog_binary=None):
+    """
+    Return (name, afl-fuzz flags) for each instance: one -M main and
+    instances - 1 -S secondaries. A single instance keeps AFL's default layout.
+    """
+    if instances <= 1:
+        return [("default", [])]
+
+    roles = [("main", ["-M", "main"])]
+    for i in range(1, instances):
+        name = f"secondary_{i}"
+        flags = ["-S", name]
+        if power_schedules:
+            flags += ["-p", POWER_SCHEDULES[(i - 1) % len(POWER_SCHEDULES)]]
+        # CMPLOG is expensive per exec, so only every third secondary uses it
+        if cmplog_binary and i % 3 == 1:
+            flags += ["-c", cmplog_binary]
+        roles.append((name, flags))
+    return roles
+
+
+def stop_instances(procs, grace=30):
+    """
+    SIGINT every afl-fuzz still running so it writes its final stats and queue,
+    then kill whatever has not exited after the grace period.
+    """
+    for proc in procs:
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGINT)
+    for proc in procs:
+        try:
+            proc.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def run_afl(
+    binary_path,
+    input_dir,
+    output_dir,
+    timeout=60,
+    max_runtime=300,
+    instances=1,
+    power_schedules=False,
+    cmplog_binary=None,
+    plateau_seconds=None,
+    poll_interval=5,
+    persistent=False,
+):
     """
     timeout: per-input timeout in seconds (AFL -t)
-    max_runtime: total fuzzing time in seconds (Python subprocess timeout)
+    max_runtime: total fuzzing time in seconds, after which every instance is
+    stopped with SIGINT
+    instances: number of afl-fuzz processes sharing output_dir as sync dir
+    plateau_seconds: stop early once no instance has found a new path for this long
+    persistent: binary is the persistent-mode harness, which takes its input
+    from AFL's shared memory instead of an @@ file
+
+    Returns the final telemetry summary, also saved as telemetry.json in output_dir.
     """
     os.makedirs(output_dir, exist_ok=True)
 
@@ -43,25 +107,73 @@ def run_afl(binary_path, input_dir, output_dir, timeout=60, max_runtime=300):
         with open(os.path.join(input_dir, "empty.txt"), "w") as f:
             f.write("")
 
-    print(f"[+] Running AFL++ on binary: {binary_path}")
-    cmd = [
-        "afl-fuzz",
-        "-i",
-        input_dir,
-        "-o",
-        output_dir,
-        "-t",
-        str(timeout * 1000),  # ms
-        "--",
-        binary_path,
-        "@@",
-    ]
-
-    print(f"[>] Executing command: {' '.join(cmd)}")
+    print(f"[+] Running AFL++ on binary: {binary_path} with {instances} instance(s)")
+    procs = []
+    logs = []
+    monitor = AflMonitor(output_dir)
     try:
-        subprocess.run(cmd, timeout=max_runtime, check=True)
-    except subprocess.TimeoutExpired:
-        print(f"[!] AFL run exceeded {max_runtime} seconds. Terminating...")
+        for i, (name, role_flags) in enumerate(
+            instance_roles(instances, power_schedules, cmplog_binary)
+        ):
+            cmd = [
+                "afl-fuzz",
+                "-i",
+                input_dir,
+                "-o",
+                output_dir,
+                *role_flags,
+                "-t",
+                str(timeout * 1000),  # ms
+                "--",
+                binary_path,
+                *([] if persistent else ["@@"]),
+            ]
+            print(f"[>] Executing command: {' '.join(cmd)}")
+            if i == 0:
+                procs.append(subprocess.Popen(cmd))
+                continue
+
+            # Only the first instance owns the terminal UI
+            log = open(os.path.join(output_dir, f"{name}.log"), "w")
+            logs.append(log)
+            procs.append(
+                subprocess.Popen(
+                    cmd,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    env={**os.environ, "AFL_NO_UI": "1"},
+                )
+            )
+
+        deadline = time.monotonic() + max_runtime
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"[!] AFL run reached {max_runtime} seconds. Stopping...")
+                break
+            try:
+                returncode = procs[0].wait(timeout=min(poll_interval, remaining))
+                if returncode != 0:
+                    raise subprocess.CalledProcessError(returncode, "afl-fuzz")
+                break
+            except subprocess.TimeoutExpired:
+                pass
+
+            summary = monitor.poll()
+            if not summary:
+                continue
+            print(format_status(summary), flush=True)
+            if plateau_seconds and summary["seconds_since_last_find"] >= plateau_seconds:
+                print(f"[!] No new paths for {plateau_seconds} seconds. Stopping early...")
+                break
+    finally:
+        stop_instances(procs)
+        for log in logs:
+            log.close()
+
+    summary = monitor.poll()
+    save_summary(output_dir, summary)
+    return summary
 
 
 if __name__ == "__main__":
@@ -88,7 +200,35 @@ if __name__ == "__main__":
         "--max-runtime",
         type=int,
         default=300,
-        help="Max duration to run AFL (in seconds) before killing the process",
+        help="Max duration to run AFL (in seconds) before stopping it with SIGINT",
+    )
+
+    parser.add_argument(
+        "--instances",
+        type=int,
+        default=1,
+        help="Number of afl-fuzz instances (one -M main, the rest -S secondaries)",
+    )
+    parser.add_argument(
+        "--power-schedules",
+        action="store_true",
+        help="Give each secondary a different power schedule (-p)",
+    )
+    parser.add_argument(
+        "--plateau-seconds",
+        type=int,
+        default=None,
+        help="Stop early when no new paths have been found for this many seconds",
+    )
+    parser.add_argument(
+        "--persistent",
+        action="store_true",
+        help="Binary is the persistent-mode harness (input via shared memory, no @@)",
+    )
+    parser.add_argument(
+        "--cmplog-binary",
+        default=None,
+        help="CMPLOG-instrumented binary used by some secondaries (-c)",
     )
 
     args = parser.parse_args()
@@ -108,4 +248,9 @@ if __name__ == "__main__":
         run_dir,
         timeout=args.timeout,
         max_runtime=args.max_runtime,
+        instances=args.instances,
+        power_schedules=args.power_schedules,
+        cmplog_binary=rel_path(args.cmplog_binary) if args.cmplog_binary else None,
+        plateau_seconds=args.plateau_seconds,
+        persistent=args.persistent,
     )
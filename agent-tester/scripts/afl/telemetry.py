@@ -0,0 +1,173 @@
+import json
+import os
+import time
+from pathlib import Path
+
+""" Live AFL++ telemetry read from the fuzzer_stats and plot_data files every instance keeps in its output directory """
+
+SUMMARY_FILE = "telemetry.json"
+# plot_data column names of the corpus size and row time, AFL++ 4.x first
+CORPUS_COLUMNS = ("corpus_count", "paths_total")
+
+
+def parse_fuzzer_stats(path) -> dict:
+    """
+    Parse a fuzzer_stats file ("key : value" per line) into a dict, turning
+    numbers and percentages into floats.
+    """
+    stats = {}
+    with open(path) as f:
+        for line in f:
+            key, sep, value = line.partition(":")
+            if not sep:
+                continue
+            value = value.strip()
+            try:
+                stats[key.strip()] = float(value.rstrip("%"))
+            except ValueError:
+                stats[key.strip()] = value
+    return stats
+
+
+def parse_plot_row(columns, line) -> dict:
+    """
+    One plot_data row as {column: float}. Fields that are not numbers are
+    left out rather than failing the row.
+    """
+    row = {}
+    for column, value in zip(columns, line.split(",")):
+        try:
+            row[column] = float(value.strip().rstrip("%"))
+        except ValueError:
+            continue
+    return row
+
+
+def row_time(row, start_time):
+    # AFL++ 4.x writes seconds since the start, older versions a unix time
+    if "relative_time" in row and start_time:
+        return start_time + row["relative_time"]
+    return row.get("unix_time")
+
+
+class AflMonitor:
+    """
+    Polls every instance directory under one AFL output (sync) directory. The
+    plot_data files are tailed from the last read offset, so each poll only
+    reads the rows written since the previous one, and only the newest row of
+    each instance is kept.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.plot_offsets = {}
+        self.plot_columns = {}
+        self.plot_rows = {}
+        self.plot_row_counts = {}
+        # Instance -> time its corpus last grew according to plot_data
+        self.plot_last_finds = {}
+
+    def _tail_plot_data(self, name, path, start_time=None):
+        with open(path) as f:
+            f.seek(self.plot_offsets.get(name, 0))
+            while line := f.readline():
+                if not line.endswith("\n"):
+                    # Partially written row, pick it up on the next poll
+                    break
+                self.plot_offsets[name] = f.tell()
+                if line.startswith("#"):
+                    self.plot_columns[name] = [
+                        c.strip() for c in line.lstrip("#").split(",")
+                    ]
+                    continue
+                row = parse_plot_row(self.plot_columns.get(name, []), line)
+                self.plot_row_counts[name] = self.plot_row_counts.get(name, 0) + 1
+                corpus = next((row[c] for c in CORPUS_COLUMNS if c in row), None)
+                previous = self.plot_rows.get(name, {})
+                before = next((previous[c] for c in CORPUS_COLUMNS if c in previous), None)
+                if corpus is not None and before is not None and corpus > before:
+                    self.plot_last_finds[name] = row_time(row, start_time) or time.time()
+                if corpus is not None:
+                    self.plot_rows[name] = row
+
+    def poll(self) -> dict:
+        """
+        Return the campaign summary: per-instance stats plus aggregate execs/sec,
+        corpus size, stability, bitmap coverage and time since the last new path.
+        """
+        instances = {}
+        for stats_path in sorted(self.output_dir.glob("*/fuzzer_stats")):
+            name = stats_path.parent.name
+            try:
+                stats = parse_fuzzer_stats(stats_path)
+            except OSError:
+                continue
+            plot_path = stats_path.parent / "plot_data"
+            if plot_path.exists():
+                self._tail_plot_data(name, plot_path, stats.get("start_time"))
+            instances[name] = stats
+
+        if not instances:
+            return {}
+
+        now = time.time()
+        last_finds = [
+            # last_find is 0 until the first new path, count from the start
+            # then. fuzzer_stats is only rewritten about once a minute, so
+            # corpus growth seen in the newer plot_data rows wins.
+            max(
+                s.get("last_find", s.get("last_path", 0)),
+                s.get("start_time", now),
+                self.plot_last_finds.get(name, 0),
+            )
+            for name, s in instances.items()
+        ]
+        return {
+            "instances": len(instances),
+            "execs_per_sec": round(
+                sum(s.get("execs_per_sec", 0) for s in instances.values()), 2
+            ),
+            "execs_done": int(sum(s.get("execs_done", 0) for s in instances.values())),
+            "corpus_count": int(
+                max(
+                    s.get("corpus_count", s.get("paths_total", 0))
+                    for s in instances.values()
+                )
+            ),
+            "stability": min(s.get("stability", 100.0) for s in instances.values()),
+            "bitmap_cvg": max(s.get("bitmap_cvg", 0.0) for s in instances.values()),
+            "saved_crashes": int(
+                sum(s.get("saved_crashes", 0) for s in instances.values())
+            ),
+            "seconds_since_last_find": round(now - max(last_finds), 1),
+            "plot_rows": sum(self.plot_row_counts.values()),
+            "per_instance": instances,
+        }
+
+
+def format_status(summary: dict) -> str:
+    return (
+        f"[AFL] {summary['instances']} instance(s) | "
+        f"{summary['execs_per_sec']:.0f} execs/s | "
+        f"{summary['corpus_count']} paths | "
+        f"stability {summary['stability']:.2f}% | "
+        f"bitmap {summary['bitmap_cvg']:.2f}% | "
+        f"last new path {summary['seconds_since_last_find']:.0f}s ago"
+    )
+
+
+def save_summary(output_dir, summary: dict):
+    with open(os.path.join(output_dir, SUMMARY_FILE), "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def latest_run_dir(base_output_dir):
+    runs = sorted(Path(base_output_dir).glob("run_*"))
+    return runs[-1] if runs else None
+
+
+def load_summary(run_dir) -> dict:
+    path = Path(run_dir) / SUMMARY_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
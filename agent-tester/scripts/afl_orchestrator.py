@@ -1,41 +1,70 @@
 import os
 import subprocess
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 import argparse
 
+from build.cache import build_many
+from afl.telemetry import format_status
+from corpus.minimize import export_corpus
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 SRC_DIR = REPO_ROOT / "c_program/src"
 BIN_DIR = REPO_ROOT / "artifacts/afl/compiled_afl"
+CMPLOG_DIR = REPO_ROOT / "artifacts/afl/compiled_cmplog"
+PERSISTENT_BIN_DIR = REPO_ROOT / "artifacts/afl/compiled_persistent"
+PERSISTENT_CMPLOG_DIR = REPO_ROOT / "artifacts/afl/compiled_persistent_cmplog"
 SEED_DIR = REPO_ROOT / "artifacts/afl/generated_seeds"
+OUTPUT_DIR = REPO_ROOT / "artifacts/afl/output"
+MINIMIZED_CORPUS_DIR = REPO_ROOT / "artifacts/coverage/minimized_corpus"
+AFL_INPUT_DIR = REPO_ROOT / "artifacts/afl/input"
 
 load_dotenv(".env")
 
 
-def run(cmd, cwd=None):
-    print(f"[>] Running: {' '.join(str(c) for c in cmd)}")
-    subprocess.run(cmd, check=True, cwd=cwd)
+@dataclass
+class AflOptions:
+    num_seeds: int = 10
+    additional_prompt: str = ""
+    afl_runtime: int = 60
+    instances: int = 1
+    plateau_seconds: int | None = None
+    power_schedules: bool = False
+    cmplog: bool = False
+    persistent: bool = False
+    use_minimized_corpus: bool = False
+
 
+@dataclass
+class AflResult:
+    status: str
+    seeds: int = 0
+    run_dir: str | None = None
+    # Final campaign summary from afl.telemetry, without the per-instance stats
+    telemetry: dict = field(default_factory=dict)
 
-def generate_afl_seeds():
+
+def generate_afl_seeds(options: AflOptions) -> int:
     print("[1] Generating AFL seed inputs using Gemini...")
-    run(
-        [
-            "python3",
-            "scripts/afl/generate_afl_seeds.py",
-            "--num-seeds",
-            str(NUM_SEEDS),
-            "--additional-prompt",
-            str(ADDITIONAL_PROMPT),
-        ],
-        cwd=REPO_ROOT,
+    # Pulls in the LLM layer, so only loaded once seeds are actually needed
+    from afl.generate_afl_seeds import generate_seeds
+
+    return len(
+        generate_seeds(options.num_seeds, options.additional_prompt, SRC_DIR, SEED_DIR)
     )
 
 
-def compile_afl_binary():
+def compile_afl_binary(options: AflOptions):
     print(f"[2] Compiling AFL-instrumented binary...")
     # target = "../artifacts/afl/compiled_afl"
-    run(["make", "afl_bin"], cwd=REPO_ROOT / "c_program")
+    target = "afl_persistent_bin" if options.persistent else "afl_bin"
+    cmplog_target = (
+        "afl_persistent_cmplog_bin" if options.persistent else "afl_cmplog_bin"
+    )
+    # The plain and CMPLOG variants build side by side, or come from the cache
+    build_many([target, *([cmplog_target] if options.cmplog else [])])
 
 
 def find_latest_binary(directory: Path) -> Path:
@@ -52,54 +81,89 @@ def find_latest_binary(directory: Path) -> Path:
     return max(candidates, key=lambda p: p.stat().st_mtime)
 
 
-def run_afl_fuzzer(binary_path: Path):
+def prepare_seed_dir(options: AflOptions) -> Path:
+    """
+    Combine the generated seeds with the minimized coverage corpus so AFL starts
+    from every input that already contributes coverage, without redundant ones.
+    """
+    if not options.use_minimized_corpus or not MINIMIZED_CORPUS_DIR.exists():
+        return SEED_DIR
+
+    seeds = [p for p in SEED_DIR.glob("*") if p.is_file()]
+    corpus = sorted(MINIMIZED_CORPUS_DIR.glob("test_case_*.c"))
+    export_corpus(seeds + corpus, AFL_INPUT_DIR)
+    print(f"[+] Seeding AFL with {len(seeds)} generated and {len(corpus)} corpus inputs")
+    return AFL_INPUT_DIR
+
+
+def run_afl_fuzzer(
+    options: AflOptions, binary_path: Path, seed_dir: Path = SEED_DIR
+) -> tuple[Path, dict]:
     print(f"[3] Running AFL fuzzer on {binary_path.name}...")
-    run(
-        [
-            "python3",
-            "scripts/afl/run_afl_only.py",
-            "--binary",
-            str(binary_path),
-            "--seeds",
-            str(SEED_DIR),
-            "--max-runtime",
-            str(AFL_RUNTIME),
-        ],
-        cwd=REPO_ROOT,
+    from afl.run_afl_only import run_afl
+
+    cmplog_dir = PERSISTENT_CMPLOG_DIR if options.persistent else CMPLOG_DIR
+    run_dir = OUTPUT_DIR / f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    summary = run_afl(
+        str(binary_path),
+        str(seed_dir),
+        str(run_dir),
+        max_runtime=options.afl_runtime,
+        instances=options.instances,
+        power_schedules=options.power_schedules,
+        cmplog_binary=(
+            str(cmplog_dir / binary_path.name) if options.cmplog else None
+        ),
+        plateau_seconds=options.plateau_seconds,
+        persistent=options.persistent,
     )
+    return run_dir, summary
 
 
-def full_afl_pipeline():
+def full_afl_pipeline(options: AflOptions | None = None) -> AflResult:
+    options = options or AflOptions()
     src_files = list(SRC_DIR.glob("*.c"))
     if not src_files:
         print("❌ No .c files found in c_program/src/")
-        return
+        return AflResult(status="no sources")
 
     print("🚀 Starting full AFL pipeline...\n")
 
+    result = AflResult(status="ok")
     try:
-        generate_afl_seeds()
-        compile_afl_binary()
+        result.seeds = generate_afl_seeds(options)
+        compile_afl_binary(options)
 
-        binary_path = find_latest_binary(BIN_DIR)
+        binary_path = find_latest_binary(
+            PERSISTENT_BIN_DIR if options.persistent else BIN_DIR
+        )
 
         if not binary_path.exists():
             print(f"❌ Compiled binary not found.")
-            return
+            return AflResult(status="binary not found", seeds=result.seeds)
 
         if not os.access(binary_path, os.X_OK):
             print(f"[!] Binary not executable. Attempting to chmod +x...")
             os.chmod(binary_path, 0o755)
 
-        run_afl_fuzzer(binary_path)
+        run_dir, summary = run_afl_fuzzer(
+            options, binary_path, prepare_seed_dir(options)
+        )
+        result.run_dir = str(run_dir)
+        if summary:
+            print(format_status(summary))
+            result.telemetry = {k: v for k, v in summary.items() if k != "per_instance"}
         print(f"[✓] AFL fuzzing complete.\n")
     except subprocess.CalledProcessError as e:
         print(f"[!] AFL pipeline failed: {e}")
+        result.status = f"failed: {e}"
     except FileNotFoundError as e:
         print(f"[!] {e}")
+        result.status = f"failed: {e}"
+    return result
 
 
-if __name__ == "__main__":
+def parse_options(argv=None) -> AflOptions:
     parser = argparse.ArgumentParser(description="Run AFL fuzzing pipeline")
     parser.add_argument(
         "--num-seeds",
@@ -116,9 +180,40 @@ if __name__ == "__main__":
     parser.add_argument(
         "--afl-runtime", type=int, default=60, help="Maximum runtime for AFL in seconds"
     )
-    args = parser.parse_args()
-    NUM_SEEDS = args.num_seeds
-    AFL_RUNTIME = args.afl_runtime
-    ADDITIONAL_PROMPT = args.additional_prompt
+    parser.add_argument(
+        "--instances",
+        type=int,
+        default=1,
+        help="Number of parallel afl-fuzz instances (one main, the rest secondaries)",
+    )
+    parser.add_argument(
+        "--plateau-seconds",
+        type=int,
+        default=None,
+        help="Stop AFL early when no new paths are found for this many seconds",
+    )
+    parser.add_argument(
+        "--power-schedules",
+        action="store_true",
+        help="Use a different power schedule on each secondary instance",
+    )
+    parser.add_argument(
+        "--cmplog",
+        action="store_true",
+        help="Build a CMPLOG binary and use it on some secondary instances",
+    )
+    parser.add_argument(
+        "--persistent",
+        action="store_true",
+        help="Fuzz the persistent-mode harness (__AFL_LOOP, shared-memory input) instead of tcc with @@",
+    )
+    parser.add_argument(
+        "--use-minimized-corpus",
+        action="store_true",
+        help="Add the minimized coverage corpus to the AFL input seeds",
+    )
+    return AflOptions(**vars(parser.parse_args(argv)))
+
 
-    full_afl_pipeline()
+if __name__ == "__main__":
+    full_afl_pipeline(parse_options())
@@ -0,0 +1,252 @@
+import argparse
+import fcntl
+import functools
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+""" Build-artifact cache for the c_program make targets, keyed by the sources, headers, compiler and exact compile commands """
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+C_PROGRAM_DIR = ROOT_DIR / "c_program"
+CACHE_DIR = ROOT_DIR / "artifacts/build-cache"
+BIN_DIR = ROOT_DIR / "artifacts/standard_binary"
+LLVM_DIR = ROOT_DIR / "artifacts/klee/llvm"
+REWRITE_DIR = ROOT_DIR / "artifacts/klee/rewrite"
+# Cached builds kept across all targets; a gcov build is a few MB
+MAX_ENTRIES = 24
+
+# Outputs of each named make target that are worth keeping
+TARGETS = {
+    "gcov_bin": [BIN_DIR / "tcc", BIN_DIR / "tcc.gcno"],
+    "harness_bin": [BIN_DIR / "tcc_harness", BIN_DIR / "tcc_harness.gcno"],
+    "check_bin": [BIN_DIR / "tcc_check"],
+    "afl_bin": [ROOT_DIR / "artifacts/afl/compiled_afl/tcc"],
+    "afl_cmplog_bin": [ROOT_DIR / "artifacts/afl/compiled_cmplog/tcc"],
+    "afl_persistent_bin": [ROOT_DIR / "artifacts/afl/compiled_persistent/tcc"],
+    "afl_persistent_cmplog_bin": [
+        ROOT_DIR / "artifacts/afl/compiled_persistent_cmplog/tcc"
+    ],
+    "klee_bitcode": [LLVM_DIR / "tcc.bc"],
+}
+# Recipe lines that do not invoke a compiler
+NOT_COMPILERS = {"mkdir", "rm", "cp", "mv"}
+
+
+def tcc_inputs() -> list[Path]:
+    """
+    Every file the tcc builds read: tcc.c includes the other sources, and the
+    harness targets add their driver.
+    """
+    return sorted(
+        path
+        for subdir in ("src", "include", "harness")
+        for path in (C_PROGRAM_DIR / subdir).rglob("*")
+        if path.is_file()
+    )
+
+
+def make_recipe(target: str) -> str:
+    """
+    The commands make would run for target, whether or not it is up to date.
+    They carry the compiler, CFLAGS and any overrides from the environment.
+    """
+    return subprocess.run(
+        ["make", "--no-print-directory", "-n", "-B", target],
+        cwd=C_PROGRAM_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def recipe_compilers(recipe: str) -> list[str]:
+    compilers = []
+    for line in recipe.splitlines():
+        words = shlex.split(line)
+        # Skip environment assignments like AFL_LLVM_CMPLOG=1
+        while words and re.match(r"[A-Za-z_]\w*=", words[0]):
+            words.pop(0)
+        if words and words[0] not in NOT_COMPILERS and words[0] not in compilers:
+            compilers.append(words[0])
+    return compilers
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_version(compiler: str) -> str:
+    path = shutil.which(compiler)
+    if not path:
+        return f"{compiler}: missing"
+    result = subprocess.run([path, "--version"], capture_output=True, text=True)
+    return f"{path}: {result.stdout}"
+
+
+def same_contents(source, dest) -> bool:
+    # Not filecmp.cmp: it caches by (size, mtime), and copy2 keeps the mtime,
+    # so an edit that keeps the size within one mtime tick would look current
+    if os.stat(source).st_size != os.stat(dest).st_size:
+        return False
+    return Path(source).read_bytes() == Path(dest).read_bytes()
+
+
+def build_key(target: str, inputs) -> str:
+    recipe = make_recipe(target)
+    digest = hashlib.sha256(recipe.encode())
+    for compiler in recipe_compilers(recipe):
+        digest.update(compiler_version(compiler).encode())
+    for path in inputs:
+        digest.update(str(Path(path).relative_to(ROOT_DIR)).encode() + b"\0")
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    One directory per build key holding copies of the target's outputs. A hit
+    copies them into place, skipping files that are already identical, so an
+    unchanged tree never reaches make at all.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_entries=MAX_ENTRIES):
+        self.root = Path(root)
+        self.max_entries = max_entries
+
+    def _lock(self, target: str):
+        lock_dir = self.root / "locks"
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        lock = open(lock_dir / f"{Path(target).name}.lock", "w")
+        # Two tool runs building the same target would write the same outputs
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def restore(self, key: str, outputs) -> bool:
+        entry = self.root / key
+        if not all((entry / Path(output).name).exists() for output in outputs):
+            return False
+        for output in outputs:
+            cached = entry / Path(output).name
+            output = Path(output)
+            if output.exists() and same_contents(cached, output):
+                continue
+            output.parent.mkdir(parents=True, exist_ok=True)
+            # Copy to a temp name first: a running tool may hold the old file
+            tmp_path = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+            shutil.copy2(cached, tmp_path)
+            os.replace(tmp_path, output)
+        os.utime(entry)
+        return True
+
+    def store(self, key: str, outputs):
+        tmp_entry = self.root / f"{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        tmp_entry.mkdir(parents=True)
+        for output in outputs:
+            shutil.copy2(output, tmp_entry / Path(output).name)
+        shutil.rmtree(self.root / key, ignore_errors=True)
+        os.replace(tmp_entry, self.root / key)
+        self.evict()
+
+    def evict(self):
+        entries = sorted(
+            (entry for entry in self.root.iterdir() if len(entry.name) == 64),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries[: max(0, len(entries) - self.max_entries)]:
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def build(self, target: str, outputs=None, inputs=None, log=None) -> bool:
+        """
+        Bring target's outputs up to date, from the cache when possible.
+        Returns True on a cache hit; a failing make raises CalledProcessError.
+        """
+        outputs = outputs or TARGETS[target]
+        inputs = tcc_inputs() if inputs is None else inputs
+        with self._lock(target):
+            key = build_key(target, inputs)
+            if self.restore(key, outputs):
+                print(f"[+] Build cache hit for {target} ({key[:12]})")
+                return True
+
+            print(f"[*] Building {target} ({key[:12]})...")
+            subprocess.run(
+                ["make", "-B", target],
+                cwd=C_PROGRAM_DIR,
+                check=True,
+                stdout=log,
+                stderr=subprocess.STDOUT if log else None,
+            )
+            self.store(key, outputs)
+            return False
+
+
+class NoCache(BuildCache):
+    """
+    Always runs make, for BUILD_CACHE=0.
+    """
+
+    def restore(self, key, outputs):
+        return False
+
+    def store(self, key, outputs):
+        pass
+
+
+def get_build_cache():
+    if os.environ.get("BUILD_CACHE", "1") == "0":
+        return NoCache()
+    return BuildCache()
+
+
+def build(target: str, log=None) -> bool:
+    return get_build_cache().build(target, log=log)
+
+
+def build_bitcode(rewrite_name: str, log=None) -> bool:
+    """
+    Compile one KLEE rewrite to artifacts/klee/llvm/<rewrite_name>.bc.
+    """
+    return get_build_cache().build(
+        f"../artifacts/klee/llvm/{rewrite_name}.bc",
+        outputs=[LLVM_DIR / f"{rewrite_name}.bc"],
+        inputs=[REWRITE_DIR / f"{rewrite_name}.c"]
+        + sorted((C_PROGRAM_DIR / "include").glob("*")),
+        log=log,
+    )
+
+
+def build_many(targets, jobs=None) -> dict:
+    """
+    Build several targets side by side, one make per target. Every target
+    is attempted; the first failure is raised once all have finished.
+    """
+    targets = list(dict.fromkeys(targets))
+    cache = get_build_cache()
+    with ThreadPoolExecutor(max_workers=jobs or len(targets) or 1) as pool:
+        futures = {target: pool.submit(cache.build, target) for target in targets}
+    errors = [f.exception() for f in futures.values() if f.exception()]
+    if errors:
+        raise errors[0]
+    return {target: f.result() for target, f in futures.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build c_program targets through the build-artifact cache"
+    )
+    parser.add_argument(
+        "targets", nargs="+", choices=sorted(TARGETS), help="make targets to build"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="Targets built at once (default: all)"
+    )
+    args = parser.parse_args()
+    try:
+        build_many(args.targets, args.jobs)
+    except subprocess.CalledProcessError as e:
+        sys.exit(f"[!] Build failed: {' '.join(e.cmd)} exited {e.returncode}")
@@ -0,0 +1,63 @@
+import heapq
+import os
+import shutil
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from gcov.bitset import CoverageBits, CoverageLayout
+
+
+def coverage_bitmap(model, layout=None) -> int:
+    """
+    Pack the executed lines, taken branches and entered functions of a
+    CoverageModel into one int bitmap. Bit positions follow the model's
+    CoverageLayout, which is fixed by the .gcno, so bitmaps from separate runs
+    of the same binary can be OR-ed and compared directly, and a set cover
+    over them keeps every branch as well as every line. Pass the layout when
+    packing many models of one binary.
+    """
+    layout = layout or CoverageLayout.from_model(model)
+    return CoverageBits.from_model(model, layout).packed(layout)
+
+
+def greedy_set_cover(bitmaps: dict[str, int]) -> list[str]:
+    """
+    Pick inputs until their union covers every line any input covers, always
+    taking the input that adds the most uncovered lines (lazy greedy).
+    """
+    heap = [(-bitmap.bit_count(), key) for key, bitmap in bitmaps.items() if bitmap]
+    heapq.heapify(heap)
+
+    covered = 0
+    selected = []
+    while heap:
+        neg_gain, key = heapq.heappop(heap)
+        gain = (bitmaps[key] & ~covered).bit_count()
+        if gain == 0:
+            continue
+        # Gains only shrink, so a stale entry is re-queued with its real gain
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, key))
+            continue
+        selected.append(key)
+        covered |= bitmaps[key]
+    return selected
+
+
+def export_corpus(test_case_paths, out_dir):
+    """
+    Rebuild out_dir so it holds exactly the given test cases, hardlinked from
+    the corpus where possible.
+    """
+    out_dir = Path(out_dir)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+    for path in test_case_paths:
+        dest = out_dir / Path(path).name
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copyfile(path, dest)
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import mmap
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+INDEX_NAME = "index.jsonl"
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".pack"
+# A segment is closed once it reaches this size and the next one is started
+SEGMENT_BYTES = 64 * 1024 * 1024
+# Segment data is flushed before the index lines that point into it
+FLUSH_EVERY = 1024
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass(frozen=True)
+class CorpusEntry:
+    digest: str
+    segment: int
+    offset: int
+    length: int
+    source: str
+    run_id: str | None = None
+    first_seen: str | None = None
+
+    @property
+    def name(self) -> str:
+        return f"test_case_{self.digest}.c"
+
+    def to_dict(self) -> dict:
+        return {
+            "hash": self.digest,
+            "source": self.source,
+            "run_id": self.run_id,
+            "first_seen": self.first_seen,
+            "segment": self.segment,
+            "offset": self.offset,
+            "length": self.length,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CorpusEntry":
+        return cls(
+            digest=data["hash"],
+            segment=data["segment"],
+            offset=data["offset"],
+            length=data["length"],
+            source=data["source"],
+            run_id=data.get("run_id"),
+            first_seen=data.get("first_seen"),
+        )
+
+
+class CorpusStore:
+    """
+    Content-addressed test-case corpus packed into append-only segment files.
+    Each unique input is appended once to the open segment_<N>.pack, and
+    index.jsonl records its (segment, offset, length) and where it was first
+    seen. Replay streams the segments through mmap instead of opening a file
+    per input.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.index_path = self.root / INDEX_NAME
+        self._entries = None
+        self._maps = {}
+        # Segments shorter than the index says, see _in_bounds
+        self._damaged = set()
+
+    def segment_path(self, segment: int) -> Path:
+        return self.root / f"{SEGMENT_PREFIX}{segment:05d}{SEGMENT_SUFFIX}"
+
+    def _segments(self) -> list[int]:
+        return sorted(
+            int(p.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+            for p in self.root.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")
+        )
+
+    def add_many(self, inputs, source: str) -> int:
+        """
+        Store (run_id, input) pairs from one source (klee/afl/llm/seed), input
+        being text or raw bytes, skipping any input already in the corpus.
+        Returns the number written.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries = self.entries()
+        known = {entry.digest for entry in entries}
+        self.close()
+
+        segments = self._segments()
+        segment = segments[-1] if segments else 0
+        if segment in self._damaged:
+            # Appending would bring the entries cut off its end back into range
+            segment += 1
+        data_file = open(self.segment_path(segment), "ab")
+        pending = []
+        written = 0
+
+        def flush():
+            # Data first, so an index line never points past a segment's end
+            data_file.flush()
+            with open(self.index_path, "a") as index:
+                index.writelines(json.dumps(e.to_dict()) + "\n" for e in pending)
+            entries.extend(pending)
+            pending.clear()
+
+        try:
+            for run_id, data in inputs:
+                if isinstance(data, str):
+                    data = data.encode()
+                digest = content_hash(data)
+                if digest in known:
+                    continue
+                if data_file.tell() >= SEGMENT_BYTES:
+                    flush()
+                    data_file.close()
+                    segment += 1
+                    data_file = open(self.segment_path(segment), "ab")
+                try:
+                    offset = data_file.tell()
+                    data_file.write(data)
+                except OSError as e:
+                    print(f"[!] Failed to append to {self.segment_path(segment)}: {e}")
+                    continue
+                pending.append(
+                    CorpusEntry(
+                        digest=digest,
+                        segment=segment,
+                        offset=offset,
+                        length=len(data),
+                        source=source,
+                        run_id=run_id,
+                        first_seen=datetime.now().isoformat(timespec="seconds"),
+                    )
+                )
+                known.add(digest)
+                written += 1
+                if len(pending) >= FLUSH_EVERY:
+                    flush()
+        finally:
+            flush()
+            data_file.close()
+        return written
+
+    def entries(self) -> list[CorpusEntry]:
+        """
+        Every input in the corpus, in the order it was appended, which is
+        also its order on disk.
+        """
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> list[CorpusEntry]:
+        records = []
+        if self.index_path.exists():
+            with open(self.index_path) as index:
+                records = [json.loads(line) for line in index if line.strip()]
+        if any("segment" not in r for r in records) or any(
+            self.root.glob("test_case_*.c")
+        ):
+            return self._migrate(records)
+        return self._in_bounds([CorpusEntry.from_dict(r) for r in records])
+
+    def _in_bounds(self, entries) -> list[CorpusEntry]:
+        """
+        Drop entries whose bytes are not all in their segment, e.g. after the
+        segment was cut short. They count as unseen, so add_many stores those
+        inputs again, in a new segment.
+        """
+        sizes = {}
+        for segment in {entry.segment for entry in entries}:
+            path = self.segment_path(segment)
+            sizes[segment] = path.stat().st_size if path.exists() else 0
+        kept, dropped = [], []
+        for entry in entries:
+            fits = entry.offset + entry.length <= sizes[entry.segment]
+            (kept if fits else dropped).append(entry)
+        self._damaged = {entry.segment for entry in dropped}
+        if dropped:
+            print(
+                f"[!] Ignoring {len(dropped)} corpus entries past the "
+                f"end of their segment in {self.root}"
+            )
+        return kept
+
+    def _migrate(self, records) -> list[CorpusEntry]:
+        """
+        Pack a corpus written as one test_case_<sha256>.c file per input into
+        segments, keeping its index order and provenance. Files the index does
+        not know are added as "legacy". The new index replaces the old one
+        atomically before the flat files are removed.
+        """
+        flat = {p.name: p for p in self.root.glob("test_case_*.c")}
+        entries = [CorpusEntry.from_dict(r) for r in records if "segment" in r]
+        digests = {entry.digest for entry in entries}
+        legacy = {f"test_case_{r['hash']}.c": r for r in records if "segment" not in r}
+        names = list(legacy) + sorted(set(flat) - set(legacy))
+
+        segments = self._segments()
+        segment = segments[-1] if segments else 0
+        migrated = 0
+        data_file = open(self.segment_path(segment), "ab")
+        try:
+            for name in names:
+                if name not in flat:
+                    continue
+                data = flat[name].read_bytes()
+                digest = content_hash(data)
+                if digest in digests:
+                    continue
+                if data_file.tell() >= SEGMENT_BYTES:
+                    data_file.close()
+                    segment += 1
+                    data_file = open(self.segment_path(segment), "ab")
+                offset = data_file.tell()
+                data_file.write(data)
+                record = legacy.get(name, {})
+                entries.append(
+                    CorpusEntry(
+                        digest=digest,
+                        segment=segment,
+                        offset=offset,
+                        length=len(data),
+                        source=record.get("source", "legacy"),
+                        run_id=record.get("run_id"),
+                        first_seen=record.get("first_seen"),
+                    )
+                )
+                digests.add(digest)
+                migrated += 1
+            data_file.flush()
+            os.fsync(data_file.fileno())
+        finally:
+            data_file.close()
+
+        tmp_path = self.index_path.with_name(f".{INDEX_NAME}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as index:
+            index.writelines(json.dumps(e.to_dict()) + "\n" for e in entries)
+        os.replace(tmp_path, self.index_path)
+        for path in flat.values():
+            path.unlink(missing_ok=True)
+        print(f"[+] Packed {migrated} test case files into {self.root}")
+        return entries
+
+    def _map(self, segment: int, end: int) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            with open(self.segment_path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            self._maps[segment] = mapped
+        return mapped
+
+    def read(self, entry: CorpusEntry) -> bytes:
+        if entry.length == 0:
+            return b""
+        end = entry.offset + entry.length
+        return self._map(entry.segment, end)[entry.offset : end]
+
+    def stream(self, entries=None):
+        """
+        Yield (entry, input) for entries (default: the whole corpus) in the
+        given order. Each segment is mapped once, so a pass in append order
+        reads the corpus front to back.
+        """
+        for entry in self.entries() if entries is None else entries:
+            yield entry, self.read(entry)
+
+    def export(self, entries, out_dir):
+        """
+        Write entries to out_dir as test_case_<sha256>.c files, for tools that
+        take a directory of inputs.
+        """
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for entry, data in self.stream(entries):
+            (out_dir / entry.name).write_bytes(data)
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps = {}
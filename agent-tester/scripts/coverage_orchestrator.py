@@ -1,13 +1,24 @@
+import multiprocessing
 import os
 import sys
 import subprocess
 import argparse
-import re
+import hashlib
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from klee.ktest import KTest
-
-from afl.generate_afl_seeds import read_c_programs_with_filenames
-
+from klee.ktest import input_objects, iter_ktest_objects
+from klee.replay_bridge import is_noise, objects_digest, replay_buffer
+from build.cache import build, same_contents
+from corpus.minimize import coverage_bitmap, greedy_set_cover
+from corpus.store import CorpusStore
+from gcov.bitset import CoverageLayout
+from gcov.gcda import GcdaError, arc_signature
+from gcov.harness import HarnessExited, TccHarness, replay_with_harness
+from gcov.history import HISTORY_NAME, CoverageHistory
+from gcov.model import CoverageModel, format_summary, snapshot_index
 
 """ This is more or less the ground truth, this is where the model gets feedback on how fuzzing, symbolic, and raw test generation are performing """
 
@@ -16,10 +27,24 @@ C_SRC_DIR = REPO_ROOT / "c_program/src"
 KLEE_OUTPUT_DIR = REPO_ROOT / "artifacts/klee/klee_output"
 AFL_OUTPUT_DIR = REPO_ROOT / "artifacts/afl/output"
 BINARY_PATH = REPO_ROOT / "artifacts/standard_binary/tcc"
+HARNESS_PATH = REPO_ROOT / "artifacts/standard_binary/tcc_harness"
 LLM_OUTPUT_DIR = REPO_ROOT / "artifacts/llm-testgen"
 GCDA_DIR = REPO_ROOT / "artifacts/coverage/coverage_data"
 GCOV_REPORT_DIR = REPO_ROOT / "artifacts/coverage/coverage_report"
 TEST_CASES_DIR = REPO_ROOT / "artifacts/coverage/test_cases"
+RESULTS_DIR = REPO_ROOT / "artifacts/final-results"
+WORKERS_DIR = REPO_ROOT / "artifacts/coverage/workers"
+BASELINE_DIR = REPO_ROOT / "artifacts/coverage/baseline"
+BASELINE_MANIFEST = BASELINE_DIR / "manifest.json"
+ATTRIBUTION_FILE = REPO_ROOT / "artifacts/coverage/attribution.json"
+# Bumped when the bitmap layout or how inputs are attributed changes, so old
+# attributions are redone
+ATTRIBUTION_VERSION = 3
+# Attribution profiles per gcov call
+GCOV_BATCH = 64
+# Minimization is abandoned when more of the attributed inputs than this fail
+MAX_ATTRIBUTION_FAILURES = 0.1
+MINIMIZED_DIR = REPO_ROOT / "artifacts/coverage/minimized_corpus"
 
 # Ensure report directories exist
 GCDA_DIR.mkdir(parents=True, exist_ok=True)
@@ -30,7 +55,7 @@ def extract_afl_generated_tests(seed_dir):
     inputs = []
     for testcase in Path(seed_dir).glob("*"):
         try:
-            inputs.append(testcase.read_text(errors="ignore"))
+            inputs.append((None, testcase.read_text(errors="ignore")))
         except Exception as e:
             print(f"[!] Could not read {testcase}: {e}")
     return inputs
@@ -41,89 +66,111 @@ def extract_llm_generated_tests(test_case_dir):
     for testcase in test_case_dir.iterdir():
         if testcase.is_file():
             try:
-                inputs.append(testcase.read_text(errors="ignore"))
+                inputs.append((None, testcase.read_text(errors="ignore")))
             except Exception as e:
                 print(f"[!] Could not read {testcase}: {e}")
     return inputs
 
 
 def extract_all_klee_inputs(root_dir):
-    inputs = []
+    """
+    Lazily yield (run_id, source bytes) for every .ktest under the KLEE run dirs,
+    one file in memory at a time. The input_N objects are mapped back to the
+    buffer tcc reads; ktests with the same objects, empty buffers and all but
+    the first binary-noise buffer of each run are dropped before the corpus.
+    """
+
+    def report(path, error):
+        print(f"[!] Skipping unreadable KTest: {error}")
+
+    seen = set()
+    extracted = duplicates = dropped = 0
     for subdir in Path(root_dir).resolve().glob("run_*"):
-        for ktest in subdir.rglob("*.ktest"):
-            print(f"[KLEE] Found KTest file: {ktest}")
-            try:
-                kt = KTest.fromfile(str(ktest))
-                input_objects = {}
-
-                for name, data in kt.objects:
-                    match = re.fullmatch(r"input_(\d+)", name)
-                    if match:
-                        index = int(match.group(1))
-                        input_objects[index] = data
-
-                if not input_objects:
-                    continue
-
-                input_strs = []
-                for index in sorted(input_objects):
-                    data = input_objects[index]
-                    for i in range(0, len(data), 4):
-                        val = int.from_bytes(
-                            data[i : i + 4], byteorder="little", signed=True
-                        )
-                        input_strs.append(str(val))
-
-                inputs.append(" ".join(input_strs))
-            except Exception as e:
-                print(f"[!] Failed to parse {ktest}: {e}")
-    return inputs
+        noise_kept = False
+        for ktest, objects in iter_ktest_objects(subdir.rglob("*.ktest"), report):
+            inputs = input_objects(objects)
+            if not inputs:
+                continue
+            extracted += 1
+            digest = objects_digest(inputs)
+            if digest in seen:
+                duplicates += 1
+                continue
+            seen.add(digest)
+            buffer = replay_buffer(inputs)
+            if not buffer.strip() or (is_noise(buffer) and noise_kept):
+                dropped += 1
+                continue
+            noise_kept = noise_kept or is_noise(buffer)
+            yield subdir.name, buffer
+    print(
+        f"[+] KLEE: {extracted} ktests, {duplicates} duplicate objects, "
+        f"{dropped} empty or noise buffers dropped"
+    )
 
 
 def extract_all_afl_inputs(root_dir):
     inputs = []
     for subdir in Path(root_dir).resolve().glob("run_*"):
-        queue_dir = subdir / "default/queue"
-        if not queue_dir.exists():
-            continue
-        for testcase in queue_dir.iterdir():
-            if testcase.is_file():
-                try:
-                    inputs.append(testcase.read_text(errors="ignore"))
-                except Exception as e:
-                    print(f"[!] Could not read {testcase}: {e}")
+        # One queue per instance: default/ for a single fuzzer, main/ and
+        # secondary_N/ for a multi-instance campaign
+        for queue_dir in subdir.glob("*/queue"):
+            for testcase in queue_dir.iterdir():
+                if testcase.is_file():
+                    try:
+                        inputs.append(
+                            (subdir.name, testcase.read_text(errors="ignore"))
+                        )
+                    except Exception as e:
+                        print(f"[!] Could not read {testcase}: {e}")
     return inputs
 
 
 def compile_gcov_binary():
     print("[*] Compiling gcov-instrumented binary...")
-    subprocess.run(["make", "gcov_bin"], cwd=REPO_ROOT / "c_program", check=True)
+    build("gcov_bin")
+
+
+def compile_harness_binary():
+    print("[*] Compiling gcov-instrumented replay harness...")
+    build("harness_bin")
 
 
 def reset_coverage_data():
     for f in REPO_ROOT.rglob("*.gcda"):
+        # The incremental baseline outlives a single report
+        if BASELINE_DIR in f.parents:
+            continue
         f.unlink()
 
 
-def run_with_input(input_str):
-    input_file = REPO_ROOT / "temp_input.c"  # Use .c to match expectations
-    input_file.write_text(input_str)
+def tcc_args(input_name):
+    return [
+        "-c",
+        input_name,
+        "-I",
+        str(REPO_ROOT / "c_program" / "include"),
+        "-I",
+        str("/usr/include"),
+        "-I",
+        str("/usr/lib/gcc/x86_64-linux-gnu/11/include"),
+    ]
+
+
+def run_with_input(input_data: bytes, input_file=None, env=None):
+    # Use .c to match expectations
+    input_file = Path(input_file) if input_file else REPO_ROOT / "temp_input.c"
+    input_file.write_bytes(input_data)
 
     try:
         result = subprocess.run(
-            [
-                str(BINARY_PATH),
-                "-c",
-                str(input_file),
-                "-I",
-                str(REPO_ROOT / "c_program" / "include"),
-                "-I",
-                str("/usr/include"),
-                "-I",
-                str("/usr/lib/gcc/x86_64-linux-gnu/11/include"),
-            ],
+            [str(BINARY_PATH), *tcc_args(input_file.name)],
             check=True,
             timeout=3,
+            # Run next to the input so every replay compiles the same relative
+            # path and writes its object file into its own directory
+            cwd=input_file.parent,
+            env=env,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             text=True,
@@ -138,96 +185,621 @@ def run_with_input(input_str):
         pass
     finally:
         input_file.unlink(missing_ok=True)
+        # No -o, so the option handling replays as `tcc -c`, which leaves the
+        # object next to the input
+        input_file.with_suffix(".o").unlink(missing_ok=True)
+
+
+def _replay_serial(
+    test_cases,
+    corpus_dir=None,
+    input_file=None,
+    env=None,
+    harness=False,
+    harness_path=None,
+):
+    input_file = Path(input_file) if input_file else REPO_ROOT / "temp_input.c"
+    store = CorpusStore(corpus_dir or TEST_CASES_DIR)
+    if harness:
+        replay_with_harness(
+            test_cases,
+            harness_path or HARNESS_PATH,
+            input_file,
+            tcc_args(input_file.name),
+            env=env,
+            read=store.read,
+        )
+        store.close()
+        return
 
+    for test_case, input_data in store.stream(test_cases):
+        try:
+            run_with_input(input_data, input_file=input_file, env=env)
+        except Exception as e:
+            print(f"[!] Failed to replay {test_case.name}: {e}")
+    store.close()
+
+
+def _replay_chunk(
+    worker_id,
+    test_cases,
+    harness=False,
+    workers_dir=None,
+    corpus_dir=None,
+    harness_path=None,
+):
+    """
+    Replay a slice of the corpus with a private scratch input and GCOV_PREFIX tree,
+    so several workers never write the same temp_input.c or tcc.gcda.
+    """
+    # Passed in by the parent: a spawned worker only sees the module defaults
+    worker_dir = Path(workers_dir or WORKERS_DIR) / f"worker_{worker_id}"
+    worker_dir.mkdir(parents=True, exist_ok=True)
+
+    prefix_dir = worker_dir / "prefix"
+    env = os.environ.copy()
+    env["GCOV_PREFIX"] = str(prefix_dir)
+
+    _replay_serial(
+        test_cases,
+        corpus_dir=corpus_dir,
+        input_file=worker_dir / "temp_input.c",
+        env=env,
+        harness=harness,
+        harness_path=harness_path,
+    )
+
+    # The .gcda lands under prefix_dir + the object path baked in at compile time,
+    # flatten it so gcov-tool can merge worker directories side by side
+    profile_dir = worker_dir / "profile"
+    profile_dir.mkdir(exist_ok=True)
+    for gcda in prefix_dir.rglob("*.gcda"):
+        gcda.replace(profile_dir / gcda.name)
+    return profile_dir
+
+
+def merge_gcda_dirs(profile_dirs, output_dir):
+    """
+    Fold per-worker .gcda directories together with `gcov-tool merge` and place
+    the result in output_dir. Counters are summed, so the merged profile is the
+    same as the one a serial replay would have written.
+    """
+    profile_dirs = [Path(d) for d in profile_dirs if any(Path(d).glob("*.gcda"))]
+    if not profile_dirs:
+        return
+
+    merged = profile_dirs[0]
+    for i, other in enumerate(profile_dirs[1:]):
+        merged_out = WORKERS_DIR / f"merged_{i}"
+        subprocess.run(
+            ["gcov-tool", "merge", "-o", str(merged_out), str(merged), str(other)],
+            check=True,
+            capture_output=True,
+        )
+        merged = merged_out
+
+    for gcda in merged.glob("*.gcda"):
+        shutil.copyfile(gcda, Path(output_dir) / gcda.name)
+
+
+def replay_test_cases(test_cases, jobs=1, harness=False, input_file=None):
+    """
+    Replay corpus entries (see CorpusStore.entries) on the gcov build. Workers
+    take every jobs-th entry, so each still reads the segments front to back.
+    """
+    if jobs <= 1:
+        _replay_serial(test_cases, input_file=input_file, harness=harness)
+        return
+
+    shutil.rmtree(WORKERS_DIR, ignore_errors=True)
+    chunks = [test_cases[i::jobs] for i in range(jobs)]
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        worker_dirs = list(
+            pool.map(
+                _replay_chunk,
+                range(jobs),
+                chunks,
+                [harness] * jobs,
+                [WORKERS_DIR] * jobs,
+                [TEST_CASES_DIR] * jobs,
+                [HARNESS_PATH] * jobs,
+            )
+        )
+
+    print(f"[*] Merging .gcda files from {len(worker_dirs)} workers...")
+    merge_gcda_dirs(worker_dirs, BINARY_PATH.parent)
+    shutil.rmtree(WORKERS_DIR, ignore_errors=True)
+
+
+def _sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
 
-def generate_gcov_report():
-    # Use hardcoded reference to tcc.c
-    c_files = read_c_programs_with_filenames(C_SRC_DIR)
-    base_name = "tcc"
 
-    # Ensure .gcno is present in coverage_data
-    original_gcno = BINARY_PATH.parent / f"{base_name}.gcno"
-    if original_gcno.exists():
-        dest_gcno = GCDA_DIR / f"{base_name}.gcno"
-        dest_gcno.write_bytes(original_gcno.read_bytes())
+def load_baseline_manifest(gcno_hash):
+    """
+    Return the content hashes already folded into the baseline .gcda. A baseline
+    recorded against a different .gcno (the binary was rebuilt) is discarded.
+    """
+    if BASELINE_MANIFEST.exists():
+        manifest = json.loads(BASELINE_MANIFEST.read_text())
+        if manifest.get("gcno") == gcno_hash:
+            return set(manifest.get("replayed", []))
 
-    # Ensure .gcda is present in coverage_data
-    original_gcda = BINARY_PATH.parent / f"{base_name}.gcda"
-    if original_gcda.exists():
-        dest_gcda = GCDA_DIR / f"{base_name}.gcda"
-        dest_gcda.write_bytes(original_gcda.read_bytes())
+    shutil.rmtree(BASELINE_DIR, ignore_errors=True)
+    return set()
 
-    # Copy source file into report directory so gcov can annotate it
-    for filename, content in c_files:
-        copied_src = GCOV_REPORT_DIR / "src" / filename
-        copied_src.parent.mkdir(parents=True, exist_ok=True)
-        copied_src.write_text(content)
 
+def save_baseline_manifest(gcno_hash, replayed):
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    BASELINE_MANIFEST.write_text(
+        json.dumps({"gcno": gcno_hash, "replayed": sorted(replayed)})
+    )
+
+
+def incremental_replay(test_cases, jobs=1, harness=False):
+    """
+    Replay only the test cases whose content is not in the baseline manifest and
+    merge their counters into the persistent baseline .gcda.
+    """
+    gcno_hash = _sha256(BINARY_PATH.parent / f"{profile_name(harness)}.gcno")
+    replayed = load_baseline_manifest(gcno_hash)
+    baseline_profile = BASELINE_DIR / "profile"
+    baseline_profile.mkdir(parents=True, exist_ok=True)
+
+    new_cases = {}
+    for test_case in test_cases:
+        if test_case.digest not in replayed:
+            new_cases.setdefault(test_case.digest, test_case)
+    print(
+        f"[*] {len(new_cases)} new test cases, {len(replayed)} already in baseline"
+    )
+
+    if new_cases:
+        replay_test_cases(list(new_cases.values()), jobs=jobs, harness=harness)
+
+        new_profile = WORKERS_DIR / "incremental"
+        new_profile.mkdir(parents=True, exist_ok=True)
+        for gcda in BINARY_PATH.parent.glob("*.gcda"):
+            gcda.replace(new_profile / gcda.name)
+
+        merge_gcda_dirs([baseline_profile, new_profile], baseline_profile)
+        shutil.rmtree(WORKERS_DIR, ignore_errors=True)
+        save_baseline_manifest(gcno_hash, replayed | set(new_cases))
+
+    for gcda in baseline_profile.glob("*.gcda"):
+        shutil.copyfile(gcda, BINARY_PATH.parent / gcda.name)
+
+
+def _gcov_bitmaps(profile_paths, cwd, layouts):
+    """
+    {profile path: bitmap} from one gcov call over several .gcda files, each
+    next to its .gcno. gcov prints one JSON document per profile. The layout
+    only depends on the .gcno, so it is built once and kept in layouts.
+    """
     result = subprocess.run(
-        ["gcov", "-o", str(GCDA_DIR), str(base_name)],
-        cwd=GCOV_REPORT_DIR,
+        [
+            "gcov",
+            "--json-format",
+            "--stdout",
+            "--branch-probabilities",
+            "--branch-counts",
+            *map(str, profile_paths),
+        ],
+        cwd=cwd,
         capture_output=True,
         text=True,
         check=True,
     )
+    bitmaps = {}
+    for document in result.stdout.splitlines():
+        if not document.strip():
+            continue
+        data = json.loads(document)
+        model = CoverageModel.from_gcov_json(data)
+        # Only tcc's own sources count, as in generate_gcov_report
+        model.files.pop("harness/tcc_harness.c", None)
+        if not layouts:
+            layouts.append(CoverageLayout.from_model(model))
+        bitmaps[data["data_file"]] = coverage_bitmap(model, layouts[0])
+    return bitmaps
+
+
+def _attribute_chunk(
+    worker_id, test_cases, workers_dir, corpus_dir, profile, harness_path=None
+):
+    """
+    Replay each input with its own GCOV_PREFIX so its .gcda holds only its own
+    counters, and return {content hash: coverage bitmap}. With harness_path
+    the inputs share one harness process, which flushes and resets its
+    counters after every input. Profiles that set the same arc counters cover
+    the same lines and branches, so gcov only runs on the first profile of
+    each arc signature, GCOV_BATCH profiles per call, and the profiles are
+    deleted once gcov has read them. A profile whose signature cannot be read
+    is given to gcov on its own.
+
+    Returns (bitmaps, failures): inputs that could not be run or whose
+    profile gcov could not read get no bitmap and are only counted.
+    """
+    worker_dir = Path(workers_dir) / f"attribution_{worker_id}"
+    prefix_dir = worker_dir / "prefix"
+    profiles_dir = worker_dir / "profiles"
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    gcno = BINARY_PATH.parent / f"{profile}.gcno"
+
+    env = os.environ.copy()
+    env["GCOV_PREFIX"] = str(prefix_dir)
+    input_file = worker_dir / "temp_input.c"
+
+    # arc signature -> bitmap, or None while its profile waits for gcov and
+    # after gcov failed on it
+    signature_bitmaps = {}
+    signature_inputs = {}
+    batch = {}
+    bitmaps = {}
+    layouts = []
+    failures = 0
+    unparsed = 0
+
+    def run_batch():
+        try:
+            by_path = _gcov_bitmaps(batch.values(), worker_dir, layouts)
+        except (subprocess.CalledProcessError, ValueError) as e:
+            print(f"[!] gcov failed on {len(batch)} attribution profiles: {e}")
+            by_path = {}
+        for signature, path in batch.items():
+            signature_bitmaps[signature] = by_path.get(str(path))
+        batch.clear()
+        shutil.rmtree(profiles_dir, ignore_errors=True)
+        profiles_dir.mkdir()
+
+    def collect(test_case):
+        nonlocal unparsed
+        gcda = next(prefix_dir.rglob(f"{profile}.gcda"), None)
+        if gcda is None:
+            # Killed by a signal or a timeout: nothing was written
+            bitmaps[test_case.digest] = 0
+            return
+        try:
+            signature = arc_signature(gcda)
+        except GcdaError as e:
+            if not unparsed:
+                print(f"[!] Running gcov on each profile it cannot sign: {e}")
+            unparsed += 1
+            signature = f"unparsed:{test_case.digest}"
+        if signature not in signature_bitmaps:
+            kept = profiles_dir / str(len(batch)) / gcda.name
+            kept.parent.mkdir(exist_ok=True)
+            gcda.replace(kept)
+            try:
+                os.link(gcno, kept.with_suffix(".gcno"))
+            except OSError:
+                shutil.copyfile(gcno, kept.with_suffix(".gcno"))
+            signature_bitmaps[signature] = None
+            batch[signature] = kept.relative_to(worker_dir)
+        signature_inputs.setdefault(signature, []).append(test_case.digest)
+        if len(batch) >= GCOV_BATCH:
+            run_batch()
+
+    store = CorpusStore(corpus_dir)
+    harness = None
+    if harness_path:
+        harness = TccHarness(harness_path, input_file, tcc_args(input_file.name), env=env)
+        harness.start()
+    shutil.rmtree(prefix_dir, ignore_errors=True)
+    for test_case, input_data in store.stream(test_cases):
+        try:
+            if harness is None:
+                run_with_input(input_data, input_file=input_file, env=env)
+            else:
+                try:
+                    harness.run(input_data)
+                    harness.flush()
+                except HarnessExited:
+                    # exit() still writes this input's counters, a signal
+                    # or the timeout kill writes none
+                    harness.close()
+                    harness.start()
+            collect(test_case)
+        except Exception as e:
+            print(f"[!] Failed to attribute {test_case.name}: {e}")
+            failures += 1
+        shutil.rmtree(prefix_dir, ignore_errors=True)
+    if harness is not None:
+        harness.close()
+    store.close()
+    if batch:
+        run_batch()
+
+    for signature, digests in signature_inputs.items():
+        if signature_bitmaps[signature] is None:
+            failures += len(digests)
+            continue
+        for digest in digests:
+            bitmaps[digest] = signature_bitmaps[signature]
+    return bitmaps, failures
+
+
+def load_attribution(gcno_hash):
+    if ATTRIBUTION_FILE.exists():
+        attribution = json.loads(ATTRIBUTION_FILE.read_text())
+        if (
+            attribution.get("gcno") == gcno_hash
+            and attribution.get("version") == ATTRIBUTION_VERSION
+        ):
+            return {k: int(v, 16) for k, v in attribution["bitmaps"].items()}
+    return {}
+
+
+class AttributionError(Exception):
+    pass
+
+
+def minimize_corpus(test_cases, jobs=1, harness=False):
+    """
+    Record a per-input coverage bitmap for every test case not attributed yet,
+    then export a greedy set-cover minimal corpus with the same line, branch
+    and function coverage to MINIMIZED_DIR. Inputs that could not be
+    attributed have unknown coverage, so they are exported as well and tried
+    again next time. Returns ({content hash: bitmap}, failures).
+
+    Raises AttributionError, leaving MINIMIZED_DIR as it was, when more than
+    MAX_ATTRIBUTION_FAILURES of the inputs attributed this time failed.
+    """
+    profile = profile_name(harness)
+    gcno_hash = _sha256(BINARY_PATH.parent / f"{profile}.gcno")
+    bitmaps = load_attribution(gcno_hash)
+
+    cases_by_hash = {}
+    for test_case in test_cases:
+        cases_by_hash.setdefault(test_case.digest, test_case)
+    pending = [c for h, c in cases_by_hash.items() if h not in bitmaps]
+    print(f"[*] Attributing coverage for {len(pending)} test cases...")
+
+    failures = 0
+    if pending:
+        jobs = max(1, min(jobs, len(pending)))
+        chunks = [pending[i::jobs] for i in range(jobs)]
+        with ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            for chunk_bitmaps, chunk_failures in pool.map(
+                _attribute_chunk,
+                range(jobs),
+                chunks,
+                [WORKERS_DIR] * jobs,
+                [TEST_CASES_DIR] * jobs,
+                [profile] * jobs,
+                [HARNESS_PATH if harness else None] * jobs,
+            ):
+                bitmaps.update(chunk_bitmaps)
+                failures += chunk_failures
+        shutil.rmtree(WORKERS_DIR, ignore_errors=True)
+        ATTRIBUTION_FILE.write_text(
+            json.dumps(
+                {
+                    "gcno": gcno_hash,
+                    "version": ATTRIBUTION_VERSION,
+                    "bitmaps": {k: format(v, "x") for k, v in bitmaps.items()},
+                }
+            )
+        )
+
+    if failures:
+        print(f"[!] Could not attribute {failures} of {len(pending)} test cases")
+    if failures > MAX_ATTRIBUTION_FAILURES * len(pending):
+        raise AttributionError(
+            f"{failures} of {len(pending)} test cases could not be attributed, "
+            "keeping the previous minimized corpus"
+        )
+
+    corpus_bitmaps = {h: bitmaps[h] for h in cases_by_hash if h in bitmaps}
+    unattributed = [h for h in cases_by_hash if h not in bitmaps]
+    selected = greedy_set_cover(corpus_bitmaps) + unattributed
+    # A directory of plain files, which AFL can take as seeds
+    shutil.rmtree(MINIMIZED_DIR, ignore_errors=True)
+    store = CorpusStore(TEST_CASES_DIR)
+    store.export([cases_by_hash[h] for h in selected], MINIMIZED_DIR)
+    store.close()
+    print(
+        f"[+] Minimized corpus: {len(selected)} of {len(cases_by_hash)} test cases "
+        f"saved to {MINIMIZED_DIR}"
+    )
+    return corpus_bitmaps, failures
+
+
+def select_replay_cases(test_cases, harness=False):
+    """
+    The minimized corpus plus any test case that has not been attributed yet,
+    which together cover every line and branch the full corpus covers.
+    """
+    attributed = load_attribution(
+        _sha256(BINARY_PATH.parent / f"{profile_name(harness)}.gcno")
+    )
+    if not attributed or not MINIMIZED_DIR.exists():
+        return test_cases
 
-    results_dir = REPO_ROOT / "artifacts/final-results"
-    results_dir.mkdir(parents=True, exist_ok=True)
-    existing_files = list(results_dir.glob("results*.txt"))
-    indices = [
-        int(f.stem.replace("results", ""))
-        for f in existing_files
-        if f.stem.replace("results", "").isdigit()
+    selected = {p.name for p in MINIMIZED_DIR.glob("test_case_*.c")}
+    return [
+        c for c in test_cases if c.name in selected or c.digest not in attributed
     ]
-    new_index = max(indices) + 1 if indices else 0
-    new_results_file = results_dir / f"results{new_index}.txt"
-    new_results_file.write_text(result.stdout)
-    print(result.stdout)
-
-    # Print contents of the generated .gcov file
-    # for gcov_file in GCOV_REPORT_DIR.glob("*.gcov"):
-    #     pass
-    #     print(f"\n[GCOV] Contents of {gcov_file.name}:\n")
-    #     print(gcov_file.read_text())
-
-
-def save_test_cases(klee_inputs, afl_inputs, llm_inputs):
-    TEST_CASES_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Determine the starting index by counting existing test_case_*.txt files
-    existing_cases = list(TEST_CASES_DIR.glob("test_case_*.c"))
-    if existing_cases:
-        existing_indices = [
-            int(f.stem.split("_")[-1])
-            for f in existing_cases
-            if f.stem.split("_")[-1].isdigit()
-        ]
-        start_idx = max(existing_indices) + 1 if existing_indices else 0
-    else:
-        start_idx = 0
 
-    all_inputs = klee_inputs + afl_inputs + llm_inputs
 
-    for i, input_str in enumerate(all_inputs):
-        idx = start_idx + i
-        test_case_path = TEST_CASES_DIR / f"test_case_{idx}.c"
-        try:
-            test_case_path.write_text(input_str)
-        except Exception as e:
-            print(f"[!] Failed to write {test_case_path}: {e}")
+def profile_name(harness=False):
+    # The harness is its own object, so it has its own .gcno/.gcda pair
+    return HARNESS_PATH.name if harness else BINARY_PATH.name
 
 
-if __name__ == "__main__":
+def link_file(source, dest) -> bool:
+    """
+    Hardlink source to dest, replacing dest atomically, unless dest already is
+    source. Across filesystems it falls back to a copy, skipped while the copy
+    is current. Returns whether dest changed.
+    """
+    dest = Path(dest)
+    if dest.exists() and (os.path.samefile(source, dest) or same_contents(source, dest)):
+        return False
+
+    tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, dest)
+    return True
+
+
+def link_sources(report_dir):
+    """
+    Mirror the C sources into report_dir/src so gcov output can be annotated,
+    touching only files that changed since the last report.
+    """
+    src_dir = Path(report_dir) / "src"
+    src_dir.mkdir(parents=True, exist_ok=True)
+    return sum(
+        link_file(path, src_dir / path.name) for path in sorted(C_SRC_DIR.rglob("*.c"))
+    )
 
-    parser = argparse.ArgumentParser(description="Orchestrate coverage evaluation")
 
+def _gcov_objects(object_dir, base_names):
+    # One gcov call for the whole batch: a JSON document per object, one per line
+    result = subprocess.run(
+        [
+            "gcov",
+            "--json-format",
+            "--stdout",
+            "--branch-probabilities",
+            "--branch-counts",
+            "--object-directory",
+            str(object_dir),
+            *base_names,
+        ],
+        cwd=GCOV_REPORT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    model = CoverageModel()
+    for document in result.stdout.splitlines():
+        if document.strip():
+            model.merge(CoverageModel.from_gcov_json(json.loads(document)))
+    return model
+
+
+def generate_gcov_report(base_names=None, jobs=1, tools=None):
+    """
+    Report on every profile in the binary directory (or only base_names),
+    merged into one model, and record it in the coverage history with tools
+    ({tool: new test cases}) as its provenance. The .gcno/.gcda pairs are hardlinked into GCDA_DIR
+    rather than copied, so the staged .gcda follows later replays until the
+    next reset. With several objects, jobs gcov processes split them.
+    """
+    if base_names is None:
+        base_names = sorted(
+            gcda.stem
+            for gcda in BINARY_PATH.parent.glob("*.gcda")
+            if gcda.with_suffix(".gcno").exists()
+        )
+    if not base_names:
+        raise FileNotFoundError(f"No .gcda profiles in {BINARY_PATH.parent}")
+
+    GCDA_DIR.mkdir(parents=True, exist_ok=True)
+    for base_name in base_names:
+        for suffix in (".gcno", ".gcda"):
+            profile = BINARY_PATH.parent / f"{base_name}{suffix}"
+            if profile.exists():
+                link_file(profile, GCDA_DIR / profile.name)
+    link_sources(GCOV_REPORT_DIR)
+
+    jobs = max(1, min(jobs, len(base_names)))
+    batches = [base_names[i::jobs] for i in range(jobs)]
+    model = CoverageModel()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for batch_model in pool.map(lambda batch: _gcov_objects(GCDA_DIR, batch), batches):
+            model.merge(batch_model)
+    # Only tcc's own sources count, not the replay harness driver
+    model.files.pop("harness/tcc_harness.c", None)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    history = CoverageHistory(RESULTS_DIR / HISTORY_NAME)
+    new_index = history.next_iteration()
+    snapshot_path = RESULTS_DIR / f"coverage{new_index}.json.gz"
+    model.save(snapshot_path)
+    history.record(model, new_index, snapshot_path, tools)
+    history.close()
+    print(format_summary(model))
+    print(f"[+] Coverage snapshot saved to {snapshot_path}")
+    return model, snapshot_path
+
+
+def save_test_cases(klee_inputs, afl_inputs, llm_inputs, seed_inputs=()) -> dict:
+    """
+    Each argument is an iterable of (run_id, input) pairs, the input as str or
+    bytes. Inputs already in the content-addressed corpus are skipped, so every
+    unique input is replayed once. Returns {source: new test cases written}.
+    """
+    store = CorpusStore(TEST_CASES_DIR)
+    saved = {}
+    for source, inputs in [
+        ("klee", klee_inputs),
+        ("afl", afl_inputs),
+        ("llm", llm_inputs),
+        ("seed", seed_inputs),
+    ]:
+        extracted = 0
+
+        def counted(inputs):
+            nonlocal extracted
+            for item in inputs:
+                extracted += 1
+                yield item
+
+        written = store.add_many(counted(inputs), source)
+        print(f"[+] Saved {written} new {source} test cases ({extracted} extracted)")
+        saved[source] = written
+    return saved
+
+
+@dataclass
+class CoverageOptions:
+    jobs: int = 1
+    incremental: bool = False
+    minimize: bool = False
+    replay_minimized: bool = False
+    harness: bool = False
+
+
+@dataclass
+class CoverageResult:
+    snapshot: str
+    line_percent: float
+    lines_covered: int
+    lines_total: int
+    branch_percent: float
+    function_percent: float
+    replayed: int
+    # Inputs --minimize could not attribute, which have no bitmap
+    attribution_failures: int = 0
+    # source (klee/afl/llm/seed) -> new test cases added to the corpus
+    new_test_cases: dict = field(default_factory=dict)
+
+
+def run_coverage(options: CoverageOptions | None = None) -> CoverageResult:
+    """
+    Collect every tool's inputs into the corpus, replay them on the gcov build
+    and save a coverage snapshot.
+    """
+    options = options or CoverageOptions()
     compile_gcov_binary()
+    if options.harness:
+        compile_harness_binary()
     print("[*] Resetting coverage data...")
     reset_coverage_data()
 
-    print("[*] Extracting KLEE inputs...")
+    # Streamed straight into the corpus by save_test_cases
     klee_inputs = extract_all_klee_inputs(KLEE_OUTPUT_DIR)
-    print(f"[+] Got {len(klee_inputs)} inputs from KLEE")
 
     print("[*] Extracting AFL inputs...")
     afl_inputs = extract_all_afl_inputs(AFL_OUTPUT_DIR)
@@ -244,19 +816,85 @@ if __name__ == "__main__":
     print(f"[+] Got {len(afl_generated_inputs)} generated AFL inputs")
 
     print("[*] Saving test cases...")
-    save_test_cases(klee_inputs, afl_inputs + afl_generated_inputs, llm_inputs)
-
-    print("[*] Replaying saved test cases...")
-    for test_case_path in sorted(TEST_CASES_DIR.glob("test_case_*.c")):
-        try:
-            input_str = test_case_path.read_text()
-            run_with_input(input_str)
-        except Exception as e:
-            print(f"[!] Failed to replay {test_case_path}: {e}")
+    saved = save_test_cases(klee_inputs, afl_inputs, llm_inputs, afl_generated_inputs)
+
+    print(f"[*] Replaying saved test cases with {options.jobs} job(s)...")
+    test_cases = CorpusStore(TEST_CASES_DIR).entries()
+    replay_cases = (
+        select_replay_cases(test_cases, options.harness)
+        if options.replay_minimized
+        else test_cases
+    )
+    if options.incremental:
+        incremental_replay(replay_cases, jobs=options.jobs, harness=options.harness)
+    else:
+        replay_test_cases(replay_cases, jobs=options.jobs, harness=options.harness)
 
     print("[*] Generating gcov report...")
-    generate_gcov_report()
+    model, snapshot_path = generate_gcov_report(jobs=options.jobs, tools=saved)
+
+    attribution_failures = 0
+    if options.minimize:
+        print("[*] Minimizing test corpus...")
+        try:
+            bitmaps, attribution_failures = minimize_corpus(
+                test_cases, jobs=options.jobs, harness=options.harness
+            )
+        except AttributionError as e:
+            print(f"[!] Minimization aborted: {e}")
+        else:
+            # Per-input bitmaps say exactly which tool's inputs reach each new line
+            tool_of = {c.digest: c.source for c in test_cases}
+            history = CoverageHistory(RESULTS_DIR / HISTORY_NAME)
+            history.attribute(snapshot_index(snapshot_path), model, bitmaps, tool_of)
+            history.close()
 
     print(
         f"[✔] Done! See coverage report in {GCOV_REPORT_DIR} and all saved test cases in {TEST_CASES_DIR}"
     )
+    return CoverageResult(
+        snapshot=str(snapshot_path),
+        line_percent=model.line_percent,
+        lines_covered=model.lines_covered,
+        lines_total=model.lines_total,
+        branch_percent=model.branch_percent,
+        function_percent=model.function_percent,
+        replayed=len(replay_cases),
+        new_test_cases=saved,
+        attribution_failures=attribution_failures,
+    )
+
+
+def parse_options(argv=None) -> CoverageOptions:
+    parser = argparse.ArgumentParser(description="Orchestrate coverage evaluation")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of parallel replay workers (1 replays serially)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only replay test cases not already merged into the persistent .gcda baseline",
+    )
+    parser.add_argument(
+        "--minimize",
+        action="store_true",
+        help="Record per-test-case coverage and rebuild the minimized corpus",
+    )
+    parser.add_argument(
+        "--replay-minimized",
+        action="store_true",
+        help="Replay only the minimized corpus plus test cases not attributed yet",
+    )
+    parser.add_argument(
+        "--harness",
+        action="store_true",
+        help="Replay through the persistent in-process tcc harness instead of one process per test case",
+    )
+    return CoverageOptions(**vars(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    run_coverage(parse_options())
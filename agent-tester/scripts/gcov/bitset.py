@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+
+""" Bitset view of a CoverageModel: one bit per line, branch and function, so unions, diffs and counts over many snapshots are single int operations """
+
+
+def pack_bits(positions, size: int) -> int:
+    packed = bytearray((size + 7) // 8)
+    for i in positions:
+        packed[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(packed, "little")
+
+
+class CoverageLayout:
+    """
+    Bit positions for every line, branch and function of a model, in sorted
+    (file, line, branch index) and (file, function) order. The order is fixed
+    by the .gcno, so bitsets built with one layout from snapshots of the same
+    binary can be combined directly.
+    """
+
+    def __init__(self, lines, branches, functions):
+        self.lines = {slot: i for i, slot in enumerate(lines)}
+        self.branches = {slot: i for i, slot in enumerate(branches)}
+        self.functions = {slot: i for i, slot in enumerate(functions)}
+
+    @classmethod
+    def from_model(cls, model) -> "CoverageLayout":
+        lines, branches, functions = [], [], []
+        for path in sorted(model.files):
+            f = model.files[path]
+            lines.extend((path, n) for n in sorted(f.lines))
+            for n in sorted(f.branches):
+                branches.extend((path, n, i) for i in range(len(f.branches[n])))
+            functions.extend((path, name) for name in sorted(f.functions))
+        return cls(lines, branches, functions)
+
+    @property
+    def size(self) -> int:
+        return len(self.lines) + len(self.branches) + len(self.functions)
+
+
+@dataclass(frozen=True)
+class CoverageBits:
+    lines: int = 0
+    branches: int = 0
+    functions: int = 0
+
+    @classmethod
+    def from_model(cls, model, layout: CoverageLayout) -> "CoverageBits":
+        """
+        Set the bit of every executed line, taken branch and entered function.
+        Anything the layout has no slot for is ignored.
+        """
+        lines, branches, functions = [], [], []
+        for path, f in model.files.items():
+            for n, count in f.lines.items():
+                if count > 0 and (path, n) in layout.lines:
+                    lines.append(layout.lines[path, n])
+            for n, counts in f.branches.items():
+                for i, count in enumerate(counts):
+                    if count > 0 and (path, n, i) in layout.branches:
+                        branches.append(layout.branches[path, n, i])
+            for name, fn in f.functions.items():
+                if fn.execution_count > 0 and (path, name) in layout.functions:
+                    functions.append(layout.functions[path, name])
+        return cls(
+            pack_bits(lines, len(layout.lines)),
+            pack_bits(branches, len(layout.branches)),
+            pack_bits(functions, len(layout.functions)),
+        )
+
+    def __or__(self, other: "CoverageBits") -> "CoverageBits":
+        return CoverageBits(
+            self.lines | other.lines,
+            self.branches | other.branches,
+            self.functions | other.functions,
+        )
+
+    def __sub__(self, other: "CoverageBits") -> "CoverageBits":
+        """
+        What self covers and other does not, e.g. the branches a new snapshot
+        found.
+        """
+        return CoverageBits(
+            self.lines & ~other.lines,
+            self.branches & ~other.branches,
+            self.functions & ~other.functions,
+        )
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "lines": self.lines.bit_count(),
+            "branches": self.branches.bit_count(),
+            "functions": self.functions.bit_count(),
+        }
+
+    def packed(self, layout: CoverageLayout) -> int:
+        """
+        One int holding the lines, then the branches, then the functions, for
+        set-cover style comparisons that should keep all three.
+        """
+        return (
+            self.lines
+            | self.branches << len(layout.lines)
+            | self.functions << (len(layout.lines) + len(layout.branches))
+        )
@@ -0,0 +1,110 @@
+import sys
+from pathlib import Path
+
+""" Size-capped coverage digest the agent gets after each iteration instead of raw tool output, so its prompt stays the same size """
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from gcov.bitset import CoverageBits, CoverageLayout
+
+DIGEST_CHARS = 1500
+TOP_FILES = 8
+TOP_FUNCTIONS = 10
+
+
+def _delta(value, before) -> str:
+    return f" ({value - before:+.2f})" if before is not None else ""
+
+
+def file_rows(model, previous=None, limit=TOP_FILES) -> list[str]:
+    """
+    With a previous model, the files that gained the most lines; otherwise
+    (and to fill up) the files with the most uncovered lines.
+    """
+    rows = []
+    for path, f in model.files.items():
+        if not f.lines_total:
+            continue
+        before = previous.files.get(path) if previous else None
+        gained = f.lines_covered - before.lines_covered if before else 0
+        rows.append((gained, f.lines_total - f.lines_covered, path, f))
+    rows.sort(key=lambda r: (-r[0], -r[1], r[2]))
+
+    return [
+        f"  {path}: {f.line_percent:.1f}% lines"
+        + (f" ({gained:+d} lines)" if previous else "")
+        + f", {uncovered} uncovered"
+        for gained, uncovered, path, f in rows[:limit]
+    ]
+
+
+def uncovered_function_rows(model, limit=TOP_FUNCTIONS) -> list[str]:
+    functions = [
+        (fn.end_line - fn.start_line + 1, path, fn)
+        for path, f in model.files.items()
+        for fn in f.functions.values()
+        if fn.execution_count == 0
+    ]
+    functions.sort(key=lambda r: (-r[0], r[1], r[2].start_line))
+    return [
+        f"  {Path(path).name}:{fn.start_line} {fn.name} ({size} lines)"
+        for size, path, fn in functions[:limit]
+    ]
+
+
+def new_coverage(model, previous) -> dict[str, int]:
+    """
+    How many lines, branches and functions model covers that previous did
+    not. Unlike the percentage deltas, a branch newly taken while another
+    stops being taken still counts.
+    """
+    layout = CoverageLayout.from_model(model)
+    found = CoverageBits.from_model(model, layout) - CoverageBits.from_model(
+        previous, layout
+    )
+    return found.counts()
+
+
+def coverage_digest(model, previous=None, afl_summary=None, max_chars=DIGEST_CHARS) -> str:
+    """
+    Render totals (with deltas against previous), what was newly covered,
+    the AFL campaign summary, per-file changes and the largest functions
+    never executed. Whole lines past max_chars are dropped, the
+    per-function list first.
+    """
+    lines = [
+        f"Coverage: lines {model.line_percent:.2f}%"
+        f"{_delta(model.line_percent, previous.line_percent if previous else None)}"
+        f" of {model.lines_total}, branches {model.branch_percent:.2f}%"
+        f"{_delta(model.branch_percent, previous.branch_percent if previous else None)}"
+        f", functions {model.function_percent:.2f}%"
+        f"{_delta(model.function_percent, previous.function_percent if previous else None)}"
+    ]
+    if previous:
+        found = new_coverage(model, previous)
+        lines.append(
+            f"Newly covered: {found['lines']} lines, {found['branches']} branches, "
+            f"{found['functions']} functions"
+        )
+    if afl_summary:
+        lines.append(
+            f"AFL: {afl_summary['execs_per_sec']:.0f} execs/s, "
+            f"{afl_summary['corpus_count']} paths, "
+            f"bitmap {afl_summary['bitmap_cvg']:.2f}%, "
+            f"stability {afl_summary['stability']:.2f}%, "
+            f"last new path {afl_summary['seconds_since_last_find']:.0f}s before the end"
+        )
+    lines.append("Files:")
+    lines.extend(file_rows(model, previous))
+    lines.append("Largest functions never executed:")
+    lines.extend(uncovered_function_rows(model))
+
+    kept = []
+    size = 0
+    for line in lines:
+        size += len(line) + 1
+        if size > max_chars:
+            break
+        kept.append(line)
+    return "\n".join(kept)
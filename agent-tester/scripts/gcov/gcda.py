@@ -0,0 +1,84 @@
+import hashlib
+import struct
+
+""" Minimal .gcda reader: a signature of a profile's arc counters, so profiles that cover the same lines and branches can be told apart without running gcov """
+
+MAGIC = b"adcg"
+TAG_FUNCTION = 0x01000000
+TAG_ARCS = 0x01A10000
+# Newest GCC whose .gcda layout is known to match GCC 12's
+NEWEST_GCC = 15
+
+
+class GcdaError(Exception):
+    pass
+
+
+class UnsupportedGcdaLayout(GcdaError):
+    pass
+
+
+def gcc_version(version: bytes) -> tuple[int, int]:
+    """
+    (major, minor) from the version word, e.g. b"B22*" for GCC 12.2:
+    'A' + major // 10, major % 10, minor. GCC before 10 writes b"A93*" for
+    9.3, and GCC 4 to 8 a digit first, e.g. b"408*" for 4.8.
+    """
+    tens, units, minor = version[:3]
+    if not (chr(units).isdigit() and chr(minor).isdigit()):
+        raise UnsupportedGcdaLayout(f"unknown .gcda version {version!r}")
+    if chr(tens).isdigit():
+        return tens - ord("0"), (units - ord("0")) * 10 + minor - ord("0")
+    if not "A" <= chr(tens) <= "Z":
+        raise UnsupportedGcdaLayout(f"unknown .gcda version {version!r}")
+    return (tens - ord("A")) * 10 + units - ord("0"), minor - ord("0")
+
+
+def arc_signature(path) -> str:
+    """
+    Hash of the arc counters of every function in a .gcda. gcov derives line,
+    branch and function execution from the arc counters alone, so two
+    profiles with the same signature give the same coverage bitmap. The
+    counts themselves have to match, not just which ones are set: arcs that
+    are not instrumented are solved from the others by flow conservation.
+
+    GCC 12 changed the layout: the header gained a checksum word, record
+    lengths went from words to bytes, and all-zero counters are written as
+    a negative length with no data. Both layouts hash to the same signature.
+    Raises UnsupportedGcdaLayout for a version newer than NEWEST_GCC.
+    """
+    data = memoryview(open(path, "rb").read())
+    if len(data) < 12 or bytes(data[:4]) != MAGIC:
+        raise GcdaError(f"{path}: not a .gcda file")
+    # The version word is little-endian, so its characters are reversed
+    major, _ = gcc_version(bytes(data[4:8])[::-1])
+    if major > NEWEST_GCC:
+        raise UnsupportedGcdaLayout(f"{path}: .gcda from GCC {major} is not understood")
+    if major >= 12:
+        pos, unit = 16, 1  # magic, version, stamp, checksum
+    else:
+        pos, unit = 12, 4  # magic, version, stamp
+
+    digest = hashlib.sha256()
+    while pos + 8 <= len(data):
+        tag, length = struct.unpack_from("<Ii" if unit == 1 else "<II", data, pos)
+        pos += 8
+        if tag == 0:
+            break
+        if length < 0:
+            # Counters that are all zero are stored as just their count
+            if tag == TAG_ARCS:
+                digest.update(struct.pack("<II", tag, -length // 8))
+                digest.update(bytes(-length))
+            continue
+        length *= unit
+        if pos + length > len(data):
+            raise GcdaError(f"{path}: truncated record {tag:#x}")
+        if tag == TAG_FUNCTION:
+            digest.update(struct.pack("<I", tag))
+            digest.update(data[pos : pos + length])
+        elif tag == TAG_ARCS:
+            digest.update(struct.pack("<II", tag, length // 8))
+            digest.update(data[pos : pos + length])
+        pos += length
+    return digest.hexdigest()
@@ -0,0 +1,150 @@
+import os
+import select
+import struct
+import subprocess
+from pathlib import Path
+
+""" Client for c_program/harness/tcc_harness.c, which runs tcc's main() once per input inside a single long-lived process """
+
+FLUSH_REQUEST = 0xFFFFFFFF
+
+
+class HarnessExited(Exception):
+    pass
+
+
+class HarnessTimeout(HarnessExited):
+    pass
+
+
+class TccHarness:
+    """
+    One running tcc_harness process. Inputs are written to its scratch file and
+    compiled with tcc_args; counters reach the .gcda only on flush() or exit.
+    """
+
+    def __init__(self, harness_path, input_file, tcc_args, env=None, timeout=3):
+        self.harness_path = Path(harness_path)
+        self.input_file = Path(input_file)
+        self.tcc_args = list(tcc_args)
+        self.env = env
+        self.timeout = timeout
+        self.proc = None
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            [str(self.harness_path), self.input_file.name, *self.tcc_args],
+            cwd=self.input_file.parent,
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def _read_reply(self) -> int:
+        fd = self.proc.stdout.fileno()
+        reply = b""
+        while len(reply) < 4:
+            ready, _, _ = select.select([fd], [], [], self.timeout)
+            if not ready:
+                # Hung input: kill it like the per-process replay's timeout would
+                self.proc.kill()
+                raise HarnessTimeout("timed out")
+            chunk = os.read(fd, 4 - len(reply))
+            if not chunk:
+                raise HarnessExited("harness exited")
+            reply += chunk
+        return struct.unpack("<i", reply)[0]
+
+    def _request(self, header: int, payload: bytes = b"") -> int:
+        try:
+            self.proc.stdin.write(struct.pack("<I", header) + payload)
+            self.proc.stdin.flush()
+        except BrokenPipeError:
+            raise HarnessExited("harness exited")
+        return self._read_reply()
+
+    def run(self, data: bytes) -> int:
+        return self._request(len(data), data)
+
+    def flush(self):
+        self._request(FLUSH_REQUEST)
+
+    def close(self) -> int:
+        """
+        Stop the harness and return its exit status. A negative status means it
+        died from a signal and the counters since the last flush were lost.
+        """
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.proc.wait()
+        self.proc.stdout.close()
+        self.proc = None
+        return returncode
+
+
+def replay_with_harness(
+    test_cases,
+    harness_path,
+    input_file,
+    tcc_args,
+    env=None,
+    batch_size=64,
+    read=lambda test_case: Path(test_case).read_bytes(),
+):
+    """
+    Replay test cases through one harness process, flushing counters after each
+    batch. read turns a test case into its input (default: a path to read). If
+    an input crashes or hangs the harness, the unflushed inputs before it are
+    replayed again, so the profile matches one process per input.
+    """
+    harness = TccHarness(harness_path, input_file, tcc_args, env=env)
+    harness.start()
+
+    for start in range(0, len(test_cases), batch_size):
+        pending = list(test_cases[start : start + batch_size])
+        while pending:
+            done = 0
+            try:
+                for test_case in pending:
+                    harness.run(read(test_case))
+                    done += 1
+                harness.flush()
+                pending = []
+            except HarnessExited as e:
+                exited_cleanly = harness.close() >= 0
+                harness.start()
+                if done == len(pending):
+                    # Lost while flushing: only a signal loses the counters
+                    pending = [] if exited_cleanly else pending
+                    continue
+                bad_case, rest = pending[done], pending[done + 1 :]
+                if exited_cleanly:
+                    # tcc called exit(): gcov's atexit handler already wrote
+                    # everything up to and including the bad input
+                    pending = rest
+                else:
+                    # A hang loses its counters in a process of its own too, a
+                    # crash is retried alone in case earlier inputs caused it
+                    if not isinstance(e, HarnessTimeout):
+                        _run_isolated(
+                            read(bad_case), harness_path, input_file, tcc_args, env
+                        )
+                    pending = pending[:done] + rest
+
+    harness.close()
+    Path(input_file).unlink(missing_ok=True)
+    # tcc -c writes its object next to the input
+    Path(input_file).with_suffix(".o").unlink(missing_ok=True)
+
+
+def _run_isolated(input_data, harness_path, input_file, tcc_args, env):
+    harness = TccHarness(harness_path, input_file, tcc_args, env=env)
+    harness.start()
+    try:
+        harness.run(input_data)
+    except HarnessExited:
+        pass
+    harness.close()
@@ -0,0 +1,420 @@
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+""" SQLite coverage history: per-iteration totals, per-file and per-function coverage, and the tools behind every newly covered line """
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from gcov.bitset import CoverageLayout, pack_bits
+from gcov.model import CoverageModel, list_snapshots, snapshot_index
+
+HISTORY_NAME = "history.sqlite"
+# Tag for gained lines when no tool added test cases in that iteration
+UNKNOWN_TOOL = "unknown"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS iterations (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    snapshot TEXT,
+    lines_total INTEGER NOT NULL,
+    lines_covered INTEGER NOT NULL,
+    branches_total INTEGER NOT NULL,
+    branches_taken INTEGER NOT NULL,
+    functions_total INTEGER NOT NULL,
+    functions_covered INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tool_inputs (
+    iteration INTEGER NOT NULL,
+    tool TEXT NOT NULL,
+    new_test_cases INTEGER NOT NULL,
+    PRIMARY KEY (iteration, tool)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS file_coverage (
+    iteration INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    lines_total INTEGER NOT NULL,
+    lines_covered INTEGER NOT NULL,
+    branches_total INTEGER NOT NULL,
+    branches_taken INTEGER NOT NULL,
+    functions_total INTEGER NOT NULL,
+    functions_covered INTEGER NOT NULL,
+    -- Bit n set when line n was executed
+    covered BLOB NOT NULL,
+    -- Bit i set when the file's i-th branch, in line order, was taken
+    taken BLOB NOT NULL DEFAULT x'',
+    PRIMARY KEY (iteration, file_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS function_coverage (
+    iteration INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    execution_count INTEGER NOT NULL,
+    blocks INTEGER NOT NULL,
+    blocks_executed INTEGER NOT NULL,
+    PRIMARY KEY (iteration, file_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS line_gains (
+    iteration INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    tool TEXT NOT NULL,
+    PRIMARY KEY (iteration, file_id, line, tool)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS line_gains_by_tool ON line_gains (tool, iteration);
+
+CREATE VIEW IF NOT EXISTS iteration_totals AS
+SELECT id AS iteration, created, snapshot,
+       ROUND(100.0 * lines_covered / NULLIF(lines_total, 0), 2) AS line_percent,
+       ROUND(100.0 * branches_taken / NULLIF(branches_total, 0), 2) AS branch_percent,
+       ROUND(100.0 * functions_covered / NULLIF(functions_total, 0), 2) AS function_percent
+FROM iterations;
+CREATE VIEW IF NOT EXISTS coverage_by_file AS
+SELECT c.iteration, f.path, c.lines_covered, c.lines_total,
+       ROUND(100.0 * c.lines_covered / NULLIF(c.lines_total, 0), 2) AS line_percent,
+       ROUND(100.0 * c.branches_taken / NULLIF(c.branches_total, 0), 2) AS branch_percent,
+       ROUND(100.0 * c.functions_covered / NULLIF(c.functions_total, 0), 2) AS function_percent
+FROM file_coverage c JOIN files f ON f.id = c.file_id;
+"""
+
+
+def bits_to_blob(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def branch_positions(f) -> list[int]:
+    counts = (c for n in sorted(f.branches) for c in f.branches[n])
+    return [i for i, count in enumerate(counts) if count > 0]
+
+
+def blob_to_bits(blob: bytes) -> int:
+    return int.from_bytes(blob, "little")
+
+
+def bit_positions(bits: int) -> list[int]:
+    positions = []
+    while bits:
+        low = bits & -bits
+        positions.append(low.bit_length() - 1)
+        bits ^= low
+    return positions
+
+
+class CoverageHistory:
+    """
+    One iteration per coverage report, numbered like the coverage{N}.json.gz
+    snapshots; a new store imports the snapshots already in its directory.
+    The iteration_totals and coverage_by_file views are what
+    results/sandbox.ipynb reads with pandas.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        # Stores from before branch bitsets were recorded
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(file_coverage)")}
+        if "taken" not in columns:
+            self.db.execute(
+                "ALTER TABLE file_coverage ADD COLUMN taken BLOB NOT NULL DEFAULT x''"
+            )
+        if self.latest() is None:
+            self.import_snapshots(self.path.parent)
+
+    def close(self):
+        self.db.close()
+
+    def latest(self):
+        return self.db.execute("SELECT MAX(id) FROM iterations").fetchone()[0]
+
+    def next_iteration(self) -> int:
+        latest = self.latest()
+        return 0 if latest is None else latest + 1
+
+    def _file_ids(self, paths) -> dict[str, int]:
+        self.db.executemany(
+            "INSERT OR IGNORE INTO files (path) VALUES (?)", [(p,) for p in paths]
+        )
+        return dict(self.db.execute("SELECT path, id FROM files"))
+
+    def _bitsets(self, iteration, column) -> dict[str, int]:
+        return {
+            path: blob_to_bits(blob)
+            for path, blob in self.db.execute(
+                f"SELECT f.path, c.{column} FROM file_coverage c "
+                "JOIN files f ON f.id = c.file_id WHERE c.iteration = ?",
+                (iteration,),
+            )
+        }
+
+    def covered_lines(self, iteration) -> dict[str, int]:
+        """
+        {path: covered-line bitset} for one iteration.
+        """
+        return self._bitsets(iteration, "covered")
+
+    def taken_branches(self, iteration) -> dict[str, int]:
+        """
+        {path: taken-branch bitset} for one iteration.
+        """
+        return self._bitsets(iteration, "taken")
+
+    def record(
+        self, model: CoverageModel, iteration=None, snapshot=None, tools=None, created=None
+    ) -> int:
+        """
+        Store a report as iteration (default: the next one). tools is
+        {tool: new test cases}; lines first covered in this iteration are
+        credited to the tools that added test cases until attribute()
+        narrows them down.
+        """
+        iteration = self.next_iteration() if iteration is None else iteration
+        (before,) = self.db.execute(
+            "SELECT MAX(id) FROM iterations WHERE id < ?", (iteration,)
+        ).fetchone()
+        previous = self.covered_lines(before) if before is not None else {}
+        file_ids = self._file_ids(model.files)
+        contributors = sorted(tool for tool, count in (tools or {}).items() if count)
+        tag = "+".join(contributors) or UNKNOWN_TOOL
+
+        with self.db:
+            # Recording an iteration again replaces it
+            for table in ("tool_inputs", "file_coverage", "function_coverage", "line_gains"):
+                self.db.execute(
+                    f"DELETE FROM {table} WHERE iteration = ?", (iteration,)
+                )
+            self.db.execute(
+                "INSERT OR REPLACE INTO iterations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    iteration,
+                    created or time.time(),
+                    str(snapshot) if snapshot else None,
+                    model.lines_total,
+                    model.lines_covered,
+                    model.branches_total,
+                    model.branches_taken,
+                    model.functions_total,
+                    model.functions_covered,
+                ),
+            )
+            self.db.executemany(
+                "INSERT INTO tool_inputs VALUES (?, ?, ?)",
+                [(iteration, tool, count) for tool, count in (tools or {}).items()],
+            )
+            files, functions, gains = [], [], []
+            for path, f in model.files.items():
+                file_id = file_ids[path]
+                covered = bits_to_blob(
+                    pack_bits(
+                        (n for n, count in f.lines.items() if count > 0),
+                        max(f.lines, default=-1) + 1,
+                    )
+                )
+                files.append(
+                    (
+                        iteration,
+                        file_id,
+                        f.lines_total,
+                        f.lines_covered,
+                        f.branches_total,
+                        f.branches_taken,
+                        f.functions_total,
+                        f.functions_covered,
+                        covered,
+                        bits_to_blob(
+                            pack_bits(
+                                branch_positions(f),
+                                sum(len(c) for c in f.branches.values()),
+                            )
+                        ),
+                    )
+                )
+                functions.extend(
+                    (
+                        iteration,
+                        file_id,
+                        fn.name,
+                        fn.start_line,
+                        fn.execution_count,
+                        fn.blocks,
+                        fn.blocks_executed,
+                    )
+                    for fn in f.functions.values()
+                )
+                new = blob_to_bits(covered) & ~previous.get(path, 0)
+                gains.extend((iteration, file_id, n, tag) for n in bit_positions(new))
+
+            self.db.executemany(
+                "INSERT INTO file_coverage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                files,
+            )
+            self.db.executemany(
+                "INSERT INTO function_coverage VALUES (?, ?, ?, ?, ?, ?, ?)",
+                functions,
+            )
+            self.db.executemany("INSERT INTO line_gains VALUES (?, ?, ?, ?)", gains)
+        return iteration
+
+    def attribute(
+        self, iteration, model: CoverageModel, bitmaps: dict[str, int], tool_of: dict
+    ):
+        """
+        Credit each line first covered in iteration to the tools whose test
+        cases execute it, from per-test-case bitmaps (see
+        corpus.minimize.coverage_bitmap, whose low bits are model's lines in
+        CoverageLayout order) and {test case hash: tool}. Lines no attributed
+        test case covers keep their tag.
+        """
+        layout = CoverageLayout.from_model(model)
+        if any(bitmap.bit_length() > layout.size for bitmap in bitmaps.values()):
+            print(f"[!] Bitmaps do not match iteration {iteration}'s layout, not attributing")
+            return
+        tool_bits = defaultdict(int)
+        for digest, bitmap in bitmaps.items():
+            tool_bits[tool_of.get(digest, UNKNOWN_TOOL)] |= bitmap
+
+        rows = self.db.execute(
+            "SELECT g.file_id, f.path, g.line FROM line_gains g "
+            "JOIN files f ON f.id = g.file_id WHERE g.iteration = ?",
+            (iteration,),
+        ).fetchall()
+        with self.db:
+            for file_id, path, line in set(rows):
+                position = layout.lines.get((path, line))
+                if position is None:
+                    continue
+                tools = [t for t, bits in tool_bits.items() if bits >> position & 1]
+                if not tools:
+                    continue
+                self.db.execute(
+                    "DELETE FROM line_gains WHERE iteration = ? AND file_id = ? AND line = ?",
+                    (iteration, file_id, line),
+                )
+                self.db.executemany(
+                    "INSERT INTO line_gains VALUES (?, ?, ?, ?)",
+                    [(iteration, file_id, line, tool) for tool in tools],
+                )
+
+    def changed_since(self, iteration, until=None) -> dict:
+        """
+        What changed between iteration and until (default: the latest): the
+        total deltas and, per file, the lines gained and lost and how many
+        branches were newly taken or no longer taken.
+        """
+        until = self.latest() if until is None else until
+        totals = {
+            row[0]: row[1:]
+            for row in self.db.execute(
+                "SELECT id, lines_covered, branches_taken, functions_covered "
+                "FROM iterations WHERE id IN (?, ?)",
+                (iteration, until),
+            )
+        }
+        for wanted in (iteration, until):
+            if wanted not in totals:
+                raise KeyError(f"No iteration {wanted} in {self.path}")
+
+        before, after = self.covered_lines(iteration), self.covered_lines(until)
+        taken_before = self.taken_branches(iteration)
+        taken_after = self.taken_branches(until)
+        files = {}
+        for path in sorted(before.keys() | after.keys()):
+            old, new = before.get(path, 0), after.get(path, 0)
+            old_taken, new_taken = taken_before.get(path, 0), taken_after.get(path, 0)
+            if old != new or old_taken != new_taken:
+                files[path] = {
+                    "gained": bit_positions(new & ~old),
+                    "lost": bit_positions(old & ~new),
+                    "branches_gained": (new_taken & ~old_taken).bit_count(),
+                    "branches_lost": (old_taken & ~new_taken).bit_count(),
+                }
+        names = ("lines_covered", "branches_taken", "functions_covered")
+        return {
+            "from": iteration,
+            "to": until,
+            **{
+                name: totals[until][i] - totals[iteration][i]
+                for i, name in enumerate(names)
+            },
+            "files": files,
+        }
+
+    def contributions(self, since=None) -> dict[str, dict[str, list[int]]]:
+        """
+        {tool: {path: lines}} for the lines first covered after iteration
+        since (default: all of history), by the tool credited with each.
+        """
+        result = defaultdict(lambda: defaultdict(list))
+        for tool, path, line in self.db.execute(
+            "SELECT g.tool, f.path, g.line FROM line_gains g "
+            "JOIN files f ON f.id = g.file_id WHERE g.iteration > ? "
+            "ORDER BY g.tool, f.path, g.line",
+            (-1 if since is None else since,),
+        ):
+            result[tool][path].append(line)
+        return {tool: dict(files) for tool, files in result.items()}
+
+    def import_snapshots(self, results_dir):
+        """
+        Record every coverage{N}.json.gz snapshot not yet in the store, with
+        no tool provenance.
+        """
+        known = {row[0] for row in self.db.execute("SELECT id FROM iterations")}
+        imported = 0
+        for snapshot in list_snapshots(results_dir):
+            index = snapshot_index(snapshot)
+            if index not in known:
+                self.record(
+                    CoverageModel.load(snapshot),
+                    iteration=index,
+                    snapshot=snapshot,
+                    created=snapshot.stat().st_mtime,
+                )
+                imported += 1
+        return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the coverage history store")
+    parser.add_argument(
+        "--results-dir",
+        default="artifacts/final-results",
+        help="Directory holding history.sqlite and the coverage snapshots",
+    )
+    parser.add_argument(
+        "--since", type=int, default=None, help="Show what changed since this iteration"
+    )
+    parser.add_argument(
+        "--tools", action="store_true", help="Show the lines each tool contributed"
+    )
+    args = parser.parse_args()
+
+    history = CoverageHistory((ROOT_DIR / args.results_dir).resolve() / HISTORY_NAME)
+    if args.tools:
+        counts = {
+            tool: sum(len(lines) for lines in files.values())
+            for tool, files in history.contributions(args.since).items()
+        }
+        print(json.dumps(counts, indent=2))
+    elif args.since is not None:
+        changes = history.changed_since(args.since)
+        changes["files"] = {
+            path: {k: len(v) if isinstance(v, list) else v for k, v in change.items()}
+            for path, change in changes["files"].items()
+        }
+        print(json.dumps(changes, indent=2))
+    else:
+        print(f"[+] {history.next_iteration()} iterations in {history.path}")
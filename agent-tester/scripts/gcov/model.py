@@ -0,0 +1,292 @@
+import argparse
+import csv
+import gzip
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+""" Structured coverage model built from `gcov --json-format` output, so reports, CSV tables and agent feedback never parse gcov's text output """
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+SNAPSHOT_PREFIX = "coverage"
+SNAPSHOT_SUFFIX = ".json.gz"
+
+
+def _percent(covered, total):
+    return round(100 * covered / total, 2) if total else 0.0
+
+
+@dataclass
+class FunctionCoverage:
+    name: str
+    start_line: int
+    end_line: int
+    execution_count: int
+    blocks: int
+    blocks_executed: int
+
+
+@dataclass
+class FileCoverage:
+    path: str
+    # line number -> execution count
+    lines: dict[int, int] = field(default_factory=dict)
+    # line number -> taken count of each branch on that line
+    branches: dict[int, list[int]] = field(default_factory=dict)
+    functions: dict[str, FunctionCoverage] = field(default_factory=dict)
+
+    @property
+    def lines_total(self):
+        return len(self.lines)
+
+    @property
+    def lines_covered(self):
+        return sum(1 for count in self.lines.values() if count > 0)
+
+    @property
+    def line_percent(self):
+        return _percent(self.lines_covered, self.lines_total)
+
+    @property
+    def branches_total(self):
+        return sum(len(counts) for counts in self.branches.values())
+
+    @property
+    def branches_taken(self):
+        return sum(1 for counts in self.branches.values() for c in counts if c > 0)
+
+    @property
+    def branch_percent(self):
+        return _percent(self.branches_taken, self.branches_total)
+
+    @property
+    def functions_total(self):
+        return len(self.functions)
+
+    @property
+    def functions_covered(self):
+        return sum(1 for f in self.functions.values() if f.execution_count > 0)
+
+    @property
+    def function_percent(self):
+        return _percent(self.functions_covered, self.functions_total)
+
+
+@dataclass
+class CoverageModel:
+    files: dict[str, FileCoverage] = field(default_factory=dict)
+
+    @property
+    def lines_total(self):
+        return sum(f.lines_total for f in self.files.values())
+
+    @property
+    def lines_covered(self):
+        return sum(f.lines_covered for f in self.files.values())
+
+    @property
+    def line_percent(self):
+        return _percent(self.lines_covered, self.lines_total)
+
+    @property
+    def branches_total(self):
+        return sum(f.branches_total for f in self.files.values())
+
+    @property
+    def branches_taken(self):
+        return sum(f.branches_taken for f in self.files.values())
+
+    @property
+    def branch_percent(self):
+        return _percent(self.branches_taken, self.branches_total)
+
+    @property
+    def functions_total(self):
+        return sum(f.functions_total for f in self.files.values())
+
+    @property
+    def functions_covered(self):
+        return sum(f.functions_covered for f in self.files.values())
+
+    @property
+    def function_percent(self):
+        return _percent(self.functions_covered, self.functions_total)
+
+    @classmethod
+    def from_gcov_json(cls, data: dict) -> "CoverageModel":
+        """
+        Build the model from one `gcov --json-format --stdout` document.
+        """
+        model = cls()
+        for entry in data["files"]:
+            file_cov = model.files.setdefault(
+                entry["file"], FileCoverage(path=entry["file"])
+            )
+            for line in entry["lines"]:
+                number = line["line_number"]
+                file_cov.lines[number] = file_cov.lines.get(number, 0) + line["count"]
+                if line["branches"]:
+                    file_cov.branches.setdefault(number, []).extend(
+                        b["count"] for b in line["branches"]
+                    )
+            for func in entry["functions"]:
+                file_cov.functions[func["name"]] = FunctionCoverage(
+                    name=func["name"],
+                    start_line=func["start_line"],
+                    end_line=func["end_line"],
+                    execution_count=func["execution_count"],
+                    blocks=func["blocks"],
+                    blocks_executed=func["blocks_executed"],
+                )
+        return model
+
+    def merge(self, other: "CoverageModel") -> "CoverageModel":
+        """
+        Add other's counters to this model, e.g. one source compiled into two
+        objects. Returns self.
+        """
+        for path, theirs in other.files.items():
+            ours = self.files.get(path)
+            if ours is None:
+                self.files[path] = theirs
+                continue
+            for number, count in theirs.lines.items():
+                ours.lines[number] = ours.lines.get(number, 0) + count
+            for number, counts in theirs.branches.items():
+                mine = ours.branches.get(number)
+                if mine is None:
+                    ours.branches[number] = list(counts)
+                elif len(mine) == len(counts):
+                    ours.branches[number] = [a + b for a, b in zip(mine, counts)]
+            for name, fn in theirs.functions.items():
+                mine = ours.functions.get(name)
+                if mine is None:
+                    ours.functions[name] = fn
+                else:
+                    mine.execution_count += fn.execution_count
+                    mine.blocks_executed = max(mine.blocks_executed, fn.blocks_executed)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "files": [
+                {
+                    "path": f.path,
+                    "lines": [[n, c] for n, c in sorted(f.lines.items())],
+                    "branches": [[n, c] for n, c in sorted(f.branches.items())],
+                    "functions": [
+                        [
+                            fn.name,
+                            fn.start_line,
+                            fn.end_line,
+                            fn.execution_count,
+                            fn.blocks,
+                            fn.blocks_executed,
+                        ]
+                        for fn in f.functions.values()
+                    ],
+                }
+                for f in self.files.values()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CoverageModel":
+        model = cls()
+        for entry in data["files"]:
+            model.files[entry["path"]] = FileCoverage(
+                path=entry["path"],
+                lines={n: c for n, c in entry["lines"]},
+                branches={n: c for n, c in entry["branches"]},
+                functions={
+                    fn[0]: FunctionCoverage(*fn) for fn in entry["functions"]
+                },
+            )
+        return model
+
+    def save(self, path):
+        with gzip.open(path, "wt") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path) -> "CoverageModel":
+        with gzip.open(path, "rt") as f:
+            return cls.from_dict(json.load(f))
+
+
+def format_summary(model: CoverageModel) -> str:
+    """
+    Render the per-file and total coverage that is printed for the agent.
+    """
+    sections = []
+    for f in model.files.values():
+        sections.append(
+            f"File '{f.path}'\n"
+            f"Lines executed:{f.line_percent:.2f}% of {f.lines_total}\n"
+            f"Branches taken:{f.branch_percent:.2f}% of {f.branches_total}\n"
+            f"Functions executed:{f.function_percent:.2f}% of {f.functions_total}\n"
+        )
+    sections.append(
+        f"Lines executed:{model.line_percent:.2f}% of {model.lines_total}\n"
+        f"Branches taken:{model.branch_percent:.2f}% of {model.branches_total}\n"
+        f"Functions executed:{model.function_percent:.2f}% of {model.functions_total}\n"
+    )
+    return "\n".join(sections)
+
+
+def snapshot_index(path: Path) -> int:
+    return int(path.name[len(SNAPSHOT_PREFIX) : -len(SNAPSHOT_SUFFIX)])
+
+
+def list_snapshots(results_dir) -> list[Path]:
+    snapshots = [
+        p
+        for p in Path(results_dir).glob(f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}")
+        if p.name[len(SNAPSHOT_PREFIX) : -len(SNAPSHOT_SUFFIX)].isdigit()
+    ]
+    return sorted(snapshots, key=snapshot_index)
+
+
+def write_results_csv(snapshots: list[Path], csv_path):
+    """
+    Write the per-iteration line coverage table (one row per snapshot, one
+    column per source file plus total_coverage) used by results/sandbox.ipynb.
+    """
+    models = [CoverageModel.load(p) for p in snapshots]
+    columns = []
+    for model in models:
+        for path in model.files:
+            if path not in columns:
+                columns.append(path)
+
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["", *columns, "total_coverage"])
+        for i, model in enumerate(models):
+            writer.writerow(
+                [
+                    f"Iteration {i}",
+                    *(
+                        model.files[c].line_percent if c in model.files else ""
+                        for c in columns
+                    ),
+                    model.line_percent,
+                ]
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a per-iteration coverage CSV from coverage snapshots"
+    )
+    parser.add_argument(
+        "--results-dir",
+        default="artifacts/final-results",
+        help="Directory containing coverage{N}.json.gz snapshots",
+    )
+    parser.add_argument("--csv", required=True, help="Output CSV path")
+    args = parser.parse_args()
+
+    snapshots = list_snapshots((ROOT_DIR / args.results_dir).resolve())
+    write_results_csv(snapshots, args.csv)
+    print(f"[✓] Wrote {len(snapshots)} iterations to {args.csv}")
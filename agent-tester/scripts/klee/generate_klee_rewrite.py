@@ -1,20 +1,19 @@
 # scripts/python/klee/generate_klee_rewrite.py
 import os
+import sys
 import argparse
-import google.generativeai as genai
 from dotenv import load_dotenv
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
 load_dotenv(ROOT_DIR / ".env")
 
+from klee.replay_bridge import rewrite_layout
+from llm.cache import get_cache
+from llm.generate import DEFAULT_CONCURRENCY, generate_many, get_backend
 
-def init_gemini():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise EnvironmentError("Please set the GEMINI_API_KEY environment variable.")
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel("gemini-2.0-flash")
+REWRITE_DIR = ROOT_DIR / "artifacts/klee/rewrite"
 
 
 def read_c_source(file_path):
@@ -35,6 +34,12 @@ def build_prompt(source_code, additional_prompt=""):
         "are made symbolic using `klee_make_symbolic`. Add `#include <klee/klee.h>` if needed.\n"
         "Replace any concrete input statements with symbolic declarations.\n"
         'Use `"input_1, input_2 ..."` as the symbolic variable name in all `klee_make_symbolic` calls.\n'
+        "Every symbolic input is C source text for tcc to compile, so declare each one as a "
+        "fixed-size char buffer and terminate it, e.g. `char input_1[256];`, "
+        '`klee_make_symbolic(input_1, sizeof(input_1), "input_1");`, '
+        "`input_1[sizeof(input_1) - 1] = '\\0';`. Never make ints, structs or pointers symbolic.\n"
+        "Hand the buffers to tcc in input_N order, joined with a newline, as one source string "
+        "(for example with `tcc_compile_string`).\n"
         "Return ONLY the full modified C code.\n"
         "It is also important that you only use Klee assumptions for things that make sense to be symbolically tested \n"
         "Avoid file inputs or other external dependencies.\n"
@@ -55,6 +60,47 @@ def extract_clean_c_code(raw_text):
     return "\n".join(lines).strip()
 
 
+def rewrite_many(
+    jobs,
+    additional_prompt="",
+    backend=None,
+    concurrency=DEFAULT_CONCURRENCY,
+    on_written=None,
+) -> list[Path]:
+    """
+    Rewrite several sources concurrently. jobs is a list of (source path,
+    output basename); each rewrite is saved to artifacts/klee/rewrite as soon
+    as its response arrives and passed to on_written(path). Returns the paths
+    written.
+    """
+    backend = backend or get_backend()
+    prompts = [
+        build_prompt(read_c_source(src_path), additional_prompt)
+        for src_path, _ in jobs
+    ]
+    written = []
+
+    def on_result(index, text):
+        output_path = REWRITE_DIR / f"{jobs[index][1]}.c"
+        code = extract_clean_c_code(text)
+        write_transformed_code(output_path, code)
+        print(f"[✓] Rewritten C source saved to: {output_path}")
+        layout = rewrite_layout(code)
+        if not layout or any(size is None for _, size in layout):
+            print(
+                f"[!] {output_path.name} does not make its inputs symbolic as char "
+                f"buffers ({layout}), its KLEE tests will not replay as tcc source"
+            )
+        written.append(output_path)
+        if on_written:
+            on_written(output_path)
+
+    generate_many(
+        backend, prompts, on_result, concurrency=concurrency, cache=get_cache()
+    )
+    return written
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Rewrite a C file to use symbolic inputs for KLEE."
@@ -73,25 +119,13 @@ def main():
 
     args = parser.parse_args()
 
-    model = init_gemini()
-    source_code = read_c_source(args.input_file)
-    additional_prompt = args.additional_prompt
-    prompt = build_prompt(source_code, additional_prompt)
-
-    print("[+] Querying Gemini to rewrite for symbolic execution...")
-    response = model.generate_content(prompt)
-    rewritten_code = extract_clean_c_code(response.text)
-
     basename = (
         args.outname or os.path.splitext(os.path.basename(args.input_file))[0] + "_klee"
     )
 
-    # Use repo-root-relative path
-    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
-    output_path = os.path.join(repo_root, "artifacts/klee/rewrite", f"{basename}.c")
-
-    write_transformed_code(output_path, rewritten_code)
-    print(f"[✓] Rewritten C source saved to: {output_path}")
+    print("[+] Querying the LLM to rewrite for symbolic execution...")
+    if not rewrite_many([(args.input_file, basename)], args.additional_prompt):
+        sys.exit(f"[!] Rewrite of {args.input_file} failed")
 
 
 if __name__ == "__main__":
@@ -28,43 +28,9 @@ class KTest:
 
     @staticmethod
     def fromfile(path):
-        try:
-            f = open(path, 'rb')
-        except IOError:
-            print('ERROR: file %s not found' % path)
-            sys.exit(1)
-
-        hdr = f.read(5)
-        if len(hdr) != 5 or (hdr != b'KTEST' and hdr != b'BOUT\n'):
-            raise KTestError('unrecognized file')
-        version, = struct.unpack('>i', f.read(4))
-        if version > version_no:
-            raise KTestError('unrecognized version')
-        numArgs, = struct.unpack('>i', f.read(4))
-        args = []
-        for i in range(numArgs):
-            size, = struct.unpack('>i', f.read(4))
-            args.append(str(f.read(size).decode(encoding='ascii')))
-
-        if version >= 2:
-            symArgvs, = struct.unpack('>i', f.read(4))
-            symArgvLen, = struct.unpack('>i', f.read(4))
-        else:
-            symArgvs = 0
-            symArgvLen = 0
-
-        numObjects, = struct.unpack('>i', f.read(4))
-        objects = []
-        for i in range(numObjects):
-            size, = struct.unpack('>i', f.read(4))
-            name = f.read(size).decode('utf-8')
-            size, = struct.unpack('>i', f.read(4))
-            bytes = f.read(size)
-            objects.append((name, bytes))
-
-        # Create an instance
-        b = KTest(version, path, args, symArgvs, symArgvLen, objects)
-        return b
+        version, args, symArgvs, symArgvLen, objects = parse_ktest(read_ktest_bytes(path), path)
+        return KTest(version, path, args, symArgvs, symArgvLen,
+                     [(name, bytes(data)) for name, data in objects])
 
     def __init__(self, version, path, args, symArgvs, symArgvLen, objects):
         self.version = version
@@ -133,6 +99,85 @@ class KTest:
 
 
 
+def read_ktest_bytes(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        raise KTestError('cannot read %s: %s' % (path, e)) from e
+
+
+def parse_ktest(data, path='<bytes>'):
+    """
+    Parse a whole .ktest image in one pass over a memoryview. Returns
+    (version, args, symArgvs, symArgvLen, objects) where each object is
+    (name, memoryview) sliced from data without copying.
+    """
+    buf = memoryview(data)
+    if bytes(buf[:5]) not in (b'KTEST', b'BOUT\n'):
+        raise KTestError('%s: unrecognized file' % path)
+    try:
+        version, numArgs = struct.unpack_from('>ii', buf, 5)
+        if version > version_no:
+            raise KTestError('%s: unrecognized version %d' % (path, version))
+        pos = 13
+        args = []
+        for _ in range(numArgs):
+            size, = struct.unpack_from('>i', buf, pos)
+            args.append(bytes(buf[pos + 4:pos + 4 + size]).decode('ascii'))
+            pos += 4 + size
+
+        if version >= 2:
+            symArgvs, symArgvLen = struct.unpack_from('>ii', buf, pos)
+            pos += 8
+        else:
+            symArgvs = 0
+            symArgvLen = 0
+
+        numObjects, = struct.unpack_from('>i', buf, pos)
+        pos += 4
+        objects = []
+        for _ in range(numObjects):
+            size, = struct.unpack_from('>i', buf, pos)
+            name = bytes(buf[pos + 4:pos + 4 + size]).decode('utf-8')
+            pos += 4 + size
+            size, = struct.unpack_from('>i', buf, pos)
+            pos += 4
+            if size < 0 or pos + size > len(buf):
+                raise KTestError('%s: truncated object %r' % (path, name))
+            objects.append((name, buf[pos:pos + size]))
+            pos += size
+    except (struct.error, UnicodeDecodeError) as e:
+        raise KTestError('%s: malformed file (%s)' % (path, e)) from e
+    return version, args, symArgvs, symArgvLen, objects
+
+
+def iter_ktest_objects(paths, on_error=None):
+    """
+    Lazily yield (path, objects) for each .ktest in paths, reading one file at
+    a time. A bad file raises KTestError, unless on_error(path, error) is
+    given, in which case it is reported and skipped.
+    """
+    for path in paths:
+        try:
+            yield path, parse_ktest(read_ktest_bytes(path), path)[4]
+        except KTestError as e:
+            if on_error is None:
+                raise
+            on_error(path, e)
+
+
+def input_objects(objects):
+    """
+    The data of the input_N objects (as named by the KLEE rewrites), in N order.
+    """
+    indexed = []
+    for name, data in objects:
+        if name.startswith('input_') and name[6:].isdigit():
+            indexed.append((int(name[6:]), data))
+    return [data for _, data in sorted(indexed, key=lambda item: item[0])]
+
+
 def main():
     epilog = """
         output description:
@@ -178,7 +223,10 @@ def main():
     args = ap.parse_args()
 
     for file in args.files:
-        ktest = KTest.fromfile(file)
+        try:
+            ktest = KTest.fromfile(file)
+        except KTestError as e:
+            sys.exit('ERROR: %s' % e)
         if args.extract:
             ktest.extract({x for xs in args.extract for x in xs}, args.trim_zeros)
         else:
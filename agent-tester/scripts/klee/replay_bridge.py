@@ -0,0 +1,67 @@
+import hashlib
+import re
+
+""" KLEE -> replay bridge: turns the input_N objects of a ktest back into the source buffer tcc reads """
+
+# Objects are joined in input_N order, one per line, the way the rewrites
+# split tcc's input across several symbolic buffers
+OBJECT_SEPARATOR = b"\n"
+# Below this share of printable bytes a buffer dies in tcc's lexer on the first
+# bad character, so every such buffer covers the same few lines
+MIN_PRINTABLE_RATIO = 0.5
+PRINTABLE = frozenset(range(0x20, 0x7F)) | {0x09, 0x0A, 0x0D}
+SYMBOLIC_CALL = re.compile(
+    r'klee_make_symbolic\s*\(\s*&?\s*(\w+)\s*,[^;]*?"(input_\d+)"\s*\)'
+)
+CHAR_BUFFER = r"\bchar\s+{}\s*\[\s*(\d+)\s*\]"
+
+
+def rewrite_layout(source: str) -> list[tuple[str, int | None]]:
+    """
+    The input_N objects a KLEE rewrite makes symbolic, in N order, with the
+    size of each one's char buffer, or None when the variable is not a
+    constant-size char array (an int, a struct, a malloc'd pointer). Only
+    char buffers replay as tcc source, see build_prompt in
+    klee/generate_klee_rewrite.py.
+    """
+    layout = {}
+    for variable, name in SYMBOLIC_CALL.findall(source):
+        match = re.search(CHAR_BUFFER.format(re.escape(variable)), source)
+        layout[name] = int(match.group(1)) if match else None
+    return sorted(layout.items(), key=lambda item: int(item[0][6:]))
+
+
+def object_text(data) -> bytes:
+    """
+    The part of one symbolic buffer tcc would see: the rewrites hand it over
+    as a C string, so anything after the first NUL is never read.
+    """
+    data = bytes(data)
+    end = data.find(b"\0")
+    return data if end < 0 else data[:end]
+
+
+def replay_buffer(inputs) -> bytes:
+    """
+    The tcc source buffer for a ktest, given its input objects in input_N order
+    (see klee.ktest.input_objects).
+    """
+    return OBJECT_SEPARATOR.join(object_text(data) for data in inputs)
+
+
+def objects_digest(inputs) -> str:
+    """
+    Hash of the input objects as tcc reads them. Two ktests that differ only
+    past a terminator, which KLEE often reports as separate paths, share it.
+    """
+    digest = hashlib.sha256()
+    for data in inputs:
+        text = object_text(data)
+        digest.update(len(text).to_bytes(8, "little"))
+        digest.update(text)
+    return digest.hexdigest()
+
+
+def is_noise(buffer: bytes) -> bool:
+    printable = sum(1 for byte in buffer if byte in PRINTABLE)
+    return printable < MIN_PRINTABLE_RATIO * len(buffer)
@@ -5,15 +5,35 @@ import subprocess
 from datetime import datetime
 
 
-def run_klee(bitcode_path, output_dir):
+def run_klee(
+    bitcode_path,
+    output_dir,
+    max_time=None,
+    max_memory=None,
+    max_solver_time=None,
+    stdout=None,
+):
+    """
+    max_time: total exploration time in seconds (--max-time)
+    max_memory: memory cap in MB (--max-memory)
+    max_solver_time: per-query solver timeout in seconds (--max-solver-time)
+    stdout: file to send KLEE's output to, e.g. a per-run log in parallel runs
+    """
     # KLEE must create this directory itself — so we can't pre-create it
     if os.path.exists(output_dir):
         raise FileExistsError(f"KLEE output directory already exists: {output_dir}")
 
     print(f"[+] Running KLEE on: {bitcode_path}")
-    cmd = ["klee", "--output-dir=" + output_dir, bitcode_path]
+    cmd = ["klee", "--output-dir=" + output_dir]
+    if max_time:
+        cmd.append(f"--max-time={max_time}s")
+    if max_memory:
+        cmd.append(f"--max-memory={max_memory}")
+    if max_solver_time:
+        cmd.append(f"--max-solver-time={max_solver_time}s")
+    cmd.append(str(bitcode_path))
     print(f"[>] Executing: {' '.join(cmd)}")
-    subprocess.run(cmd, check=True)
+    subprocess.run(cmd, check=True, stdout=stdout, stderr=subprocess.STDOUT if stdout else None)
 
 
 if __name__ == "__main__":
@@ -23,6 +43,18 @@ if __name__ == "__main__":
         "--outdir",
         help="Optional name for output directory under artifacts/klee/klee_output",
     )
+    parser.add_argument(
+        "--max-time", type=int, default=None, help="KLEE exploration time limit in seconds"
+    )
+    parser.add_argument(
+        "--max-memory", type=int, default=None, help="KLEE memory limit in MB"
+    )
+    parser.add_argument(
+        "--max-solver-time",
+        type=int,
+        default=None,
+        help="Time limit for a single solver query in seconds",
+    )
 
     args = parser.parse_args()
 
@@ -38,4 +70,10 @@ if __name__ == "__main__":
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_dir = os.path.join(base_outdir, f"run_{timestamp}")
 
-    run_klee(args.bitcode_path, output_dir)
+    run_klee(
+        args.bitcode_path,
+        output_dir,
+        max_time=args.max_time,
+        max_memory=args.max_memory,
+        max_solver_time=args.max_solver_time,
+    )
@@ -1,9 +1,16 @@
+import multiprocessing
 import os
 import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 import argparse
 
+from build.cache import build_bitcode
+from klee.run_klee_only import run_klee
 
 load_dotenv(".env")
 
@@ -11,75 +18,173 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 SRC_DIR = REPO_ROOT / "c_program/src"
 REWRITE_DIR = REPO_ROOT / "artifacts/klee/rewrite"
 LLVM_DIR = REPO_ROOT / "artifacts/klee/llvm"
+KLEE_OUTPUT_DIR = REPO_ROOT / "artifacts/klee/klee_output"
+LOG_DIR = REPO_ROOT / "artifacts/klee/logs"
 
 
-def run(cmd, cwd=None):
-    print(f"[>] Running: {' '.join(str(c) for c in cmd)}")
-    subprocess.run(cmd, check=True, cwd=cwd)
-
-
-def rewrite_for_klee(src_path: Path, outname: str):
-    print(f"[1] Rewriting {src_path.name} for KLEE with Gemini...")
-    run(
-        [
-            "python3",
-            "scripts/klee/generate_klee_rewrite.py",
-            str(src_path),
-            "--outname",
-            outname,
-            "--additional-prompt",
-            str(ADDITIONAL_PROMPT),
-        ],
-        cwd=REPO_ROOT,
-    )
+@dataclass
+class KleeOptions:
+    additional_prompt: str = ""
+    jobs: int = min(4, os.cpu_count() or 1)
+    max_time: int = 600
+    max_memory: int = 2000
+    max_solver_time: int = 30
+
+
+@dataclass
+class KleeResult:
+    # One process_rewrite() row per source: file, status, tests, seconds
+    files: list[dict] = field(default_factory=list)
 
+    @property
+    def total_tests(self):
+        return sum(r["tests"] for r in self.files)
 
-def compile_bitcode(rewrite_name: str):
+
+def compile_bitcode(rewrite_name: str, log=None):
     print(f"[2] Compiling {rewrite_name}.c to LLVM bitcode...")
-    target = f"../artifacts/klee/llvm/{rewrite_name}.bc"
-    run(["make", target], cwd=REPO_ROOT / "c_program")
+    build_bitcode(rewrite_name, log=log)
 
 
-def run_klee_on_bc(rewrite_name: str):
+def run_klee_on_bc(rewrite_name: str, limits: dict, log=None) -> Path:
     bc_path = LLVM_DIR / f"{rewrite_name}.bc"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Parallel runs start in the same second, so the file name keeps them apart
+    output_dir = KLEE_OUTPUT_DIR / f"run_{timestamp}_{rewrite_name}"
     print(f"[3] Running KLEE on {bc_path.name}...")
-    run(
-        ["python3", "scripts/klee/run_klee_only.py", str(bc_path)],
-        cwd=REPO_ROOT,
+    KLEE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    run_klee(bc_path, str(output_dir), stdout=log, **limits)
+    return output_dir
+
+
+def process_rewrite(rewrite_name: str, limits: dict) -> dict:
+    """
+    Compile one rewritten source and run KLEE on it, logging both to
+    artifacts/klee/logs/<rewrite_name>.log. Runs in a pool worker.
+    """
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    start = time.monotonic()
+    result = {"file": rewrite_name, "status": "ok", "tests": 0, "output_dir": None}
+    with open(LOG_DIR / f"{rewrite_name}.log", "w") as log:
+        try:
+            compile_bitcode(rewrite_name, log=log)
+            output_dir = run_klee_on_bc(rewrite_name, limits, log=log)
+            result["output_dir"] = str(output_dir)
+            result["tests"] = len(list(output_dir.glob("*.ktest")))
+        except subprocess.CalledProcessError as e:
+            result["status"] = f"failed ({Path(e.cmd[0]).name} exited {e.returncode})"
+        except Exception as e:
+            print(f"[!] {rewrite_name}: {e!r}", file=log)
+            result["status"] = f"failed ({type(e).__name__}: {e})"
+    result["seconds"] = round(time.monotonic() - start, 1)
+    return result
+
+
+def format_summary_table(results: list[dict]) -> str:
+    width = max([len(r["file"]) for r in results] + [4])
+    rows = [f"{'file':<{width}}  {'tests':>6}  {'wall s':>8}  status"]
+    for r in sorted(results, key=lambda r: r["file"]):
+        rows.append(
+            f"{r['file']:<{width}}  {r['tests']:>6}  {r['seconds']:>8.1f}  {r['status']}"
+        )
+    rows.append(
+        f"{'total':<{width}}  {sum(r['tests'] for r in results):>6}  "
+        f"{sum(r['seconds'] for r in results):>8.1f}"
     )
+    return "\n".join(rows)
 
 
-def full_klee_pipeline():
+def full_klee_pipeline(options: KleeOptions | None = None) -> KleeResult:
+    options = options or KleeOptions()
     src_files = list(SRC_DIR.glob("*.c"))
     if not src_files:
         print("❌ No .c files found in c_program/src/")
-        return
-
-    for src_path in src_files:
-        base_name = src_path.stem
-        rewrite_name = f"{base_name}_klee"
-
-        print(f"\n🚀 Processing {src_path.name}")
-        try:
-            rewrite_for_klee(src_path, rewrite_name)
-            compile_bitcode(rewrite_name)
-            run_klee_on_bc(rewrite_name)
-            print(f"[✓] {base_name} complete.\n")
-        except subprocess.CalledProcessError as e:
-            print(f"[!] Error processing {base_name}: {e}\n")
-
-
-if __name__ == "__main__":
-
-    parser = argparse.ArgumentParser(description="Run AFL fuzzing pipeline")
+        return KleeResult()
+
+    # Pulls in the LLM layer, which the pool workers never need
+    from klee.generate_klee_rewrite import rewrite_many
+
+    limits = {
+        "max_time": options.max_time,
+        "max_memory": options.max_memory,
+        "max_solver_time": options.max_solver_time,
+    }
+    print(f"🚀 Processing {len(src_files)} sources with {options.jobs} KLEE worker(s)")
+    print(f"[1] Rewriting {len(src_files)} sources for KLEE...")
+    # Workers are spawned, not forked from a process holding LLM client threads
+    with ProcessPoolExecutor(
+        max_workers=options.jobs, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = {}
+
+        def submit(rewrite_path: Path):
+            # Each file starts compiling as soon as its rewrite arrives
+            futures[rewrite_path.stem] = pool.submit(
+                process_rewrite, rewrite_path.stem, limits
+            )
+
+        rewrite_many(
+            [(src_path, f"{src_path.stem}_klee") for src_path in src_files],
+            options.additional_prompt,
+            on_written=submit,
+        )
+
+        results = []
+        for src_path in src_files:
+            rewrite_name = f"{src_path.stem}_klee"
+            if rewrite_name not in futures:
+                results.append(
+                    {"file": rewrite_name, "status": "rewrite failed", "tests": 0, "seconds": 0.0}
+                )
+                continue
+            try:
+                result = futures[rewrite_name].result()
+            except Exception as e:
+                # e.g. the worker died; the other files' results still count
+                result = {
+                    "file": rewrite_name,
+                    "status": f"failed ({type(e).__name__}: {e})",
+                    "tests": 0,
+                    "seconds": 0.0,
+                    "output_dir": None,
+                }
+            mark = "✓" if result["status"] == "ok" else "!"
+            print(f"[{mark}] {rewrite_name}: {result['tests']} tests, {result['status']}")
+            results.append(result)
+
+    print("\n" + format_summary_table(results))
+    print(f"[+] Per-file logs in {LOG_DIR}")
+    return KleeResult(files=results)
+
+
+def parse_options(argv=None) -> KleeOptions:
+    parser = argparse.ArgumentParser(description="Run KLEE symbolic execution pipeline")
     parser.add_argument(
         "--additional-prompt",
         type=str,
         default="",
         help="Additional Prompt to Fine Tune Rewriting",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Number of files compiled and run through KLEE at once",
+    )
+    parser.add_argument(
+        "--max-time", type=int, default=600, help="KLEE time limit per file in seconds"
+    )
+    parser.add_argument(
+        "--max-memory", type=int, default=2000, help="KLEE memory limit per file in MB"
+    )
+    parser.add_argument(
+        "--max-solver-time",
+        type=int,
+        default=30,
+        help="Time limit for a single solver query in seconds",
+    )
+    return KleeOptions(**vars(parser.parse_args(argv)))
 
-    args = parser.parse_args()
-    ADDITIONAL_PROMPT = args.additional_prompt
 
-    full_klee_pipeline()
+if __name__ == "__main__":
+    full_klee_pipeline(parse_options())
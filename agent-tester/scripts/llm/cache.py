@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+""" On-disk LLM response cache keyed by model, temperature, prompt and sample index, with an LRU size cap and a TTL """
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+CACHE_DIR = ROOT_DIR / "artifacts/llm-cache"
+MAX_BYTES = 256 * 1024 * 1024
+TTL_SECONDS = 7 * 24 * 3600
+
+
+class ResponseCache:
+    """
+    One JSON file per response. A hit touches the file's mtime, so eviction
+    removes the least recently used entries once the cache exceeds max_bytes;
+    entries older than ttl_seconds (by creation time) are never returned.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES, ttl_seconds=TTL_SECONDS):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name, temperature, prompt: str, sample_index: int) -> str:
+        payload = json.dumps([model_name, temperature, prompt, sample_index])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if time.time() - entry["created"] > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another run since it was read, the response still holds
+            pass
+        self.hits += 1
+        return entry["response"]
+
+    def put(self, key: str, response: str):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Write then rename, so concurrent runs never read a partial entry. The
+        # temp name is unique, as threads of one process can put the same key
+        tmp = tempfile.NamedTemporaryFile(
+            "w", dir=self.root, prefix=f".{key}.", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp:
+                json.dump({"created": time.time(), "response": response}, tmp)
+            os.replace(tmp.name, path)
+        except BaseException:
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently used ones until the cache
+        fits in max_bytes. Called once per batch rather than on every put.
+        """
+        if not self.root.exists():
+            return
+        now = time.time()
+        entries = []
+        total = 0
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(".json"):
+                continue
+            # Another run may evict or expire the same entries at the same time
+            try:
+                stat = entry.stat()
+                # mtime >= creation time, so an expired mtime means an expired entry
+                if now - stat.st_mtime > self.ttl_seconds:
+                    os.unlink(entry.path)
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def get_cache():
+    """
+    The shared response cache, or None when LLM_CACHE=0. LLM_CACHE_TTL and
+    LLM_CACHE_MAX_MB override the defaults.
+    """
+    if os.environ.get("LLM_CACHE", "1") == "0":
+        return None
+    return ResponseCache(
+        max_bytes=int(float(os.environ.get("LLM_CACHE_MAX_MB", MAX_BYTES / 2**20)) * 2**20),
+        ttl_seconds=float(os.environ.get("LLM_CACHE_TTL", TTL_SECONDS)),
+    )
@@ -0,0 +1,242 @@
+import argparse
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+""" Function-level prompt context: an on-disk index of every function in c_program/src, sliced by latest coverage within a token budget """
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from gcov.model import CoverageModel, list_snapshots
+
+SRC_DIR = ROOT_DIR / "c_program/src"
+INDEX_PATH = ROOT_DIR / "artifacts/llm-context/function_index.json"
+RESULTS_DIR = ROOT_DIR / "artifacts/final-results"
+# Bump when scan_functions changes, so stale indexes are rebuilt
+INDEX_VERSION = 1
+CONTEXT_TOKENS = 3000
+# Rough size of a token in C source, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Comments, string and character literals, blanked before scanning for braces
+NOISE = re.compile(
+    r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'", re.DOTALL
+)
+FUNCTION_HEADER = re.compile(r"([A-Za-z_]\w*)\s*\((?:[^()]|\([^()]*\))*\)\s*$")
+NOT_FUNCTIONS = {"if", "for", "while", "switch", "return", "sizeof"}
+
+
+def _blank(text: str) -> str:
+    return re.sub(r"[^\n]", " ", text)
+
+
+# Markers left in place of conditional directives for the brace scanner
+PP_IF, PP_ELSE, PP_ENDIF = "\x01", "\x02", "\x03"
+
+
+def _mask(text: str) -> str:
+    """
+    Return text with comments, literals and preprocessor lines blanked out.
+    #if/#else/#endif lines keep a one-character marker so the scanner can
+    rewind the brace depth per branch. Offsets and line numbers are unchanged.
+    """
+    text = NOISE.sub(lambda m: _blank(m.group()), text)
+    lines = text.split("\n")
+    continued = False
+    for i, line in enumerate(lines):
+        directive = line.lstrip()
+        if not continued and not directive.startswith("#"):
+            continue
+        marker = " "
+        if not continued:
+            word = directive[1:].split(maxsplit=1)
+            word = word[0] if word else ""
+            if word.startswith("if"):
+                marker = PP_IF
+            elif word in ("else", "elif"):
+                marker = PP_ELSE
+            elif word == "endif":
+                marker = PP_ENDIF
+        continued = line.rstrip().endswith("\\")
+        lines[i] = marker + _blank(line)[1:]
+    return "\n".join(lines)
+
+
+def scan_functions(text: str) -> list[list]:
+    """
+    Find the top-level function definitions in one C source. Returns
+    [name, start_line, end_line, start_offset, end_offset] for each.
+
+    Every branch of an #if is scanned from the depth the #if started at, and
+    the first branch's depth is kept after #endif, so a definition whose
+    opening line differs per branch still balances.
+    """
+    masked = _mask(text)
+    functions = []
+    depth = 0
+    header_start = 0
+    header = ""
+    conditionals = []  # [depth at #if, depth at end of first branch]
+    for m in re.finditer(f"[{{}};{PP_IF}{PP_ELSE}{PP_ENDIF}]", masked):
+        c, pos = m.group(), m.start()
+        if c == PP_IF:
+            conditionals.append([depth, None])
+        elif c == PP_ELSE and conditionals:
+            if conditionals[-1][1] is None:
+                conditionals[-1][1] = depth
+            depth = conditionals[-1][0]
+        elif c == PP_ENDIF and conditionals:
+            start_depth, first_depth = conditionals.pop()
+            if first_depth is not None:
+                depth = first_depth
+        elif c == "{":
+            if depth == 0:
+                header = masked[header_start:pos]
+            depth += 1
+        elif c == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                match = FUNCTION_HEADER.search(header.strip())
+                if (
+                    match
+                    and match.group(1) not in NOT_FUNCTIONS
+                    and "=" not in header
+                ):
+                    start = header_start + len(header) - len(header.lstrip())
+                    functions.append(
+                        [
+                            match.group(1),
+                            text.count("\n", 0, start) + 1,
+                            text.count("\n", 0, pos) + 1,
+                            start,
+                            pos + 1,
+                        ]
+                    )
+                header_start = pos + 1
+        elif c == ";" and depth == 0:
+            header_start = pos + 1
+    return functions
+
+
+def _read(path: Path) -> str:
+    return path.read_text(errors="replace")
+
+
+def load_function_index(src_dir=SRC_DIR, index_path=INDEX_PATH) -> dict:
+    """
+    Return {file name: [function entries]} for every .c file in src_dir. The
+    index is cached on disk and a file is only re-scanned when its hash changes.
+    """
+    index_path = Path(index_path)
+    cached = json.loads(index_path.read_text()) if index_path.exists() else {}
+    if cached.get("version") != INDEX_VERSION:
+        cached = {"version": INDEX_VERSION, "files": {}}
+    index = {}
+    changed = False
+    for path in sorted(Path(src_dir).glob("*.c")):
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        entry = cached["files"].get(path.name)
+        if not entry or entry["sha256"] != digest:
+            entry = {"sha256": digest, "functions": scan_functions(_read(path))}
+            changed = True
+        index[path.name] = entry
+    if changed or index.keys() != cached["files"].keys():
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        index_path.write_text(
+            json.dumps(
+                {"version": INDEX_VERSION, "files": index}, separators=(",", ":")
+            )
+        )
+    return {name: entry["functions"] for name, entry in index.items()}
+
+
+def latest_coverage(results_dir=RESULTS_DIR):
+    snapshots = list_snapshots(results_dir)
+    return CoverageModel.load(snapshots[-1]) if snapshots else None
+
+
+def rank_functions(index: dict, model=None) -> list[tuple]:
+    """
+    Return (file, function entry, covered lines, total lines) sorted from least
+    to most covered, larger gaps first. With a coverage model, functions gcov
+    has no lines for (other targets' code) are left out.
+    """
+    by_name = {}
+    if model:
+        # gcov reports paths relative to the build dir; prefer src/ over include/
+        for path, file_cov in sorted(model.files.items(), key=lambda kv: "src/" not in kv[0]):
+            by_name.setdefault(Path(path).name, file_cov)
+
+    ranked = []
+    for filename, functions in index.items():
+        file_cov = by_name.get(filename)
+        if model and not file_cov:
+            continue
+        for function in functions:
+            _, start_line, end_line, _, _ = function
+            counts = []
+            if file_cov:
+                counts = [
+                    count
+                    for line, count in file_cov.lines.items()
+                    if start_line <= line <= end_line
+                ]
+                if not counts:
+                    # Compiled out for this target
+                    continue
+            covered = sum(1 for count in counts if count > 0)
+            ranked.append((filename, function, covered, len(counts)))
+
+    ranked.sort(
+        key=lambda r: (r[2] / r[3] if r[3] else 0.0, -(r[3] - r[2]), r[0], r[1][1])
+    )
+    return ranked
+
+
+def build_context(token_budget=CONTEXT_TOKENS, src_dir=SRC_DIR, model=None) -> str:
+    """
+    Render the least-covered functions (by the latest coverage snapshot unless a
+    model is given) that fit in token_budget, in source order, each headed by
+    its location and current line coverage.
+    """
+    index = load_function_index(src_dir)
+    model = model or latest_coverage()
+
+    budget = token_budget * CHARS_PER_TOKEN
+    selected = []
+    for filename, function, covered, total in rank_functions(index, model):
+        _, start_line, end_line, start, end = function
+        size = end - start
+        if size > budget:
+            continue
+        budget -= size
+        selected.append((filename, function, covered, total))
+        if budget < 200:
+            break
+
+    sources = {}
+    sections = []
+    for filename, function, covered, total in sorted(
+        selected, key=lambda r: (r[0], r[1][1])
+    ):
+        name, start_line, end_line, start, end = function
+        if filename not in sources:
+            sources[filename] = _read(Path(src_dir) / filename)
+        coverage = f"{100 * covered / total:.0f}% of {total} lines" if total else "no data"
+        sections.append(
+            f"// {filename}:{start_line}-{end_line} {name} (covered: {coverage})\n"
+            f"{sources[filename][start:end]}\n"
+        )
+    return "\n".join(sections)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Print the function-level prompt context for the current coverage"
+    )
+    parser.add_argument("--tokens", type=int, default=CONTEXT_TOKENS)
+    args = parser.parse_args()
+    print(build_context(args.tokens))
@@ -0,0 +1,220 @@
+import asyncio
+import inspect
+import os
+import random
+import re
+import zlib
+
+""" Shared LLM generation layer: concurrent prompts with retry, backoff and timeouts over a pluggable backend (Gemini, or an offline mock) """
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+DEFAULT_CONCURRENCY = 4
+# Large requests are split so one response never has to hold every item
+ITEMS_PER_REQUEST = 5
+REQUEST_TIMEOUT = 120
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 2.0
+
+
+class GeminiBackend:
+    def __init__(self, model_name=DEFAULT_MODEL, temperature=None):
+        import google.generativeai as genai
+
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise EnvironmentError(
+                "Please set the GEMINI_API_KEY environment variable."
+            )
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.temperature = temperature
+        self.model = genai.GenerativeModel(
+            model_name,
+            generation_config=(
+                {"temperature": temperature} if temperature is not None else None
+            ),
+        )
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+
+# Templates the mock backend fills in, covering a few different tcc code paths
+MOCK_PROGRAMS = [
+    "int printf(const char *fmt, ...);\n\nint main(void) {{\n    int x = {a};\n    for (int i = 0; i < {b}; i++)\n        x += i * {c};\n    printf(\"%d\\n\", x);\n    return 0;\n}}",
+    "struct point {{ int x; int y; }};\n\nstatic int dot(struct point p, struct point q) {{\n    return p.x * q.x + p.y * q.y;\n}}\n\nint main(void) {{\n    struct point p = {{ {a}, {b} }}, q = {{ {c}, {a} }};\n    return dot(p, q) > {b};\n}}",
+    "#define SQUARE(v) ((v) * (v))\n\nenum color {{ RED = {a}, GREEN, BLUE }};\n\nint main(void) {{\n    enum color c = GREEN;\n    switch (c) {{\n    case RED: return SQUARE({b});\n    case BLUE: return {c};\n    default: return c;\n    }}\n}}",
+    "typedef union {{ float f; unsigned u; }} bits;\n\nint main(void) {{\n    bits b;\n    double d = {a}.5 / {b};\n    b.f = (float)d;\n    return (b.u >> {c}) & 1;\n}}",
+    "static char buf[{a}];\n\nint main(int argc, char **argv) {{\n    char *p = buf;\n    while (p < buf + sizeof(buf) - 1 && argc-- > 0)\n        *p++ = 'a' + {b} % 26;\n    return *buf == {c};\n}}",
+]
+
+# Same layout the rewrite prompt asks for: NUL-terminated char buffers
+# input_1..input_N, joined with newlines in N order and compiled by tcc
+MOCK_KLEE_REWRITE = (
+    "#include <klee/klee.h>\n"
+    "#include <stdio.h>\n"
+    "#include \"tcc.h\"\n\n"
+    "int main(void) {{\n"
+    "    char input_1[{a}];\n"
+    "    char input_2[64];\n"
+    "    char source[sizeof(input_1) + sizeof(input_2)];\n"
+    "    TCCState *s;\n\n"
+    "    klee_make_symbolic(input_1, sizeof(input_1), \"input_1\");\n"
+    "    input_1[sizeof(input_1) - 1] = '\\0';\n"
+    "    klee_make_symbolic(input_2, sizeof(input_2), \"input_2\");\n"
+    "    input_2[sizeof(input_2) - 1] = '\\0';\n"
+    "    snprintf(source, sizeof(source), \"%s\\n%s\", input_1, input_2);\n\n"
+    "    s = tcc_new();\n"
+    "    tcc_set_output_type(s, TCC_OUTPUT_OBJ);\n"
+    "    tcc_compile_string(s, source);\n"
+    "    tcc_delete(s);\n"
+    "    return 0;\n"
+    "}}"
+)
+
+
+class MockBackend:
+    """
+    Offline backend that answers from templates, so the whole pipeline can run
+    and be benchmarked without network access. It reads the requested count and
+    delimiter from the prompt and returns that many distinct C programs; the
+    output is deterministic for a given prompt and call order.
+    """
+
+    def __init__(self, model_name="mock", temperature=None, delay=0.0):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.delay = delay
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        rng = random.Random(zlib.crc32(prompt.encode()) + self.calls)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+        def fill(template):
+            return template.format(
+                a=rng.randint(1, 64), b=rng.randint(1, 64), c=rng.randint(1, 8)
+            )
+
+        if "klee_make_symbolic" in prompt:
+            return f"```c\n{fill(MOCK_KLEE_REWRITE)}\n```"
+
+        count = re.search(r"generate (\d+)", prompt)
+        delimiter = re.search(r"delimiter: `([^`]+)`", prompt)
+        programs = [
+            fill(rng.choice(MOCK_PROGRAMS))
+            for _ in range(int(count.group(1)) if count else 1)
+        ]
+        if not delimiter:
+            return programs[0]
+        sep = delimiter.group(1)
+        return "\n".join(f"{sep}\n{program}" for program in programs) + f"\n{sep}\n"
+
+
+BACKENDS = {"gemini": GeminiBackend, "mock": MockBackend}
+
+
+def get_backend(name=None, **kwargs):
+    """
+    Build the backend named by `name`, or by the LLM_BACKEND environment
+    variable (default "gemini").
+    """
+    name = name or os.environ.get("LLM_BACKEND", "gemini")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {name!r}, expected one of {list(BACKENDS)}")
+    if name == "mock" and "delay" not in kwargs:
+        kwargs["delay"] = float(os.environ.get("LLM_MOCK_DELAY", "0"))
+    return BACKENDS[name](**kwargs)
+
+
+def split_counts(total: int, per_request: int = ITEMS_PER_REQUEST) -> list[int]:
+    """
+    Split a request for `total` items into per-prompt counts, e.g. 12 -> [5, 5, 2].
+    """
+    return [min(per_request, total - i) for i in range(0, total, per_request)]
+
+
+async def _generate_one(backend, prompt, semaphore, timeout, retries, backoff):
+    for attempt in range(retries + 1):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(backend.generate(prompt), timeout)
+            except Exception as e:
+                error = e
+        if attempt < retries:
+            # Exponential backoff with jitter, outside the semaphore
+            delay = backoff * 2**attempt * (1 + random.random())
+            print(f"[!] LLM request failed ({error!r}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    print(f"[!] LLM request failed after {retries + 1} attempts: {error!r}")
+    return None
+
+
+async def generate_many_async(
+    backend,
+    prompts: list[str],
+    on_result=None,
+    concurrency=DEFAULT_CONCURRENCY,
+    timeout=REQUEST_TIMEOUT,
+    retries=MAX_RETRIES,
+    backoff=BACKOFF_SECONDS,
+    cache=None,
+) -> list:
+    """
+    Send every prompt with at most `concurrency` requests in flight. Each
+    response is passed to on_result(index, text) as soon as it arrives, so
+    callers can write results to disk while the rest are still pending.
+    on_result runs on the event loop: it may be a coroutine function, and
+    anything slow in it belongs in asyncio.to_thread so other responses keep
+    being handled. Returns the responses in prompt order, with None for
+    failed requests.
+
+    With a ResponseCache, a prompt's n-th repeat in the batch is its sample
+    index, so a split request reuses one cached response per sample.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    seen = {}
+
+    async def deliver(index, text):
+        if on_result and inspect.isawaitable(result := on_result(index, text)):
+            await result
+
+    async def run(index, prompt, sample_index):
+        key = None
+        if cache:
+            key = cache.key(
+                backend.model_name, backend.temperature, prompt, sample_index
+            )
+            text = cache.get(key)
+            if text is not None:
+                await deliver(index, text)
+                return text
+
+        text = await _generate_one(
+            backend, prompt, semaphore, timeout, retries, backoff
+        )
+        if text is not None:
+            if key:
+                cache.put(key, text)
+            await deliver(index, text)
+        return text
+
+    requests = []
+    for index, prompt in enumerate(prompts):
+        sample_index = seen[prompt] = seen.get(prompt, -1) + 1
+        requests.append(run(index, prompt, sample_index))
+    results = await asyncio.gather(*requests)
+    if cache:
+        cache.evict()
+        print(f"[+] LLM cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    return results
+
+
+def generate_many(backend, prompts: list[str], on_result=None, **kwargs) -> list:
+    """
+    Blocking wrapper around generate_many_async for the synchronous scripts.
+    """
+    return asyncio.run(generate_many_async(backend, prompts, on_result, **kwargs))
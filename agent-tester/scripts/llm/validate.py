@@ -0,0 +1,121 @@
+import functools
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+""" Validation gate for LLM-generated programs: compile each candidate with a plain tcc before it is saved, and log the rejects with tcc's reason """
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from build.cache import TARGETS, build
+
+REJECT_LOG = ROOT_DIR / "artifacts/llm-rejects.jsonl"
+CHECK_TIMEOUT = 3
+# Same include paths coverage_orchestrator.tcc_args passes to the replayed tcc
+INCLUDE_DIRS = [
+    ROOT_DIR / "c_program/include",
+    Path("/usr/include"),
+    Path("/usr/lib/gcc/x86_64-linux-gnu/11/include"),
+]
+ERROR_LINE = re.compile(r"^(.+?):(\d+): error: (.*)$", re.MULTILINE)
+SNIPPET_CHARS = 200
+
+
+@functools.lru_cache(maxsize=None)
+def check_binary():
+    """
+    Build (or restore) the uninstrumented tcc once per process. Returns None
+    when it cannot be built, which turns validation off.
+    """
+    try:
+        build("check_bin")
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[!] Could not build the validation tcc ({e}), skipping validation")
+        return None
+    return TARGETS["check_bin"][0]
+
+
+def check_program(text: str, binary, scratch_dir) -> str | None:
+    """
+    Compile text the way the replay does and return why tcc rejects it, or
+    None when it compiles. tcc parses and generates code in one pass, so a
+    compile to /dev/null is its syntax check.
+    """
+    if not text.strip():
+        return "empty"
+
+    fd, path = tempfile.mkstemp(suffix=".c", dir=scratch_dir)
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    args = [str(binary), "-c", path, "-o", os.devnull]
+    for include_dir in INCLUDE_DIRS:
+        args += ["-I", str(include_dir)]
+
+    try:
+        result = subprocess.run(
+            args, capture_output=True, text=True, timeout=CHECK_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        return f"timed out after {CHECK_TIMEOUT}s"
+    finally:
+        os.unlink(path)
+
+    if result.returncode == 0:
+        return None
+    match = ERROR_LINE.search(result.stderr)
+    if match:
+        file, line, message = match.groups()
+        # Errors inside an included header name the header
+        where = f"line {line}" if file == path else f"{file}:{line}"
+        return f"{where}: {message}"
+    lines = result.stderr.strip().splitlines()
+    return lines[-1] if lines else f"exit status {result.returncode}"
+
+
+def log_rejects(rejects, source: str, log_path=REJECT_LOG):
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a") as f:
+        for text, reason in rejects:
+            record = {
+                "time": time.time(),
+                "source": source,
+                "reason": reason,
+                "snippet": text[:SNIPPET_CHARS],
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def filter_valid(candidates: list[str], source: str, jobs=None) -> list[str]:
+    """
+    Return the candidates tcc compiles, in order, checking them in parallel.
+    The rest go to the reject log under source. LLM_VALIDATE=0 turns the gate
+    off.
+    """
+    if not candidates or os.environ.get("LLM_VALIDATE", "1") == "0":
+        return list(candidates)
+    binary = check_binary()
+    if binary is None:
+        return list(candidates)
+
+    with tempfile.TemporaryDirectory(prefix="llm-validate-") as scratch_dir:
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+            reasons = list(
+                pool.map(lambda text: check_program(text, binary, scratch_dir), candidates)
+            )
+
+    accepted = [text for text, reason in zip(candidates, reasons) if reason is None]
+    rejects = [(text, reason) for text, reason in zip(candidates, reasons) if reason]
+    if rejects:
+        log_rejects(rejects, source)
+        print(
+            f"[!] {len(rejects)}/{len(candidates)} {source} candidates rejected by tcc, "
+            f"see {REJECT_LOG}"
+        )
+    return accepted
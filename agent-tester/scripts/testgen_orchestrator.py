@@ -1,8 +1,11 @@
-import os
 import argparse
+import asyncio
 import logging
-import google.generativeai as genai
-from afl.generate_afl_seeds import read_c_programs_with_filenames
+from dataclasses import dataclass
+from llm.cache import get_cache
+from llm.context import CONTEXT_TOKENS, build_context
+from llm.generate import DEFAULT_CONCURRENCY, generate_many, get_backend, split_counts
+from llm.validate import filter_valid
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -11,25 +14,28 @@ load_dotenv(ROOT_DIR / ".env")
 
 logging.basicConfig(level=logging.INFO, format="[*] %(message)s")
 
+SEED_DELIMITER = "----"
+ARTIFACT_DIR = ROOT_DIR / "artifacts/llm-testgen"
 
-def init_gemini():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise EnvironmentError("Please set the GEMINI_API_KEY environment variable.")
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel("gemini-2.0-flash")
 
+@dataclass
+class TestgenOptions:
+    num_tests: int = 10
+    additional_prompt: str = ""
+    context_tokens: int = CONTEXT_TOKENS
+    concurrency: int = DEFAULT_CONCURRENCY
 
-def generate_tests_with_gemini(num_tests=10, additional_prompt=""):
-    src_dir = ROOT_DIR / "c_program/src"
-    artifact_dir = ROOT_DIR / "artifacts/llm-testgen"
-    artifact_dir.mkdir(parents=True, exist_ok=True)
 
-    NUM_SEEDS = num_tests
-    SEED_DELIMITER = "----"
+@dataclass
+class TestgenResult:
+    written: int
+    output_dir: str
+
 
+def build_prompt(num_tests, context, additional_prompt=""):
+    NUM_SEEDS = num_tests
     header = (
-        "You are helping evaluate a C program using gcov for code coverage. The codebase consists of several C files listed below.\n\n"
+        "You are helping evaluate a C program using gcov for code coverage. Below are the functions of its codebase with the lowest coverage so far.\n\n"
         f"Please generate {NUM_SEEDS} diverse inputs that may trigger different execution paths or edge cases in the program.\n"
         "- Inputs should be realistic for the program under test\n"
         "- Return only inputs that will be *accepted* by the program via CLI file input.\n\n"
@@ -43,40 +49,79 @@ def generate_tests_with_gemini(num_tests=10, additional_prompt=""):
         "seed 2\n"
         f"{SEED_DELIMITER}\n\n"
         "Please format individual seeds as the program would require via file input.\n\n"
-        "C programs:\n"
+        "Source functions (file, line range and current line coverage in each header comment):\n"
         "Remember, nothing besides delimiters and input text"
     )
 
-    programs = read_c_programs_with_filenames(src_dir)
-    program_text = ""
-    for filename, content in programs:
-        if filename == "tcc.c":
-            program_text = f"{filename}:\n{content}\n"
-    if not program_text:
-        raise FileNotFoundError("tcc.c not found in source directory.")
-
-    model = init_gemini()
-    final_prompt = (
+    return (
         header
         + "\n\n"
-        + program_text
+        + context
         + "\n\n"
         + "Additional Instructions to Fine Tune Generated Tests:\n"
         + additional_prompt
     )
 
-    response = model.generate_content(final_prompt)
-    test_cases = response.text.strip().split(f"\n{SEED_DELIMITER}\n")
-    test_cases = [case.strip() for case in test_cases if case.strip()]
 
-    for i, case in enumerate(test_cases):
-        logging.info(f"Writing test case {i:03d}")
-        test_file = artifact_dir / f"test_{i:03d}.c"
-        test_file.write_text(case.strip("```").strip("---") + "\n")
-    print(f"[✔] {len(test_cases)} test cases written to {artifact_dir}")
+def generate_tests_with_gemini(
+    num_tests=10,
+    additional_prompt="",
+    backend=None,
+    concurrency=DEFAULT_CONCURRENCY,
+    context_tokens=CONTEXT_TOKENS,
+) -> TestgenResult:
+    """
+    Generate num_tests test programs as several concurrent smaller requests,
+    writing each response's test cases to artifacts/llm-testgen as it arrives.
+    """
+    src_dir = ROOT_DIR / "c_program/src"
+    ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
 
+    context = build_context(context_tokens, src_dir)
+    if not context:
+        raise FileNotFoundError(f"No C functions found in {src_dir}.")
 
-if __name__ == "__main__":
+    backend = backend or get_backend()
+    prompts = [
+        build_prompt(count, context, additional_prompt)
+        for count in split_counts(num_tests)
+    ]
+    written = 0
+
+    async def on_result(_, text):
+        nonlocal written
+        test_cases = [
+            case.strip().strip("```").strip("---") + "\n"
+            for case in text.strip().split(f"\n{SEED_DELIMITER}\n")
+            if case.strip()
+        ]
+        # Only programs tcc accepts are worth a replay. The check runs tcc,
+        # so it runs off the event loop while other responses stream in.
+        valid = await asyncio.to_thread(filter_valid, test_cases, "llm-testgen")
+        for case in valid:
+            logging.info(f"Writing test case {written:03d}")
+            test_file = ARTIFACT_DIR / f"test_{written:03d}.c"
+            test_file.write_text(case)
+            written += 1
+
+    generate_many(
+        backend, prompts, on_result, concurrency=concurrency, cache=get_cache()
+    )
+    print(f"[✔] {written} test cases written to {ARTIFACT_DIR}")
+    return TestgenResult(written=written, output_dir=str(ARTIFACT_DIR))
+
+
+def run_testgen(options: TestgenOptions | None = None) -> TestgenResult:
+    options = options or TestgenOptions()
+    return generate_tests_with_gemini(
+        num_tests=options.num_tests,
+        additional_prompt=options.additional_prompt,
+        concurrency=options.concurrency,
+        context_tokens=options.context_tokens,
+    )
+
+
+def parse_options(argv=None) -> TestgenOptions:
     parser = argparse.ArgumentParser(
         description="Generate LLM test inputs for a C program"
     )
@@ -89,7 +134,20 @@ if __name__ == "__main__":
         default="",
         help="Additional Prompt to Fine Tune Generated Tests",
     )
-    args = parser.parse_args()
-    generate_tests_with_gemini(
-        num_tests=args.num_tests, additional_prompt=args.additional_prompt
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=CONTEXT_TOKENS,
+        help="Token budget for the least-covered source functions put in the prompt",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum number of LLM requests in flight",
     )
+    return TestgenOptions(**vars(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    run_testgen(parse_options())
@@ -0,0 +1,24 @@
+#include <klee/klee.h>
+#include <stdio.h>
+#include "tcc.h"
+
+int main(int argc, char **argv)
+{
+    char input_1[32];
+    char input_2[48];
+    char source[sizeof(input_1) + sizeof(input_2)];
+    TCCState *s;
+
+    klee_make_symbolic(input_1, sizeof(input_1), "input_1");
+    input_1[sizeof(input_1) - 1] = '\0';
+    klee_make_symbolic(input_2, sizeof(input_2), "input_2");
+    input_2[sizeof(input_2) - 1] = '\0';
+
+    snprintf(source, sizeof(source), "%s\n%s", input_1, input_2);
+
+    s = tcc_new();
+    tcc_set_output_type(s, TCC_OUTPUT_OBJ);
+    tcc_compile_string(s, source);
+    tcc_delete(s);
+    return 0;
+}
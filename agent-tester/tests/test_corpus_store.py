@@ -0,0 +1,113 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from corpus import store as corpus_store
+from corpus.store import INDEX_NAME, CorpusStore, content_hash
+
+
+def stored(root):
+    # A fresh store, so the index is read back from disk
+    store = CorpusStore(root)
+    try:
+        return [(entry.source, entry.run_id, data) for entry, data in store.stream()]
+    finally:
+        store.close()
+
+
+def test_add_many_round_trips_text_and_bytes(tmp_path):
+    store = CorpusStore(tmp_path)
+    written = store.add_many(
+        [("run_1", "int main(void) { return 0; }"), ("run_2", b"\xff\x00bytes"), ("run_3", b"")],
+        "afl",
+    )
+    store.close()
+
+    assert written == 3
+    assert stored(tmp_path) == [
+        ("afl", "run_1", b"int main(void) { return 0; }"),
+        ("afl", "run_2", b"\xff\x00bytes"),
+        ("afl", "run_3", b""),
+    ]
+
+
+def test_add_many_skips_inputs_already_stored(tmp_path):
+    store = CorpusStore(tmp_path)
+    assert store.add_many([("run_1", "a"), ("run_2", "b"), ("run_3", "a")], "llm") == 2
+    assert store.add_many([("run_4", "b"), ("run_5", "c")], "klee") == 1
+    store.close()
+
+    assert stored(tmp_path) == [
+        ("llm", "run_1", b"a"),
+        ("llm", "run_2", b"b"),
+        ("klee", "run_5", b"c"),
+    ]
+    # A second store on the same directory sees what the first one wrote
+    assert CorpusStore(tmp_path).add_many([("run_6", "a")], "seed") == 0
+
+
+def test_segments_roll_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(corpus_store, "SEGMENT_BYTES", 8)
+    inputs = [(f"run_{i}", f"input {i:02d}") for i in range(5)]
+    store = CorpusStore(tmp_path)
+    store.add_many(inputs[:3], "afl")
+    store.add_many(inputs[3:], "afl")
+    store.close()
+
+    assert len(list(tmp_path.glob("segment_*.pack"))) == 5
+    assert [data for _, _, data in stored(tmp_path)] == [i.encode() for _, i in inputs]
+
+
+def write_flat_corpus(root):
+    """
+    A corpus in the layout before segments: one test_case_<sha256>.c per
+    input and an index without offsets, plus a file the index does not know.
+    """
+    root.mkdir()
+    records = []
+    for run_id, data in [("run_1", b"int a;"), ("run_2", b"int b;")]:
+        digest = content_hash(data)
+        (root / f"test_case_{digest}.c").write_bytes(data)
+        records.append({"hash": digest, "source": "afl", "run_id": run_id, "first_seen": None})
+    (root / INDEX_NAME).write_text("".join(json.dumps(r) + "\n" for r in records))
+    (root / f"test_case_{content_hash(b'int c;')}.c").write_bytes(b"int c;")
+
+
+def test_flat_corpus_is_migrated_once(tmp_path):
+    root = tmp_path / "corpus"
+    write_flat_corpus(root)
+
+    expected = [
+        ("afl", "run_1", b"int a;"),
+        ("afl", "run_2", b"int b;"),
+        ("legacy", None, b"int c;"),
+    ]
+    assert stored(root) == expected
+    assert not list(root.glob("test_case_*.c"))
+    index = (root / INDEX_NAME).read_text()
+    segments = {p.name: p.read_bytes() for p in root.glob("segment_*.pack")}
+
+    # Loading the migrated corpus again changes nothing
+    assert stored(root) == expected
+    assert (root / INDEX_NAME).read_text() == index
+    assert {p.name: p.read_bytes() for p in root.glob("segment_*.pack")} == segments
+
+
+def test_truncated_segment_drops_its_missing_entries(tmp_path, capsys):
+    store = CorpusStore(tmp_path)
+    store.add_many([("run_1", "first"), ("run_2", "second")], "afl")
+    store.close()
+    segment = next(tmp_path.glob("segment_*.pack"))
+    segment.write_bytes(segment.read_bytes()[: len("first") + 3])
+
+    assert stored(tmp_path) == [("afl", "run_1", b"first")]
+    assert "Ignoring 1 corpus entries" in capsys.readouterr().out
+
+    # The lost input is stored again the next time it is seen
+    store = CorpusStore(tmp_path)
+    assert store.add_many([("run_3", "second")], "afl") == 1
+    store.close()
+    assert stored(tmp_path) == [("afl", "run_1", b"first"), ("afl", "run_3", b"second")]
@@ -0,0 +1,148 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from corpus.minimize import coverage_bitmap, greedy_set_cover
+from gcov.bitset import CoverageBits, CoverageLayout, pack_bits
+from gcov.model import CoverageModel
+
+
+def gcov_document(files):
+    """
+    A `gcov --json-format` document from {path: (lines, functions)}, lines
+    being (line number, count, [branch counts]) and functions (name, count).
+    """
+    return {
+        "files": [
+            {
+                "file": path,
+                "lines": [
+                    {
+                        "line_number": n,
+                        "count": count,
+                        "branches": [{"count": c} for c in branches],
+                    }
+                    for n, count, branches in lines
+                ],
+                "functions": [
+                    {
+                        "name": name,
+                        "start_line": 1,
+                        "end_line": 9,
+                        "execution_count": count,
+                        "blocks": 4,
+                        "blocks_executed": 2 if count else 0,
+                    }
+                    for name, count in functions
+                ],
+            }
+            for path, (lines, functions) in files.items()
+        ]
+    }
+
+
+def model_of(files) -> CoverageModel:
+    return CoverageModel.from_gcov_json(gcov_document(files))
+
+
+# Two runs of the same binary: a.c lines 1-4 with a two-way branch on
+# line 2, b.c lines 1-2
+FIRST = {
+    "a.c": ([(1, 1, []), (2, 1, [1, 0]), (3, 1, []), (4, 0, [])], [("f", 1), ("g", 0)]),
+    "b.c": ([(1, 0, []), (2, 0, [])], [("h", 0)]),
+}
+SECOND = {
+    "a.c": ([(1, 2, []), (2, 2, [0, 2]), (3, 0, []), (4, 2, [])], [("f", 2), ("g", 2)]),
+    "b.c": ([(1, 0, []), (2, 0, [])], [("h", 0)]),
+}
+
+
+def test_model_totals():
+    model = model_of(FIRST)
+    assert (model.lines_covered, model.lines_total) == (3, 6)
+    assert (model.branches_taken, model.branches_total) == (1, 2)
+    assert (model.functions_covered, model.functions_total) == (1, 3)
+    assert model.line_percent == 50.0
+    assert model.files["b.c"].line_percent == 0.0
+
+
+def test_lines_repeated_in_one_document_are_summed():
+    # gcov lists a line once per function instance, e.g. for inlined code
+    model = model_of({"a.c": ([(1, 1, [1, 0]), (1, 2, [0, 1])], [])})
+    assert model.files["a.c"].lines == {1: 3}
+    assert model.files["a.c"].branches == {1: [1, 0, 0, 1]}
+
+
+def test_merge_adds_counters():
+    model = model_of(FIRST).merge(model_of(SECOND))
+    a = model.files["a.c"]
+    assert a.lines == {1: 3, 2: 3, 3: 1, 4: 2}
+    assert a.branches == {2: [1, 2]}
+    assert a.functions["f"].execution_count == 3
+    assert a.functions["g"].execution_count == 2
+    assert a.functions["g"].blocks_executed == 2
+    assert (model.lines_covered, model.branches_taken, model.functions_covered) == (4, 2, 2)
+
+
+def test_merge_takes_files_only_the_other_model_has():
+    model = model_of({"a.c": FIRST["a.c"]}).merge(model_of({"b.c": SECOND["b.c"]}))
+    assert sorted(model.files) == ["a.c", "b.c"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    model = model_of(FIRST)
+    model.save(tmp_path / "coverage0.json.gz")
+    loaded = CoverageModel.load(tmp_path / "coverage0.json.gz")
+    assert loaded.to_dict() == model.to_dict()
+    assert loaded.files["a.c"].lines == {1: 1, 2: 1, 3: 1, 4: 0}
+
+
+def test_pack_bits():
+    assert pack_bits([], 0) == 0
+    assert pack_bits([0, 3, 9], 10) == 0b1000001001
+
+
+def test_layout_orders_slots_by_file_line_and_branch():
+    layout = CoverageLayout.from_model(model_of(SECOND))
+    assert list(layout.lines) == [("a.c", 1), ("a.c", 2), ("a.c", 3), ("a.c", 4), ("b.c", 1), ("b.c", 2)]
+    assert list(layout.branches) == [("a.c", 2, 0), ("a.c", 2, 1)]
+    assert list(layout.functions) == [("a.c", "f"), ("a.c", "g"), ("b.c", "h")]
+    assert layout.size == 11
+
+
+def test_bits_count_union_and_difference():
+    layout = CoverageLayout.from_model(model_of(FIRST))
+    first = CoverageBits.from_model(model_of(FIRST), layout)
+    second = CoverageBits.from_model(model_of(SECOND), layout)
+
+    assert first.counts() == {"lines": 3, "branches": 1, "functions": 1}
+    assert second.counts() == {"lines": 3, "branches": 1, "functions": 2}
+    assert (first | second).counts() == {"lines": 4, "branches": 2, "functions": 2}
+    assert (second - first).counts() == {"lines": 1, "branches": 1, "functions": 1}
+    assert (second - first).lines == 1 << layout.lines["a.c", 4]
+
+
+def test_bits_ignore_slots_missing_from_the_layout():
+    layout = CoverageLayout.from_model(model_of({"a.c": FIRST["a.c"]}))
+    bits = CoverageBits.from_model(model_of(SECOND), layout)
+    assert bits.counts() == {"lines": 3, "branches": 1, "functions": 2}
+
+
+def test_packed_bitmap_keeps_lines_branches_and_functions():
+    layout = CoverageLayout.from_model(model_of(FIRST))
+    bitmap = coverage_bitmap(model_of(FIRST), layout)
+    assert bitmap.bit_count() == 5
+    # Lines fill the low bits, then the branches, then the functions
+    assert bitmap & (1 << len(layout.lines)) - 1 == CoverageBits.from_model(
+        model_of(FIRST), layout
+    ).lines
+    assert bitmap >> len(layout.lines) + len(layout.branches) == 0b1
+
+
+def test_greedy_set_cover_keeps_the_union():
+    bitmaps = {"big": 0b0111, "small": 0b0001, "extra": 0b1000, "empty": 0}
+    selected = greedy_set_cover(bitmaps)
+    assert selected[0] == "big"
+    assert sorted(selected) == ["big", "extra"]
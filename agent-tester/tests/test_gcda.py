@@ -0,0 +1,131 @@
+import shutil
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from gcov.gcda import (
+    MAGIC,
+    TAG_ARCS,
+    GcdaError,
+    UnsupportedGcdaLayout,
+    arc_signature,
+    gcc_version,
+)
+
+# CC in c_program/Makefile
+CC = "gcc"
+
+PROGRAM = """
+int twice(int n)
+{
+    return n > 0 ? 2 * n : 0;
+}
+
+int main(int argc, char **argv)
+{
+    if (argc > 2)
+        return twice(argc);
+    if (argc > 1)
+        return 1;
+    return 0;
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def profiles(tmp_path_factory):
+    """
+    .gcda files written by the compiler the coverage build uses, for runs
+    with 0, 1 and 2 arguments, plus a second run with 1 argument.
+    """
+    if shutil.which(CC) is None:
+        pytest.skip(f"{CC} is not installed")
+    build_dir = tmp_path_factory.mktemp("gcda")
+    (build_dir / "prog.c").write_text(PROGRAM)
+    subprocess.run(
+        [CC, "-O0", "-fprofile-arcs", "-ftest-coverage", "prog.c", "-o", "prog"],
+        cwd=build_dir,
+        check=True,
+    )
+    profiles = {}
+    for name, args in [("none", []), ("one", ["a"]), ("two", ["a", "b"]), ("one_again", ["c"])]:
+        (build_dir / "prog.gcda").unlink(missing_ok=True)
+        subprocess.run([build_dir / "prog", *args], cwd=build_dir)
+        profiles[name] = build_dir / f"{name}.gcda"
+        (build_dir / "prog.gcda").rename(profiles[name])
+    return profiles
+
+
+def records(data: bytes):
+    """
+    (offset, tag, length) of every record in a GCC 12+ .gcda.
+    """
+    pos = 16
+    while pos + 8 <= len(data):
+        tag, length = struct.unpack_from("<Ii", data, pos)
+        yield pos, tag, length
+        pos += 8 + max(length, 0)
+
+
+def word_layout(data: bytes, version: bytes = b"B14*") -> bytes:
+    """
+    A GCC 12+ .gcda rewritten in the GCC 11 layout: no checksum word, record
+    lengths in words and all-zero counters written out.
+    """
+    out = bytearray(MAGIC + version[::-1] + data[8:12])
+    for pos, tag, length in records(data):
+        if length < 0:
+            out += struct.pack("<II", tag, -length // 4) + bytes(-length)
+        else:
+            out += struct.pack("<II", tag, length // 4) + data[pos + 8 : pos + 8 + length]
+    return bytes(out)
+
+
+def test_gcc_version():
+    assert gcc_version(b"B22*") == (12, 2)
+    assert gcc_version(b"B14*") == (11, 4)
+    assert gcc_version(b"A93*") == (9, 3)
+    assert gcc_version(b"408*") == (4, 8)
+
+
+def test_signature_tells_paths_apart(profiles):
+    signatures = {name: arc_signature(path) for name, path in profiles.items()}
+    assert signatures["one"] == signatures["one_again"]
+    assert len({signatures["none"], signatures["one"], signatures["two"]}) == 3
+
+
+def test_both_layouts_give_the_same_signature(profiles, tmp_path):
+    data = profiles["one"].read_bytes()
+    version = data[4:8][::-1]
+    if gcc_version(version)[0] < 12:
+        pytest.skip(f"{CC} writes the GCC 11 layout already")
+    # twice() does not run with one argument, so its counters are packed
+    assert any(tag == TAG_ARCS and length < 0 for _, tag, length in records(data))
+    old = tmp_path / "old.gcda"
+    old.write_bytes(word_layout(data))
+    assert arc_signature(old) == arc_signature(profiles["one"])
+
+
+def test_unknown_layouts_are_rejected(profiles, tmp_path):
+    data = profiles["one"].read_bytes()
+    future = tmp_path / "future.gcda"
+    future.write_bytes(data[:4] + b"*09C" + data[8:])
+    with pytest.raises(UnsupportedGcdaLayout):
+        arc_signature(future)
+
+    garbage = tmp_path / "garbage.gcda"
+    garbage.write_bytes(data[:4] + b"????" + data[8:])
+    with pytest.raises(UnsupportedGcdaLayout):
+        arc_signature(garbage)
+
+    pos, _, length = next(r for r in records(data) if r[1] == TAG_ARCS and r[2] > 0)
+    truncated = tmp_path / "truncated.gcda"
+    truncated.write_bytes(data[: pos + 8 + length // 2])
+    with pytest.raises(GcdaError):
+        arc_signature(truncated)
@@ -0,0 +1,133 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from corpus.minimize import coverage_bitmap
+from gcov.bitset import CoverageLayout
+from gcov.history import (
+    HISTORY_NAME,
+    UNKNOWN_TOOL,
+    CoverageHistory,
+    bit_positions,
+    bits_to_blob,
+    blob_to_bits,
+)
+from gcov.model import CoverageModel, FileCoverage, FunctionCoverage
+
+
+def model_of(lines, branches=None, functions=()):
+    """
+    A one-file model: lines {line: count}, branches {line: [counts]},
+    functions [(name, count)].
+    """
+    f = FileCoverage(path="a.c", lines=dict(lines), branches=dict(branches or {}))
+    for name, count in functions:
+        f.functions[name] = FunctionCoverage(name, 1, 9, count, 2, 1 if count else 0)
+    return CoverageModel(files={"a.c": f})
+
+
+LINES = range(1, 11)
+# Iteration 0 covers lines 1-3, iteration 1 adds 4-6 and loses 3
+FIRST = model_of({n: int(n <= 3) for n in LINES}, {2: [1, 0]}, [("f", 1), ("g", 0)])
+SECOND = model_of({n: int(n <= 6 and n != 3) for n in LINES}, {2: [1, 1]}, [("f", 1), ("g", 1)])
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = CoverageHistory(tmp_path / HISTORY_NAME)
+    yield history
+    history.close()
+
+
+def gains(history, iteration):
+    rows = history.db.execute(
+        "SELECT line, tool FROM line_gains WHERE iteration = ? ORDER BY line, tool",
+        (iteration,),
+    )
+    return [tuple(row) for row in rows]
+
+
+def test_blobs_round_trip():
+    for bits in (0, 1, 0b1010, 1 << 200 | 5):
+        assert blob_to_bits(bits_to_blob(bits)) == bits
+    assert bits_to_blob(0) == b""
+    assert bit_positions(0b100101) == [0, 2, 5]
+
+
+def test_record_credits_new_lines_to_the_tools_that_added_inputs(history):
+    assert history.record(FIRST, tools={"afl": 3, "klee": 0}) == 0
+    assert history.record(SECOND, tools={"afl": 1, "llm": 2}) == 1
+    assert history.record(SECOND) == 2
+
+    assert gains(history, 0) == [(1, "afl"), (2, "afl"), (3, "afl")]
+    assert gains(history, 1) == [(4, "afl+llm"), (5, "afl+llm"), (6, "afl+llm")]
+    assert gains(history, 2) == []
+    assert history.covered_lines(1) == {"a.c": 0b1110110}
+    assert history.taken_branches(1) == {"a.c": 0b11}
+
+
+def test_recording_an_iteration_again_replaces_it(history):
+    history.record(FIRST, tools={"afl": 1})
+    history.record(SECOND, iteration=0, tools={"llm": 1})
+    assert history.next_iteration() == 1
+    assert [tool for _, tool in gains(history, 0)] == ["llm"] * 5
+
+
+def test_attribute_narrows_credit_to_the_inputs_that_cover_a_line(history):
+    history.record(FIRST, tools={"afl": 1})
+    history.record(SECOND, tools={"afl": 1, "llm": 1})
+
+    layout = CoverageLayout.from_model(SECOND)
+    # The afl input reaches line 4, the llm input lines 4 and 5; nothing
+    # attributed reaches line 6
+    bitmaps = {
+        "afl_case": coverage_bitmap(model_of({4: 1}), layout),
+        "llm_case": coverage_bitmap(model_of({4: 1, 5: 1}), layout),
+    }
+    history.attribute(1, SECOND, bitmaps, {"afl_case": "afl", "llm_case": "llm"})
+
+    assert gains(history, 1) == [(4, "afl"), (4, "llm"), (5, "llm"), (6, "afl+llm")]
+    assert history.contributions(since=0) == {
+        "afl": {"a.c": [4]},
+        "afl+llm": {"a.c": [6]},
+        "llm": {"a.c": [4, 5]},
+    }
+    assert history.contributions()["afl"] == {"a.c": [1, 2, 3, 4]}
+
+
+def test_attribute_skips_bitmaps_from_another_layout(history, capsys):
+    history.record(FIRST)
+    history.attribute(0, FIRST, {"case": 1 << 500}, {"case": "afl"})
+    assert "do not match" in capsys.readouterr().out
+    assert gains(history, 0) == [(1, UNKNOWN_TOOL), (2, UNKNOWN_TOOL), (3, UNKNOWN_TOOL)]
+
+
+def test_changed_since(history):
+    history.record(FIRST)
+    history.record(SECOND)
+
+    changes = history.changed_since(0)
+    assert changes["from"] == 0 and changes["to"] == 1
+    assert changes["lines_covered"] == 2
+    assert changes["branches_taken"] == 1
+    assert changes["functions_covered"] == 1
+    assert changes["files"] == {
+        "a.c": {"gained": [4, 5, 6], "lost": [3], "branches_gained": 1, "branches_lost": 0}
+    }
+    with pytest.raises(KeyError):
+        history.changed_since(0, until=7)
+
+
+def test_existing_snapshots_are_imported(tmp_path):
+    FIRST.save(tmp_path / "coverage0.json.gz")
+    SECOND.save(tmp_path / "coverage1.json.gz")
+    history = CoverageHistory(tmp_path / HISTORY_NAME)
+    try:
+        assert history.latest() == 1
+        assert history.changed_since(0)["files"]["a.c"]["gained"] == [4, 5, 6]
+    finally:
+        history.close()
@@ -0,0 +1,85 @@
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from coverage_orchestrator import extract_all_klee_inputs
+from klee.replay_bridge import rewrite_layout
+from llm.generate import MOCK_KLEE_REWRITE
+from llm.validate import check_program
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture(scope="module")
+def check_tcc(tmp_path_factory):
+    """
+    The validation tcc, built outside artifacts/ so the test leaves the tree
+    and the build cache alone.
+    """
+    bin_dir = tmp_path_factory.mktemp("bin")
+    try:
+        subprocess.run(
+            ["make", "--no-print-directory", "-B", "check_bin", f"BIN_DIR={bin_dir}"],
+            cwd=ROOT_DIR / "c_program",
+            check=True,
+            capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("the validation tcc cannot be built here")
+    return bin_dir / "tcc_check"
+
+
+def write_ktest(path, objects):
+    """
+    A version 3 .ktest holding (name, data) objects, as KLEE writes them.
+    """
+    image = b"KTEST" + struct.pack(">ii", 3, 0) + struct.pack(">ii", 0, 0)
+    image += struct.pack(">i", len(objects))
+    for name, data in objects:
+        image += struct.pack(">i", len(name)) + name.encode()
+        image += struct.pack(">i", len(data)) + data
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(image)
+
+
+def concrete(text: bytes, size: int) -> bytes:
+    # KLEE solves every byte, so whatever follows the terminator is arbitrary
+    return (text + b"\0" + b"\xff" * size)[:size]
+
+
+def test_rewrite_layout_reads_char_buffers_in_order():
+    layout = rewrite_layout((FIXTURES / "tcc_klee_rewrite.c").read_text())
+    assert layout == [("input_1", 32), ("input_2", 48)]
+
+
+def test_rewrite_layout_flags_non_char_inputs():
+    source = 'int n; klee_make_symbolic(&n, sizeof(n), "input_1");'
+    assert rewrite_layout(source) == [("input_1", None)]
+
+
+def test_mock_rewrite_uses_the_char_buffer_layout():
+    layout = rewrite_layout(MOCK_KLEE_REWRITE.format(a=40, b=1, c=1))
+    assert layout == [("input_1", 40), ("input_2", 64)]
+
+
+def test_klee_test_of_a_rewrite_replays_as_compilable_source(tmp_path, check_tcc):
+    layout = dict(rewrite_layout((FIXTURES / "tcc_klee_rewrite.c").read_text()))
+    # Objects come out of KLEE in declaration order, not necessarily N order
+    write_ktest(
+        tmp_path / "run_1_tcc_klee/klee-out-0/test000001.ktest",
+        [
+            ("input_2", concrete(b"{ return 0; }", layout["input_2"])),
+            ("input_1", concrete(b"int f(void)", layout["input_1"])),
+        ],
+    )
+
+    buffers = list(extract_all_klee_inputs(tmp_path))
+    assert buffers == [("run_1_tcc_klee", b"int f(void)\n{ return 0; }")]
+
+    assert check_program(buffers[0][1].decode(), check_tcc, tmp_path) is None
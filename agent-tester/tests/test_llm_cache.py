@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from llm.cache import ResponseCache
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = cache.key("model", 0.5, "prompt", 0)
+    assert cache.get(key) is None
+    cache.put(key, "response")
+    assert cache.get(key) == "response"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_concurrent_puts_of_one_key_in_one_process(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = cache.key("model", 0.5, "prompt", 0)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for future in [pool.submit(cache.put, key, f"response {i}") for i in range(200)]:
+            future.result()
+    assert cache.get(key).startswith("response ")
+    assert [p.name for p in tmp_path.iterdir()] == [f"{key}.json"]
+
+
+def test_evict_drops_expired_then_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, ttl_seconds=3600)
+    now = time.time()
+    for i, age in enumerate([7200, 30, 20, 10]):
+        cache.put(str(i), "x" * 40)
+        os.utime(tmp_path / f"{i}.json", (now - age, now - age))
+    # Sizes differ by a byte or two with the creation time
+    sizes = [(tmp_path / f"{i}.json").stat().st_size for i in range(4)]
+    cache.max_bytes = sum(sizes[1:])
+
+    cache.evict()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["1.json", "2.json", "3.json"]
+
+    cache.max_bytes = sum(sizes[1:]) - 1
+    cache.evict()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2.json", "3.json"]
+
+
+def test_evict_tolerates_entries_removed_by_another_run(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path, max_bytes=0)
+    for i in range(3):
+        cache.put(str(i), "response")
+
+    unlink = os.unlink
+
+    def racing_unlink(path, *args, **kwargs):
+        # Another run got there first
+        unlink(path, *args, **kwargs)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "unlink", racing_unlink)
+    cache.evict()
+    assert not list(tmp_path.iterdir())